@@ -15,7 +15,7 @@ if [[ $(pwd) != *files-translator ]]; then
     exit 1
 fi
 
-cd services/files-translator-service/original_fallout_files && rm Fallout4_en_fr.xml && cp __Fallout4_en_fr.xml Fallout4_en_fr.xml && rm -rf ./Fallout4_en_ro.xml
+cd services/files-translator-service/original_fallout_files && rm Fallout4_en_fr.xml && cp __Fallout4_en_fr.xml Fallout4_en_fr.xml && rm -rf ./Fallout4_en_ro.xml ./Fallout4_en_ro.xml.idx ./Fallout4_en_ro.xml.journal ./Fallout4_en_fr.xml.cursor ./Fallout4_en_fr.xml.idx
 
 cd ../../..
 
@@ -1,6 +1,6 @@
 """Main Flask application using modular structure."""
 
-from flask import Flask, render_template_string
+from flask import Flask, Response, render_template_string
 import os
 import sys
 from datetime import datetime
@@ -11,6 +11,9 @@ from services import ai_service
 from templates import HOME_TEMPLATE
 from routes.basic_routes import basic_bp
 from routes.xml_routes import xml_bp
+from job_manager import job_manager
+from text_jobs import text_job_manager
+from metrics import registry
 
 # Setup logging to file while keeping console output
 class TeeOutput:
@@ -60,18 +63,32 @@ app.config['DEBUG'] = config.FLASK_DEBUG
 # Print configuration
 config.print_config()
 
+# Only serving processes warm up the model and drive jobs: every WSGI worker importing the app,
+# but not the debug reloader's watcher of the development server
+serving_process = __name__ != '__main__' or not config.FLASK_DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+
 # Initialize AI service
-try:
-    ai_service.get_client()
-    print("[FILES-TRANSLATOR] AI service initialized successfully")
-except Exception as e:
-    print(f"[FILES-TRANSLATOR] Failed to initialize AI service: {str(e)}")
-    sys.exit(1)
+if config.STARTUP_MODE == 'blocking':
+    try:
+        ai_service.warm_up()
+        print("[FILES-TRANSLATOR] AI service initialized successfully")
+    except Exception as e:
+        print(f"[FILES-TRANSLATOR] Failed to initialize AI service: {str(e)}")
+        sys.exit(1)
+elif serving_process:
+    ai_service.start_background_warm_up()
+    print("[FILES-TRANSLATOR] AI service warming up in the background")
 
 # Register blueprints
 app.register_blueprint(basic_bp)
 app.register_blueprint(xml_bp)
 
+# Drive the jobs of the shared job store, and resume an XML batch interrupted by a crash or container restart
+if serving_process:
+    job_manager.start_keeper()
+    text_job_manager.start_keeper()
+    job_manager.resume_interrupted_job(config.XML_INPUT_FILE_PATH, config.XML_OUTPUT_FILE_PATH)
+
 @app.route('/')
 def home():
     """Home page showing available translators."""
@@ -80,8 +97,14 @@ def home():
 @app.route('/health')
 def health():
     """Health check endpoint."""
-    return {"status": "healthy", "timestamp": datetime.now().isoformat()}
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(), "model": ai_service.warmup_status}
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics of the translation hot path."""
+    return Response(registry.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
+    # Development server; gunicorn -c gunicorn.conf.py wsgi:app serves with several worker processes
     print("[FILES-TRANSLATOR] Starting Flask application...")
     app.run(host='0.0.0.0', port=5000, debug=config.FLASK_DEBUG)
@@ -0,0 +1,210 @@
+"""asyncio translation core on top of the async Ollama client."""
+
+import asyncio
+import threading
+from config import Config
+from metrics import ModelCall
+from ollama_backends import AsyncOllamaBackendPool, is_backend_failure
+from placeholders import mask_placeholders
+from services import (ai_service, build_translation_request, build_packed_request, backend_samples,
+                      ollama_backend_in_flight, generation_options, single_line_complete, packed_lines_complete,
+                      read_translation, read_packed_translations)
+
+
+class AsyncAIService:
+    """Translates through ollama.AsyncClient on one event loop thread.
+
+    Any number of translations can be pending as tasks while model calls
+    wait for the inference budget of the synchronous AIService, so thousands
+    of entries in flight cost no OS thread each and both pipelines together
+    stay within INFERENCE_CONCURRENCY. Every call is cancellable and gives up
+    after TRANSLATION_TIMEOUT_SECONDS. Prompts, answer parsing and the
+    translation memory are AIService's too; memory I/O runs on worker
+    threads so SQLite never blocks the loop.
+    """
+
+    def __init__(self, sync_service):
+        self.sync_service = sync_service
+        self.config = Config()
+        self.loop = None
+        self.loop_thread = None
+        self.loop_lock = threading.Lock()
+        self.client = None
+        self.client_lock = None
+
+    def ensure_loop(self):
+        """Start the event loop thread on first use and return the loop."""
+        with self.loop_lock:
+            if self.loop is None:
+                loop = asyncio.new_event_loop()
+                self.loop_thread = threading.Thread(target=loop.run_forever, name='async-translation-loop')
+                self.loop_thread.daemon = True
+                self.loop_thread.start()
+                self.loop = loop
+        return self.loop
+
+    def submit(self, coroutine):
+        """Schedule a coroutine on the loop from any thread and return a concurrent future.
+
+        Cancelling the returned future cancels the task running the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self.ensure_loop())
+
+    def run(self, coroutine):
+        """Run a coroutine on the loop and block the calling thread until it is done."""
+        return self.submit(coroutine).result()
+
+    async def get_client(self):
+        """Get or initialize the async backend pool, pulling the model on first use if it is missing."""
+        if self.client_lock is None:
+            # Created on the loop thread, the only place it is used
+            self.client_lock = asyncio.Lock()
+
+        async with self.client_lock:
+            if self.client is None:
+                try:
+                    client = AsyncOllamaBackendPool(self.config.OLLAMA_SERVICE_URLS,
+                                                    failure_threshold=self.config.OLLAMA_BACKEND_FAILURE_THRESHOLD,
+                                                    retry_after=self.config.OLLAMA_BACKEND_RETRY_SECONDS)
+                    ready = await client.ensure_model(self.config.ENHANCE_PRODUCT_MODEL)
+                    self.client = client
+                    print(f"[ASYNC-AI-SERVICE] Connected to {ready} of {len(self.config.OLLAMA_SERVICE_URLS)} Ollama backends")
+                except Exception as e:
+                    print(f"[ASYNC-AI-SERVICE] Error while connecting to Ollama service: {str(e)}")
+                    raise e
+        return self.client
+
+    async def _generate(self, request, options, is_complete=None):
+        """One bounded model call; raises asyncio.TimeoutError when it takes too long."""
+        client = await self.get_client()
+        endpoint = 'chat' if 'messages' in request else 'generate'
+        streamed = self.config.GENERATION_STREAMING and is_complete is not None
+
+        with ModelCall(endpoint, streamed) as model_call:
+            async with self.sync_service.inference_slots:
+                model_call.start()
+                # The timeout covers the model call only, not the wait for a free slot
+                return await asyncio.wait_for(
+                    self._stream_generation(client, request, options, is_complete, model_call),
+                    timeout=self.config.TRANSLATION_TIMEOUT_SECONDS)
+
+    async def _stream_generation(self, client, request, options, is_complete, model_call):
+        """Generate (or chat), streaming until is_complete says the answer is there."""
+        call = client.chat if 'messages' in request else client.generate
+        record_response = self.sync_service.record_response
+
+        if not model_call.streamed:
+            response = await call(model=self.config.ENHANCE_PRODUCT_MODEL, options=options,
+                                  keep_alive=self.config.OLLAMA_KEEP_ALIVE, **request)
+            return record_response(request, response, options, model_call)
+
+        # A stream breaking midway is generated again, on another backend when there is one
+        attempts = len(client.backends)
+        broken = []
+        for attempt in range(1, attempts + 1):
+            stream = await call(model=self.config.ENHANCE_PRODUCT_MODEL, options=options,
+                                keep_alive=self.config.OLLAMA_KEEP_ALIVE, stream=True, exclude=broken,
+                                **request)
+            parts = []
+            try:
+                async for chunk in stream:
+                    parts.append(record_response(request, chunk, options, model_call))
+                    # Stop reading (and let the server stop generating) once the answer is complete
+                    if '\n' in parts[-1] and is_complete(''.join(parts)):
+                        break
+                return ''.join(parts)
+            except Exception as e:
+                if attempt == attempts or not is_backend_failure(e):
+                    raise
+                print(f"[ASYNC-AI-SERVICE] Stream broke after {len(parts)} chunks, generating again: {str(e)}")
+                broken.append(getattr(e, 'backend_url', None))
+            finally:
+                await stream.aclose()
+
+    async def generate_translation(self, text, examples=None, record_type=None):
+        """Translate English text to Romanian using AI."""
+        try:
+            is_complete = single_line_complete(text)
+            response_text = await self._generate(build_translation_request(text, examples, record_type),
+                                                 generation_options([text]), is_complete)
+            return read_translation(response_text, is_complete)
+        except asyncio.TimeoutError:
+            print(f"[ASYNC-AI-SERVICE] Translation timed out after {self.config.TRANSLATION_TIMEOUT_SECONDS}s")
+            return None
+        except Exception as e:
+            print(f"[ASYNC-AI-SERVICE] Error during translation: {str(e)}")
+            return None
+
+    async def generate_packed_translations(self, texts, record_type=None):
+        """Translate numbered strings in one call; None when the answer does not line up."""
+        try:
+            response_text = await self._generate(build_packed_request(texts, record_type), generation_options(texts),
+                                                 packed_lines_complete(len(texts)))
+
+            translations = read_packed_translations(response_text, len(texts))
+            if translations is None:
+                print(f"[ASYNC-AI-SERVICE] Packed translation of {len(texts)} strings did not line up, falling back to single calls")
+
+            return translations
+        except asyncio.TimeoutError:
+            print(f"[ASYNC-AI-SERVICE] Packed translation timed out after {self.config.TRANSLATION_TIMEOUT_SECONDS}s")
+            return None
+        except Exception as e:
+            print(f"[ASYNC-AI-SERVICE] Error during packed translation: {str(e)}")
+            return None
+
+    async def translate_text(self, text, record_type=None):
+        """Translate English text to Romanian through its placeholder template."""
+        masked_text = mask_placeholders(text, self.config.PLACEHOLDER_MASKING_ENABLED)
+        translated_template = await self.translate_template(masked_text.text, record_type)
+        translated_text, translate_original = self.sync_service.fill_template(masked_text, translated_template)
+        if translate_original:
+            return await self.generate_translation(text, record_type=record_type)
+        return translated_text
+
+    async def translate_template(self, text, record_type=None):
+        """Translate a (placeholder masked) text, consulting the translation memory first."""
+        translated_text, examples = await asyncio.to_thread(self.sync_service.recall_template, text)
+        if translated_text is not None:
+            return translated_text
+
+        translated_text = await self.generate_translation(text, examples, record_type)
+        await asyncio.to_thread(self.sync_service.remember_translation, text, translated_text)
+
+        return translated_text
+
+    async def translate_batch(self, texts, record_type=None):
+        """Translate several short templates, packing the ones missing from the memory into one prompt."""
+        results, examples_by_index = await asyncio.to_thread(self.sync_service.recall_batch, texts)
+        missing = list(examples_by_index)
+
+        if not missing:
+            return results
+
+        missing_texts = [texts[index] for index in missing]
+        translations = await self.generate_packed_translations(missing_texts, record_type) if len(missing_texts) > 1 else None
+
+        if translations is None:
+            # Packing failed or was pointless, translate the strings one by one (concurrently)
+            translations = await asyncio.gather(*(self.generate_translation(texts[index], examples_by_index[index], record_type)
+                                                  for index in missing))
+
+        for index, translated_text in zip(missing, translations):
+            results[index] = translated_text
+        await asyncio.to_thread(self.remember_translations, [texts[index] for index in missing], translations)
+
+        return results
+
+    def remember_translations(self, texts, translations):
+        """AIService.remember_translation for every text, run off the loop."""
+        for text, translated_text in zip(texts, translations):
+            self.sync_service.remember_translation(text, translated_text)
+
+    async def translate_many(self, texts):
+        """Translate every text concurrently and return the results in input order."""
+        return await asyncio.gather(*(self.translate_text(text) for text in texts))
+
+
+# Global async AI service instance
+async_ai_service = AsyncAIService(ai_service)
+ollama_backend_in_flight.add_source(lambda: backend_samples('async', async_ai_service.client))
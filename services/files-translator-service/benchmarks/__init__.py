@@ -0,0 +1 @@
+"""Reproducible benchmarks of the translator against a local stub Ollama server."""
@@ -0,0 +1,249 @@
+"""Local stand-in for an Ollama server with configurable latency and generation speed.
+
+It answers /api/generate and /api/chat the way the translator expects
+(one line per string, numbered lines for packed prompts), so batches run
+end to end without a GPU. Every answer waits a prompt latency drawn from
+one distribution, then streams its tokens at a rate drawn from another.
+
+Run it on its own to point a development server at it:
+
+    python -m benchmarks.stub_ollama --port 11434 --latency lognormal:0.2,0.5 --tokens-per-second normal:40,5
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+numbered_line_pattern = re.compile(r'^(\d+)\.\s(.*)$')
+
+
+def parse_distribution(spec):
+    """Sampler for fixed:S, uniform:LOW,HIGH, normal:MEAN,STDDEV or lognormal:MEDIAN,SIGMA (never negative)."""
+    kind, _, arguments = spec.partition(':')
+    values = [float(value) for value in arguments.split(',') if value.strip()]
+
+    if kind == 'fixed' and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == 'uniform' and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == 'normal' and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == 'lognormal' and len(values) == 2:
+        # Parameterized by the median, which is easier to reason about than the mean of the logarithm
+        return lambda rng: values[0] * rng.lognormvariate(0.0, values[1])
+    raise ValueError(f"Unsupported distribution: {spec}")
+
+
+def source_block(prompt):
+    """The strings to translate of a prompt or user message."""
+    if 'Text to translate:\n\n' in prompt:
+        return prompt.split('Text to translate:\n\n', 1)[1]
+    if prompt.startswith('Translate') and '\n\n' in prompt:
+        return prompt.split('\n\n', 1)[1]
+    return prompt
+
+
+def fake_translation(prompt):
+    """Answer in the shape the translator parses: numbered lines stay numbered."""
+    text = source_block(prompt)
+    lines = text.split('\n')
+    numbered = [numbered_line_pattern.match(line) for line in lines]
+    if 'numbered' in prompt.split('\n\n', 1)[0] and all(numbered):
+        return '\n'.join(f"{match.group(1)}. [ro] {match.group(2)}" for match in numbered)
+    return '[ro] ' + text
+
+
+class StubOllamaServer:
+    """A threaded HTTP server answering like Ollama, started on a free local port."""
+
+    def __init__(self, latency='fixed:0.05', tokens_per_second='fixed:50', parallel=4, seed=0, host='127.0.0.1', port=0,
+                 break_streams_after=None):
+        self.sample_latency = parse_distribution(latency)
+        self.sample_tokens_per_second = parse_distribution(tokens_per_second)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        # Like OLLAMA_NUM_PARALLEL: requests beyond it wait for a slot
+        self.slots = threading.Semaphore(max(1, parallel))
+        # Drop the connection after this many streamed chunks, like a server going away midway
+        self.break_streams_after = break_streams_after
+        self.counters = {'requests': 0, 'generations': 0, 'prompt_tokens': 0, 'generated_tokens': 0,
+                         'aborted_streams': 0, 'broken_streams': 0}
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name='stub-ollama')
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, counter, amount=1):
+        with self.lock:
+            self.counters[counter] += amount
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters)
+
+    def sample(self):
+        """(prompt latency, tokens per second) of one generation."""
+        with self.lock:
+            return self.sample_latency(self.rng), max(0.1, self.sample_tokens_per_second(self.rng))
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def send_json(self, payload, status=200):
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                stub.count('requests')
+                if self.path == '/_stub/stats':
+                    self.send_json(stub.stats())
+                elif self.path == '/api/tags':
+                    self.send_json({'models': [{'name': 'stub', 'model': 'stub'}]})
+                else:
+                    self.send_json({'error': 'not found'}, 404)
+
+            def do_POST(self):
+                stub.count('requests')
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+
+                if self.path == '/api/show':
+                    self.send_json({'modelfile': '', 'parameters': '', 'template': '', 'details': {}, 'model_info': {}})
+                elif self.path == '/api/pull':
+                    self.send_json({'status': 'success'})
+                elif self.path in ('/api/generate', '/api/chat'):
+                    self.generate(body, chat=self.path == '/api/chat')
+                else:
+                    self.send_json({'error': 'not found'}, 404)
+
+            def generate(self, body, chat):
+                if chat:
+                    prompt_text = ''.join(message.get('content', '') for message in body.get('messages', []))
+                    prompt = body['messages'][-1].get('content', '') if body.get('messages') else ''
+                else:
+                    prompt_text = prompt = body.get('prompt', '')
+
+                with stub.slots:
+                    if not prompt_text:
+                        # Preload request: loads the model, generates nothing
+                        self.send_json({'model': body.get('model'), 'response': '', 'done': True})
+                        return
+
+                    stub.count('generations')
+                    latency, tokens_per_second = stub.sample()
+                    answer = fake_translation(prompt)
+                    pieces = [answer[index:index + 4] for index in range(0, len(answer), 4)]
+                    prompt_tokens = max(1, len(prompt_text) // 4)
+                    stub.count('prompt_tokens', prompt_tokens)
+                    final = {
+                        'model': body.get('model'),
+                        'done': True,
+                        'done_reason': 'stop',
+                        'total_duration': int((latency + len(pieces) / tokens_per_second) * 1e9),
+                        'load_duration': 0,
+                        'prompt_eval_count': prompt_tokens,
+                        'prompt_eval_duration': int(latency * 1e9),
+                        'eval_count': len(pieces),
+                        'eval_duration': int(len(pieces) / tokens_per_second * 1e9)
+                    }
+
+                    time.sleep(latency)
+                    if not body.get('stream', True):
+                        time.sleep(len(pieces) / tokens_per_second)
+                        stub.count('generated_tokens', len(pieces))
+                        if chat:
+                            final['message'] = {'role': 'assistant', 'content': answer}
+                        else:
+                            final['response'] = answer
+                        self.send_json(final)
+                        return
+
+                    self.stream(pieces, tokens_per_second, final, chat)
+
+            def send_chunk(self, payload):
+                data = (json.dumps(payload) + '\n').encode('utf-8')
+                # Chunked like Ollama's own streams, so a dropped connection shows as an incomplete body
+                self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b'\r\n')
+                self.wfile.flush()
+
+            def stream(self, pieces, tokens_per_second, final, chat):
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/x-ndjson')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.send_header('Connection', 'close')
+                self.end_headers()
+                self.close_connection = True
+                try:
+                    for sent, piece in enumerate(pieces + ['\n']):
+                        if sent == stub.break_streams_after:
+                            stub.count('broken_streams')
+                            return
+                        time.sleep(1 / tokens_per_second)
+                        chunk = {'model': final['model'], 'done': False}
+                        if chat:
+                            chunk['message'] = {'role': 'assistant', 'content': piece}
+                        else:
+                            chunk['response'] = piece
+                        self.send_chunk(chunk)
+                        stub.count('generated_tokens')
+                    self.send_chunk(final)
+                    self.wfile.write(b'0\r\n\r\n')
+                except (BrokenPipeError, ConnectionResetError):
+                    # The translator stops reading once the answer is complete
+                    stub.count('aborted_streams')
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', default='fixed:0.05', help='Prompt latency in seconds (default: %(default)s)')
+    parser.add_argument('--tokens-per-second', default='fixed:50', help='Generation speed (default: %(default)s)')
+    parser.add_argument('--parallel', type=int, default=4, help='Generations served at once (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--break-streams-after', type=int, default=None,
+                        help='Drop every stream after this many chunks (default: never)')
+    arguments = parser.parse_args()
+
+    stub = StubOllamaServer(arguments.latency, arguments.tokens_per_second, arguments.parallel, arguments.seed,
+                            arguments.host, arguments.port, arguments.break_streams_after)
+    print(f"[STUB-OLLAMA] Serving on {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
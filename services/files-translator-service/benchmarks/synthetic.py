@@ -0,0 +1,232 @@
+"""Seeded synthetic inputs: English text files and Fallout 4 string files.
+
+String files follow the SSTXMLRessources layout of original_fallout_files:
+<String> elements with List/sID attributes, an <EDID>, a <REC> naming the
+record and field, and escaped <Source>/<Dest> text. What goes into them is
+described by a profile: the share of every record type, its fields, its
+length distribution (words, lognormal) and how often its strings repeat,
+plus the rates of empty strings, placeholders and characters that need
+escaping. DEFAULT_PROFILE is a rough approximation of the base game file;
+measure_profile() derives one from a real string file instead:
+
+    python -m benchmarks.synthetic --measure /app/original_fallout_files/Fallout4_en_fr.xml > profile.json
+    python -m benchmarks.synthetic --entries 100000 --profile profile.json --output Synthetic_en_fr.xml
+"""
+
+import argparse
+import json
+import math
+import random
+import re
+import statistics
+import sys
+from collections import Counter, defaultdict
+from xml.sax.saxutils import escape
+
+WORDS = ('the', 'settlement', 'needs', 'your', 'help', 'raiders', 'attacked', 'we', 'found', 'a', 'power',
+         'armor', 'near', 'old', 'factory', 'bring', 'me', 'caps', 'water', 'purifier', 'vault', 'door',
+         'is', 'locked', 'synth', 'institute', 'brotherhood', 'minutemen', 'general', 'radiation',
+         'stimpak', 'ammo', 'you', 'should', 'not', 'be', 'here', 'wasteland', 'commonwealth', 'of')
+PLACEHOLDERS = ('<Alias=Player>', '<Alias.ShortName=Companion>', '<Global=CapsReward>', '<Token=Name>', '%d', '%s')
+ESCAPED_CHARACTERS = ('&', '"', "'", '<', '>')
+# The three string tables of a plugin: strings, dlstrings (descriptions) and ilstrings (dialogue)
+LIST_NAMES = ('0', '1', '2')
+
+DEFAULT_PROFILE = {
+    'records': {
+        'INFO': {'share': 0.46, 'fields': ['NAM1', 'RNAM'], 'median_words': 11, 'sigma': 0.7, 'duplicate_rate': 0.12},
+        'DIAL': {'share': 0.06, 'fields': ['FULL'], 'median_words': 3, 'sigma': 0.5, 'duplicate_rate': 0.3},
+        'QUST': {'share': 0.05, 'fields': ['FULL', 'CNAM', 'NNAM'], 'median_words': 9, 'sigma': 0.8, 'duplicate_rate': 0.08},
+        'MESG': {'share': 0.05, 'fields': ['DESC', 'ITXT'], 'median_words': 14, 'sigma': 0.9, 'duplicate_rate': 0.15},
+        'BOOK': {'share': 0.02, 'fields': ['DESC'], 'median_words': 140, 'sigma': 0.9, 'duplicate_rate': 0.02},
+        'TERM': {'share': 0.04, 'fields': ['DESC', 'BTXT', 'ITXT'], 'median_words': 60, 'sigma': 1.0, 'duplicate_rate': 0.05},
+        'PERK': {'share': 0.03, 'fields': ['DESC', 'FULL'], 'median_words': 18, 'sigma': 0.6, 'duplicate_rate': 0.05},
+        'WEAP': {'share': 0.04, 'fields': ['FULL'], 'median_words': 2, 'sigma': 0.4, 'duplicate_rate': 0.35},
+        'ARMO': {'share': 0.06, 'fields': ['FULL'], 'median_words': 3, 'sigma': 0.4, 'duplicate_rate': 0.35},
+        'MISC': {'share': 0.06, 'fields': ['FULL'], 'median_words': 2, 'sigma': 0.5, 'duplicate_rate': 0.3},
+        'NPC_': {'share': 0.07, 'fields': ['FULL', 'SHRT'], 'median_words': 2, 'sigma': 0.4, 'duplicate_rate': 0.45},
+        'CELL': {'share': 0.03, 'fields': ['FULL'], 'median_words': 3, 'sigma': 0.4, 'duplicate_rate': 0.2},
+        'LCTN': {'share': 0.03, 'fields': ['FULL'], 'median_words': 2, 'sigma': 0.4, 'duplicate_rate': 0.1}
+    },
+    'list_shares': [0.55, 0.15, 0.3],
+    'empty_rate': 0.03,
+    'placeholder_rate': 0.08,
+    'escaped_rate': 0.05,
+    'partial_rate': 0.01
+}
+
+rec_pattern = re.compile(r'<REC[^>]*>([^<:]*):?([^<]*)</REC>')
+list_pattern = re.compile(r'\bList="([^"]*)"')
+placeholder_text_pattern = re.compile(r'<(?:Alias|Global|Token)[^>]*>|%[ds]')
+
+
+def sentence(rng, min_words=2, max_words=24):
+    """A random English-looking sentence."""
+    words = [rng.choice(WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return ' '.join(words).capitalize() + rng.choice(('.', '.', '!', '?'))
+
+
+def source_texts(count, seed=0, duplicate_rate=0.2, empty_rate=0.02):
+    """count source strings, some empty and some repeating earlier ones."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(count):
+        roll = rng.random()
+        if roll < empty_rate:
+            texts.append('')
+        elif roll < empty_rate + duplicate_rate and texts:
+            texts.append(rng.choice(texts))
+        else:
+            texts.append(sentence(rng))
+    return texts
+
+
+def write_text_file(path, count, seed=0):
+    """Write count lines for the text file translator."""
+    with open(path, 'w', encoding='utf-8') as file:
+        for text in source_texts(count, seed):
+            file.write(text + '\n')
+
+
+def profiled_text(rng, record, profile):
+    """A new source string of a record type: its length, placeholders and escaped characters."""
+    word_count = max(1, round(record['median_words'] * rng.lognormvariate(0.0, record['sigma'])))
+    words = [rng.choice(WORDS) for _ in range(word_count)]
+
+    if rng.random() < profile['placeholder_rate']:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(PLACEHOLDERS))
+    if rng.random() < profile['escaped_rate']:
+        words.insert(rng.randrange(len(words) + 1), rng.choice(ESCAPED_CHARACTERS))
+
+    # Names stay bare, longer strings become sentences and long ones paragraphs
+    if word_count <= 4:
+        return ' '.join(word.capitalize() for word in words)
+    sentences = [' '.join(words[start:start + 12]).capitalize() + '.' for start in range(0, len(words), 12)]
+    paragraphs = [' '.join(sentences[start:start + 5]) for start in range(0, len(sentences), 5)]
+    return '\n'.join(paragraphs)
+
+
+def string_entries(count, seed=0, profile=None):
+    """count (list, record, field, source text) tuples drawn from a profile."""
+    profile = profile or DEFAULT_PROFILE
+    rng = random.Random(seed)
+    record_names = list(profile['records'])
+    record_weights = [profile['records'][name]['share'] for name in record_names]
+    earlier_texts = defaultdict(list)
+
+    for _ in range(count):
+        name = rng.choices(record_names, record_weights)[0]
+        record = profile['records'][name]
+        field = rng.choice(record['fields'])
+        list_name = rng.choices(LIST_NAMES, profile['list_shares'])[0]
+
+        if rng.random() < profile['empty_rate']:
+            text = ''
+        elif earlier_texts[name] and rng.random() < record['duplicate_rate']:
+            text = rng.choice(earlier_texts[name])
+        else:
+            text = profiled_text(rng, record, profile)
+            earlier_texts[name].append(text)
+
+        yield list_name, name, field, text
+
+
+def write_xml_file(path, count, seed=0, profile=None):
+    """Write a string file with count <String> entries drawn from a profile."""
+    profile = profile or DEFAULT_PROFILE
+    partial_rng = random.Random(seed + 1)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<SSTXMLRessources>\n'
+                   '  <Params>\n    <Addon>Fallout4</Addon>\n    <Source>en</Source>\n    <Dest>fr</Dest>\n'
+                   '    <Version>2</Version>\n  </Params>\n  <Content>\n')
+        for number, (list_name, record, field, text) in enumerate(string_entries(count, seed, profile)):
+            partial = ' Partial="1"' if partial_rng.random() < profile['partial_rate'] else ''
+            fields = profile['records'][record]['fields']
+            escaped_text = escape(text, {'"': '&quot;', "'": '&apos;'})
+            file.write(f'    <String List="{list_name}" sID="{number:06X}"{partial}>\n'
+                       f'      <EDID>{record.rstrip("_").capitalize()}{number:06X}</EDID>\n'
+                       f'      <REC id="{fields.index(field)}" idMax="{len(fields)}">{record}:{field}</REC>\n'
+                       f'      <Source>{escaped_text}</Source>\n'
+                       f'      <Dest>{escaped_text}</Dest>\n'
+                       f'    </String>\n')
+        file.write('  </Content>\n</SSTXMLRessources>\n')
+
+
+def measure_profile(path):
+    """Profile of a real string file, for generating look-alikes of it."""
+    from xml_reader import XMLEntryReader
+
+    records = defaultdict(lambda: {'count': 0, 'fields': Counter(), 'words': [], 'texts': set(), 'duplicates': 0})
+    lists = Counter()
+    total = empty = placeholders = escaped = partial = 0
+
+    for entry in XMLEntryReader(path).iter_entries():
+        total += 1
+        rec_match = rec_pattern.search(entry['full_entry'])
+        name, field = (rec_match.group(1), rec_match.group(2) or 'FULL') if rec_match else ('UNKNOWN', 'FULL')
+        list_match = list_pattern.search(entry['attributes'])
+        lists[list_match.group(1) if list_match else '0'] += 1
+        partial += 'Partial=' in entry['attributes']
+
+        record = records[name]
+        record['count'] += 1
+        record['fields'][field] += 1
+        text = entry['source_text']
+        if not text.strip():
+            empty += 1
+            continue
+        if text in record['texts']:
+            record['duplicates'] += 1
+        record['texts'].add(text)
+        record['words'].append(len(text.split()))
+        placeholders += bool(placeholder_text_pattern.search(text))
+        escaped += any(character in text for character in ESCAPED_CHARACTERS)
+
+    non_empty = max(1, total - empty)
+    profile_records = {}
+    for name, record in records.items():
+        words = record['words'] or [1]
+        logs = [math.log(count) for count in words]
+        profile_records[name] = {
+            'share': round(record['count'] / max(1, total), 4),
+            'fields': [field for field, _ in record['fields'].most_common()],
+            'median_words': statistics.median(words),
+            'sigma': round(statistics.pstdev(logs), 3),
+            'duplicate_rate': round(record['duplicates'] / max(1, len(record['words'])), 4)
+        }
+
+    return {
+        'records': profile_records,
+        'list_shares': [round(lists[name] / max(1, total), 4) for name in LIST_NAMES],
+        'empty_rate': round(empty / max(1, total), 4),
+        'placeholder_rate': round(placeholders / non_empty, 4),
+        'escaped_rate': round(escaped / non_empty, 4),
+        'partial_rate': round(partial / max(1, total), 4)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--measure', metavar='XML_FILE', help='Print the profile of a real string file as JSON')
+    parser.add_argument('--entries', type=int, default=10000, help='<String> entries to generate (default: %(default)s)')
+    parser.add_argument('--profile', help='Profile JSON to generate from (default: the built-in one)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='String file to write')
+    arguments = parser.parse_args()
+
+    if arguments.measure:
+        json.dump(measure_profile(arguments.measure), sys.stdout, indent=2)
+        print()
+        return
+
+    if not arguments.output:
+        parser.error('--output is required when generating a file')
+    profile = None
+    if arguments.profile:
+        with open(arguments.profile) as file:
+            profile = json.load(file)
+    write_xml_file(arguments.output, arguments.entries, arguments.seed, profile)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+"""Throughput benchmark of the text and XML batch paths against the stub Ollama server.
+
+Every scenario (target x size) runs in a fresh interpreter with its own
+translation memory, so runs do not warm each other up and peak RSS is per
+scenario. Results are written as JSON; pass --compare with an earlier
+result file to print the entries/s change per scenario.
+
+    cd services/files-translator-service
+    python -m benchmarks.throughput --sizes 1000,10000 --latency lognormal:0.05,0.5 --tokens-per-second normal:60,10
+"""
+
+import argparse
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from datetime import datetime
+
+from benchmarks.stub_ollama import StubOllamaServer
+from benchmarks.synthetic import write_text_file, write_xml_file
+from metrics import HistogramValue, model_call_seconds
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(SERVICE_DIR, 'benchmarks', 'results')
+
+
+def read_process_io():
+    """Bytes this process passed to read() and write() calls, None off Linux."""
+    try:
+        with open('/proc/self/io') as file:
+            fields = dict(line.split(':', 1) for line in file if ':' in line)
+        return {'read': int(fields['rchar']), 'written': int(fields['wchar'])}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class SocketTraffic:
+    """Bytes sent and received through every socket of this process, from now on.
+
+    Counted at the socket methods the HTTP clients (threaded and asyncio)
+    call, for the network cost of the model calls.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.received = 0
+        self.sent = 0
+        traffic = self
+        original_recv = socket.socket.recv
+        original_recv_into = socket.socket.recv_into
+        original_send = socket.socket.send
+        original_sendall = socket.socket.sendall
+
+        def recv(sock, *args):
+            data = original_recv(sock, *args)
+            traffic.add_received(len(data))
+            return data
+
+        def recv_into(sock, *args):
+            size = original_recv_into(sock, *args)
+            traffic.add_received(size)
+            return size
+
+        def send(sock, data, *args):
+            size = original_send(sock, data, *args)
+            traffic.add_sent(size)
+            return size
+
+        def sendall(sock, data, *args):
+            original_sendall(sock, data, *args)
+            traffic.add_sent(len(data))
+
+        socket.socket.recv = recv
+        socket.socket.recv_into = recv_into
+        socket.socket.send = send
+        socket.socket.sendall = sendall
+
+    def add_received(self, size):
+        with self.lock:
+            self.received += size
+
+    def add_sent(self, size):
+        with self.lock:
+            self.sent += size
+
+    def snapshot(self):
+        with self.lock:
+            return {'received': self.received, 'sent': self.sent}
+
+
+def fetch_stub_stats(stub_url):
+    with urllib.request.urlopen(f"{stub_url}/_stub/stats") as response:
+        return json.loads(response.read())
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of samples, None when empty."""
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+class RecordedSeries(HistogramValue):
+    """Histogram series that also keeps every observation, for exact percentiles."""
+
+    __slots__ = ('samples',)
+
+    def __init__(self, bounds):
+        super().__init__(bounds)
+        self.samples = []
+
+    def observe(self, value):
+        self.samples.append(value)
+        super().observe(value)
+
+
+class Silenced:
+    """Stand-in for stdout that drops the service logs without any write() system call."""
+
+    def write(self, text):
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def run_scenario(spec):
+    """Translate one synthetic input in this process and return its measurements.
+
+    The environment (stub URL, translation memory path, overrides) is set
+    by the parent before this interpreter imports the service modules.
+    """
+    if not spec['verbose']:
+        sys.stdout = Silenced()
+
+    traffic = SocketTraffic()
+    from services import ai_service
+
+    # Keep every model call latency, not only the histogram buckets
+    latency_series = RecordedSeries(model_call_seconds.bounds)
+    model_call_seconds.children[('total',)] = latency_series
+    latencies = latency_series.samples
+
+    # Connect (and let the backends answer the model check) outside the measurement
+    ai_service.get_client()
+
+    stub_before = fetch_stub_stats(spec['stub_url'])
+    network_before = traffic.snapshot()
+    io_before = read_process_io()
+    started = time.perf_counter()
+
+    if spec['target'] == 'text':
+        from file_processor import FileProcessor
+        result = FileProcessor(spec['input_path'], spec['output_path']).process_all_lines()
+        entries = result['processed_count'] + result['skipped_count']
+        errors = len(result['errors'])
+    else:
+        from xml_processor import XMLProcessor
+        processor = XMLProcessor(spec['input_path'], spec['output_path'])
+        processor.start_batch_processing(spec.get('batch_options'))
+        processor.batch_thread.join()
+        result = processor.last_run
+        entries = result['processed_count'] + result['copied_count'] + result['skipped_count']
+        errors = result['error_count']
+
+    seconds = time.perf_counter() - started
+    io_after = read_process_io()
+    network_after = traffic.snapshot()
+    stub_after = fetch_stub_stats(spec['stub_url'])
+
+    network_received = network_after['received'] - network_before['received']
+    network_sent = network_after['sent'] - network_before['sent']
+    measurement = {
+        'target': spec['target'],
+        'size': spec['size'],
+        'entries': entries,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'entries_per_second': round(entries / seconds, 2) if seconds > 0 else None,
+        'model_calls': len(latencies),
+        'latency_p50_ms': None,
+        'latency_p99_ms': None,
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'file_bytes_read_per_entry': None,
+        'file_bytes_written_per_entry': None,
+        'network_bytes_per_entry': round((network_received + network_sent) / entries, 1) if entries else None,
+        'stub_generations': stub_after['generations'] - stub_before['generations'],
+        'stub_generated_tokens': stub_after['generated_tokens'] - stub_before['generated_tokens']
+    }
+    if latencies:
+        measurement['latency_p50_ms'] = round(percentile(latencies, 0.5) * 1000, 2)
+        measurement['latency_p99_ms'] = round(percentile(latencies, 0.99) * 1000, 2)
+    if io_before and io_after and entries:
+        # Sockets go through recv()/send(), which rchar/wchar leave out, so this is file I/O
+        measurement['file_bytes_read_per_entry'] = round((io_after['read'] - io_before['read']) / entries, 1)
+        measurement['file_bytes_written_per_entry'] = round((io_after['written'] - io_before['written']) / entries, 1)
+    return measurement
+
+
+def run_in_subprocess(spec, environment):
+    """Run one scenario in a fresh interpreter and return its measurements."""
+    result_path = os.path.join(spec['work_dir'], 'result.json')
+    spec = dict(spec, result_path=result_path)
+    output = None if spec['verbose'] else subprocess.DEVNULL
+    subprocess.run([sys.executable, '-m', 'benchmarks.throughput', '--scenario', json.dumps(spec)],
+                   cwd=SERVICE_DIR, env=environment, stdout=output, check=True)
+    with open(result_path) as file:
+        return json.load(file)
+
+
+def scenario_environment(stub_url, work_dir, overrides):
+    """Service configuration of a scenario: the stub as the only backend and a fresh translation memory."""
+    environment = dict(os.environ)
+    environment.update({
+        'OLLAMA_SERVICE_URL': stub_url,
+        'OLLAMA_SERVICE_URLS': stub_url,
+        'TRANSLATION_MEMORY_PATH': os.path.join(work_dir, 'translation_memory.sqlite3'),
+        'PYTHONPATH': SERVICE_DIR
+    })
+    environment.update(overrides)
+    return environment
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=SERVICE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(results, baseline=None):
+    """One line per scenario, with the entries/s change against a baseline run when given."""
+    previous = {(result['target'], result['size']): result for result in (baseline or {}).get('results', [])}
+    print(f"{'target':<6} {'size':>8} {'entries/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>8} "
+          f"{'read B/e':>9} {'write B/e':>9} {'change':>8}")
+    for result in results:
+        change = ''
+        earlier = previous.get((result['target'], result['size']))
+        if earlier and earlier.get('entries_per_second') and result['entries_per_second']:
+            change = f"{(result['entries_per_second'] / earlier['entries_per_second'] - 1) * 100:+.1f}%"
+        print(f"{result['target']:<6} {result['size']:>8} {result['entries_per_second'] or '-':>10} "
+              f"{result['latency_p50_ms'] or '-':>9} {result['latency_p99_ms'] or '-':>9} {result['peak_rss_mb']:>8} "
+              f"{result['file_bytes_read_per_entry'] or '-':>9} {result['file_bytes_written_per_entry'] or '-':>9} {change:>8}")
+
+
+def parse_overrides(pairs):
+    overrides = {}
+    for pair in pairs:
+        name, separator, value = pair.partition('=')
+        if not separator:
+            raise ValueError(f"Expected NAME=VALUE, got {pair}")
+        overrides[name] = value
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', default='text,xml', help='Batch paths to run: text, xml (default: %(default)s)')
+    parser.add_argument('--sizes', default='1000,10000', help='Lines / <String> entries per input (default: %(default)s)')
+    parser.add_argument('--latency', default='fixed:0.02', help='Stub prompt latency distribution (default: %(default)s)')
+    parser.add_argument('--tokens-per-second', default='fixed:200', help='Stub generation speed distribution (default: %(default)s)')
+    parser.add_argument('--parallel', type=int, default=4, help='Generations the stub serves at once (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the inputs and the stub (default: %(default)s)')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='Service setting for every scenario, e.g. --env ASYNC_PIPELINE_ENABLED=true')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/throughput-<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier result file to compare entries/s against')
+    parser.add_argument('--verbose', action='store_true', help='Show the service logs (they then count as written bytes)')
+    parser.add_argument('--scenario', help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+
+    if arguments.scenario:
+        spec = json.loads(arguments.scenario)
+        measurement = run_scenario(spec)
+        with open(spec['result_path'], 'w') as file:
+            json.dump(measurement, file)
+        return
+
+    overrides = parse_overrides(arguments.env)
+    targets = [target.strip() for target in arguments.targets.split(',') if target.strip()]
+    sizes = [int(size) for size in arguments.sizes.split(',') if size.strip()]
+
+    stub = StubOllamaServer(arguments.latency, arguments.tokens_per_second, arguments.parallel, arguments.seed).start()
+    results = []
+    try:
+        for target in targets:
+            for size in sizes:
+                with tempfile.TemporaryDirectory(prefix='translator-benchmark-') as work_dir:
+                    extension = 'txt' if target == 'text' else 'xml'
+                    input_path = os.path.join(work_dir, f'input.{extension}')
+                    if target == 'text':
+                        write_text_file(input_path, size, arguments.seed)
+                    else:
+                        write_xml_file(input_path, size, arguments.seed)
+
+                    spec = {'target': target, 'size': size, 'input_path': input_path,
+                            'output_path': os.path.join(work_dir, f'output.{extension}'),
+                            'work_dir': work_dir, 'stub_url': stub.url, 'verbose': arguments.verbose}
+                    print(f"[BENCHMARK] Running {target} with {size} entries...")
+                    results.append(run_in_subprocess(spec, scenario_environment(stub.url, work_dir, overrides)))
+    finally:
+        stub.stop()
+
+    report = {
+        'benchmark': 'throughput',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'latency': arguments.latency,
+            'tokens_per_second': arguments.tokens_per_second,
+            'stub_parallel': arguments.parallel,
+            'seed': arguments.seed,
+            'env': overrides
+        },
+        'results': results
+    }
+
+    output_path = arguments.output
+    if not output_path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output_path = os.path.join(RESULTS_DIR, f"throughput-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output_path, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    baseline = None
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            baseline = json.load(file)
+    print_table(results, baseline)
+    print(f"[BENCHMARK] Results saved to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+"""Scaling micro-benchmarks of the XML layer, without any model call.
+
+Each operation of xml_processor.py is timed on its own against synthetic
+string files of growing size:
+
+- parse: one pass of XMLEntryReader over every <String> entry
+- count_cold / count_warm: count_string_entries building the .idx sidecar, then reusing it
+- write: committing every entry to the output through one XMLOutputWriter
+- cycle: the single-step path (find_next_string_entry, open the writer, commit, close) per entry
+- legacy_cycle: the original find/remove/append cycle, which re-read and rewrote the
+  whole input and output files for every entry
+
+The cycles are sampled over the first --cycle-entries entries and projected
+to the whole file. The growth exponent of an operation is the slope of
+log(seconds) over log(entries): about 1 when it scales linearly, about 2
+for the quadratic legacy cycle.
+
+    cd services/files-translator-service
+    python -m benchmarks.xml_layer --sizes 1000,10000,50000
+"""
+
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import re
+import shutil
+import tempfile
+import time
+from datetime import datetime
+from xml.sax.saxutils import escape, unescape
+
+from benchmarks.synthetic import write_xml_file
+from benchmarks.throughput import RESULTS_DIR, Silenced, git_revision
+
+OPERATIONS = ('parse', 'count_cold', 'count_warm', 'write', 'cycle', 'legacy_cycle')
+
+legacy_entry_pattern = re.compile(r'(<String[^>]*>.*?</String>)', re.DOTALL)
+LEGACY_OUTPUT_HEADER = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<SSTXMLRessources>
+  <Params>
+    <Addon>Fallout4</Addon>
+    <Source>en</Source>
+    <Dest>ro</Dest>
+    <Version>2</Version>
+  </Params>
+  <Content>
+  </Content>
+</SSTXMLRessources>'''
+
+
+class LegacyStringFile:
+    """The find/remove/append cycle XMLProcessor used before the streaming reader and writer.
+
+    Kept here only as the reference curve: every entry re-reads and regex
+    searches the input, rewrites it without the entry, then re-reads and
+    rewrites the output with the entry inserted before </Content>.
+    """
+
+    def __init__(self, input_path, output_path):
+        self.input_path = input_path
+        self.output_path = output_path
+
+    def find_next_string_entry(self):
+        with open(self.input_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+
+        match = legacy_entry_pattern.search(content)
+        if not match:
+            return None
+
+        string_entry = match.group(1)
+        source_match = re.search(r'<Source>(.*?)</Source>', string_entry, re.DOTALL)
+        if not source_match:
+            return None
+        string_tag_match = re.search(r'<String([^>]*)>', string_entry)
+
+        return {
+            'source_text': unescape(source_match.group(1).strip()),
+            'attributes': string_tag_match.group(1) if string_tag_match else '',
+            'start_pos': match.start(),
+            'end_pos': match.end()
+        }
+
+    def remove_string_entry(self, start_pos, end_pos):
+        with open(self.input_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+
+        new_content = content[:start_pos] + content[end_pos:]
+        new_content = re.sub(r'\n\s*\n', '\n', new_content)
+
+        with open(self.input_path, 'w', encoding='utf-8') as file:
+            file.write(new_content)
+
+    def append_string_entry(self, attributes, source_text, dest_text):
+        if not os.path.exists(self.output_path):
+            with open(self.output_path, 'w', encoding='utf-8') as file:
+                file.write(LEGACY_OUTPUT_HEADER)
+
+        with open(self.output_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+
+        new_entry = f'''    <String{attributes}>
+      <Source>{escape(source_text)}</Source>
+      <Dest>{escape(dest_text)}</Dest>
+    </String>'''
+
+        content_end_pos = content.find('  </Content>')
+        with open(self.output_path, 'w', encoding='utf-8') as file:
+            file.write(content[:content_end_pos] + new_entry + '\n' + content[content_end_pos:])
+
+    def process_next_entry(self):
+        entry = self.find_next_string_entry()
+        if entry is None:
+            return False
+        self.remove_string_entry(entry['start_pos'], entry['end_pos'])
+        self.append_string_entry(entry['attributes'], entry['source_text'], entry['source_text'])
+        return True
+
+
+def copy_input(input_path, work_dir, name):
+    """A fresh copy of the input with no cursor, index or output next to it."""
+    directory = os.path.join(work_dir, name)
+    os.makedirs(directory)
+    copy_path = os.path.join(directory, 'input.xml')
+    shutil.copyfile(input_path, copy_path)
+    return copy_path, os.path.join(directory, 'output.xml')
+
+
+def time_parse(input_path, work_dir, cycle_entries):
+    from xml_reader import XMLEntryReader
+
+    started = time.perf_counter()
+    entries = sum(1 for _ in XMLEntryReader(input_path).iter_entries(0))
+    return time.perf_counter() - started, entries
+
+
+def time_count(input_path, work_dir, cycle_entries, cold):
+    from xml_processor import XMLProcessor
+
+    index_path = f"{input_path}.idx"
+    if cold and os.path.exists(index_path):
+        os.remove(index_path)
+    processor = XMLProcessor(input_path, os.path.join(work_dir, 'count-output.xml'))
+
+    started = time.perf_counter()
+    entries = processor.count_string_entries()
+    return time.perf_counter() - started, entries
+
+
+def time_write(input_path, work_dir, cycle_entries):
+    from xml_processor import XMLProcessor
+
+    copy_path, output_path = copy_input(input_path, work_dir, 'write')
+    processor = XMLProcessor(copy_path, output_path)
+    entries = list(processor.reader.iter_entries(0))
+
+    started = time.perf_counter()
+    processor.open_output_writer()
+    for entry in entries:
+        processor.commit_entry(entry, entry['source_text'])
+    processor.close_output_writer()
+    return time.perf_counter() - started, len(entries)
+
+
+def time_cycle(input_path, work_dir, cycle_entries):
+    from xml_processor import XMLProcessor
+
+    copy_path, output_path = copy_input(input_path, work_dir, 'cycle')
+    processor = XMLProcessor(copy_path, output_path)
+
+    done = 0
+    started = time.perf_counter()
+    while done < cycle_entries:
+        entry = processor.find_next_string_entry()
+        if entry is None:
+            break
+        processor.open_output_writer()
+        processor.commit_entry(entry, entry['source_text'])
+        processor.close_output_writer()
+        done += 1
+    return time.perf_counter() - started, done
+
+
+def time_legacy_cycle(input_path, work_dir, cycle_entries):
+    copy_path, output_path = copy_input(input_path, work_dir, 'legacy_cycle')
+    legacy = LegacyStringFile(copy_path, output_path)
+
+    done = 0
+    started = time.perf_counter()
+    while done < cycle_entries and legacy.process_next_entry():
+        done += 1
+    return time.perf_counter() - started, done
+
+
+def run_operation(operation, input_path, work_dir, cycle_entries):
+    """(seconds, entries handled) of one operation, with the service logs dropped."""
+    runners = {
+        'parse': time_parse,
+        'count_cold': lambda *args: time_count(*args, cold=True),
+        'count_warm': lambda *args: time_count(*args, cold=False),
+        'write': time_write,
+        'cycle': time_cycle,
+        'legacy_cycle': time_legacy_cycle
+    }
+    with contextlib.redirect_stdout(Silenced()):
+        return runners[operation](input_path, work_dir, cycle_entries)
+
+
+def measure(operation, size, input_path, work_dir, cycle_entries):
+    seconds, entries = run_operation(operation, input_path, work_dir, cycle_entries)
+    seconds_per_entry = seconds / entries if entries else None
+    sampled = operation in ('cycle', 'legacy_cycle') and entries < size
+    return {
+        'operation': operation,
+        'size': size,
+        'entries': entries,
+        'seconds': round(seconds, 6),
+        'seconds_per_entry': round(seconds_per_entry, 9) if seconds_per_entry is not None else None,
+        # A sampled cycle is projected to the whole file; counting is per file, not per entry
+        'total_seconds': round(seconds_per_entry * size if sampled else seconds, 6),
+        'projected': sampled
+    }
+
+
+def growth_exponents(results):
+    """Least-squares slope of log(total seconds) over log(entries), per operation."""
+    exponents = {}
+    for operation in OPERATIONS:
+        points = [(math.log(result['size']), math.log(result['total_seconds']))
+                  for result in results if result['operation'] == operation and result['total_seconds'] > 0]
+        if len(points) < 2:
+            continue
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        spread = sum((x - mean_x) ** 2 for x, _ in points)
+        if spread:
+            exponents[operation] = round(sum((x - mean_x) * (y - mean_y) for x, y in points) / spread, 2)
+    return exponents
+
+
+def print_table(report, baseline=None):
+    """One line per operation and size, with the total time change against a baseline run when given."""
+    previous = {(result['operation'], result['size']): result for result in (baseline or {}).get('results', [])}
+    print(f"{'operation':<13} {'size':>8} {'file MB':>8} {'total s':>10} {'us/entry':>10} {'change':>8}")
+    for result in report['results']:
+        change = ''
+        earlier = previous.get((result['operation'], result['size']))
+        if earlier and earlier.get('total_seconds') and result['total_seconds']:
+            change = f"{(result['total_seconds'] / earlier['total_seconds'] - 1) * 100:+.1f}%"
+        per_entry = f"{result['seconds_per_entry'] * 1e6:.1f}" if result['seconds_per_entry'] is not None else '-'
+        total = f"{result['total_seconds']:.4f}" + ('*' if result['projected'] else '')
+        print(f"{result['operation']:<13} {result['size']:>8} {report['file_mb'][str(result['size'])]:>8} "
+              f"{total:>10} {per_entry:>10} {change:>8}")
+    print("* projected from the sampled cycle entries")
+    print("growth exponents: " + ', '.join(f"{operation} {exponent}"
+                                           for operation, exponent in report['growth_exponents'].items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,10000,50000', help='<String> entries per file (default: %(default)s)')
+    parser.add_argument('--operations', default=','.join(OPERATIONS), help='Operations to time (default: all)')
+    parser.add_argument('--cycle-entries', type=int, default=200,
+                        help='Entries the per-entry cycles are sampled over (default: %(default)s)')
+    parser.add_argument('--profile', help='Profile JSON of the synthetic files (default: the built-in one)')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the synthetic files (default: %(default)s)')
+    parser.add_argument('--output', help='Result file (default: benchmarks/results/xml-layer-<timestamp>.json)')
+    parser.add_argument('--compare', help='Earlier result file to compare total times against')
+    arguments = parser.parse_args()
+
+    sizes = [int(size) for size in arguments.sizes.split(',') if size.strip()]
+    operations = [operation.strip() for operation in arguments.operations.split(',') if operation.strip()]
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"Unknown operations: {', '.join(sorted(unknown))}")
+    profile = None
+    if arguments.profile:
+        with open(arguments.profile) as file:
+            profile = json.load(file)
+
+    results = []
+    file_mb = {}
+    with tempfile.TemporaryDirectory(prefix='translator-xml-benchmark-') as work_dir:
+        # The service modules are imported on first use, after pointing the translation memory here
+        os.environ.setdefault('TRANSLATION_MEMORY_PATH', os.path.join(work_dir, 'translation_memory.sqlite3'))
+        for size in sizes:
+            size_dir = os.path.join(work_dir, str(size))
+            os.makedirs(size_dir)
+            input_path = os.path.join(size_dir, 'input.xml')
+            write_xml_file(input_path, size, arguments.seed, profile)
+            file_mb[str(size)] = round(os.path.getsize(input_path) / 1e6, 2)
+
+            for operation in operations:
+                print(f"[BENCHMARK] Timing {operation} with {size} entries...")
+                results.append(measure(operation, size, input_path, size_dir, arguments.cycle_entries))
+
+    report = {
+        'benchmark': 'xml_layer',
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {
+            'cycle_entries': arguments.cycle_entries,
+            'seed': arguments.seed,
+            'profile': arguments.profile
+        },
+        'file_mb': file_mb,
+        'results': results,
+        'growth_exponents': growth_exponents(results)
+    }
+
+    output_path = arguments.output
+    if not output_path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output_path = os.path.join(RESULTS_DIR, f"xml-layer-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(output_path, 'w') as file:
+        json.dump(report, file, indent=2)
+
+    baseline = None
+    if arguments.compare:
+        with open(arguments.compare) as file:
+            baseline = json.load(file)
+    print_table(report, baseline)
+    print(f"[BENCHMARK] Results saved to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,13 +7,62 @@ class Config:
     OLLAMA_SERVICE_URL = os.getenv('OLLAMA_SERVICE_URL', 'http://host.docker.internal:11434')
     ENHANCE_PRODUCT_MODEL = os.getenv('ENHANCE_PRODUCT_MODEL', 'aya:8b-23')
     
+    # Several Ollama servers serving the same model, comma separated (defaults to OLLAMA_SERVICE_URL)
+    OLLAMA_SERVICE_URLS = [url.strip() for url in os.getenv('OLLAMA_SERVICE_URLS', OLLAMA_SERVICE_URL).split(',') if url.strip()]
+    OLLAMA_BACKEND_FAILURE_THRESHOLD = int(os.getenv('OLLAMA_BACKEND_FAILURE_THRESHOLD', '3'))  # Failed requests in a row before a backend is taken out
+    OLLAMA_BACKEND_RETRY_SECONDS = float(os.getenv('OLLAMA_BACKEND_RETRY_SECONDS', '30'))  # Time out of rotation before a backend is probed again
+    OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '30m')  # How long the model stays loaded after the last call
+    STARTUP_MODE = os.getenv('STARTUP_MODE', 'background').lower()  # background: serve at once and warm up the model meanwhile, blocking: wait and exit on failure
+    
+    # Translation memory configuration
+    TRANSLATION_MEMORY_ENABLED = os.getenv('TRANSLATION_MEMORY_ENABLED', 'true').lower() == 'true'
+    TRANSLATION_MEMORY_PATH = os.getenv('TRANSLATION_MEMORY_PATH', '/app/cache/translation_memory.sqlite3')
+    TRANSLATION_MEMORY_MAX_ENTRIES = int(os.getenv('TRANSLATION_MEMORY_MAX_ENTRIES', '500000'))
+    PLACEHOLDER_MASKING_ENABLED = os.getenv('PLACEHOLDER_MASKING_ENABLED', 'true').lower() == 'true'  # Numbers, <Alias=...>/<Global=...> tags and %s markers become typed placeholders
+    
+    # Fuzzy translation memory: similar translated strings as prompt examples, optionally reused outright
+    FUZZY_MEMORY_ENABLED = os.getenv('FUZZY_MEMORY_ENABLED', 'true').lower() == 'true'
+    FUZZY_MEMORY_MAX_ENTRIES = int(os.getenv('FUZZY_MEMORY_MAX_ENTRIES', '200000'))
+    FUZZY_MEMORY_EXAMPLES = int(os.getenv('FUZZY_MEMORY_EXAMPLES', '3'))  # Similar translations pasted into single-string prompts
+    FUZZY_MEMORY_MIN_SIMILARITY = float(os.getenv('FUZZY_MEMORY_MIN_SIMILARITY', '0.5'))  # Jaccard similarity of character 3-grams
+    FUZZY_MEMORY_REUSE_THRESHOLD = float(os.getenv('FUZZY_MEMORY_REUSE_THRESHOLD', '0'))  # Reuse a translation without a model call at or above it, 0 disables
+    
+    # Packed prompts: short strings translated together in one call (1 disables packing)
+    TRANSLATION_PACK_MAX_STRINGS = int(os.getenv('TRANSLATION_PACK_MAX_STRINGS', '24'))
+    TRANSLATION_PACK_TOKEN_BUDGET = int(os.getenv('TRANSLATION_PACK_TOKEN_BUDGET', '400'))
+    TRANSLATION_PACK_MAX_STRING_TOKENS = int(os.getenv('TRANSLATION_PACK_MAX_STRING_TOKENS', '24'))
+    
+    # Model calls in flight across every job at once, match OLLAMA_NUM_PARALLEL summed over the backends
+    INFERENCE_CONCURRENCY = int(os.getenv('INFERENCE_CONCURRENCY', '4'))
+    
+    # asyncio pipeline: translations run as tasks on one event loop instead of one thread each
+    ASYNC_PIPELINE_ENABLED = os.getenv('ASYNC_PIPELINE_ENABLED', 'false').lower() == 'true'
+    ASYNC_MAX_IN_FLIGHT = int(os.getenv('ASYNC_MAX_IN_FLIGHT', '256'))  # Pending translations per batch, model calls stay capped by INFERENCE_CONCURRENCY
+    TRANSLATION_TIMEOUT_SECONDS = float(os.getenv('TRANSLATION_TIMEOUT_SECONDS', '300'))  # Async model calls taking longer are cancelled
+    
+    # Generation limits: output capped relative to the source length, greedy decoding, streamed answers cut once complete
+    GENERATION_TEMPERATURE = float(os.getenv('GENERATION_TEMPERATURE', '0'))
+    GENERATION_TOKENS_PER_SOURCE_TOKEN = float(os.getenv('GENERATION_TOKENS_PER_SOURCE_TOKEN', '2.5'))
+    GENERATION_EXTRA_TOKENS = int(os.getenv('GENERATION_EXTRA_TOKENS', '24'))  # Added per string on top of the proportional cap
+    GENERATION_STREAMING = os.getenv('GENERATION_STREAMING', 'true').lower() == 'true'
+    PROMPT_MODE = os.getenv('PROMPT_MODE', 'generate').lower()  # generate: instructions in every prompt, chat: fixed system prompt per record type the backend keeps cached
+    
     # Flask configuration
     FLASK_ENV = os.getenv('OLLAMA_API_SERVICE_ENV', 'development')
     FLASK_DEBUG = os.getenv('OLLAMA_API_SERVICE_DEBUG', 'true').lower() == 'true'
     
+    # Production serving (gunicorn -c gunicorn.conf.py wsgi:app): worker processes share the job store
+    WEB_WORKERS = int(os.getenv('WEB_WORKERS', '4'))
+    WEB_THREADS = int(os.getenv('WEB_THREADS', '16'))  # Requests per worker at once, progress streams hold one each
+    JOB_STORE_PATH = os.getenv('JOB_STORE_PATH', '/app/cache/jobs.sqlite3')  # Jobs, stop requests and file leases of every worker
+    JOB_HEARTBEAT_SECONDS = float(os.getenv('JOB_HEARTBEAT_SECONDS', '2'))  # How often a worker renews its jobs, stores their progress and claims queued ones
+    JOB_LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '60'))  # Jobs whose worker stopped renewing them for this long are queued again
+    
     # File paths configuration
     INPUT_FILE_PATH = os.getenv('INPUT_FILE_PATH', '/app/data/english_text.txt')
     OUTPUT_FILE_PATH = os.getenv('OUTPUT_FILE_PATH', '/app/data/romanian_text.txt')
+    TEXT_CHECKPOINT_EVERY = int(os.getenv('TEXT_CHECKPOINT_EVERY', '50'))  # Lines translated between output fsyncs and cursor saves
+    TEXT_TRANSLATION_WORKERS = int(os.getenv('TEXT_TRANSLATION_WORKERS', '1'))  # Lines translated at once by /process-all without the async pipeline
     
     # XML file paths configuration
     XML_INPUT_FILE_PATH = os.getenv('XML_INPUT_FILE_PATH', '/app/original_fallout_files/Fallout4_en_fr.xml')
@@ -21,17 +70,45 @@ class Config:
     
     # XML processing configuration
     XML_MAX_ENTRIES_TO_TRANSLATE = int(os.getenv('XML_MAX_ENTRIES_TO_TRANSLATE', '0'))  # 0 means no limit
+    XML_OUTPUT_FLUSH_EVERY = int(os.getenv('XML_OUTPUT_FLUSH_EVERY', '50'))  # Entries buffered before each output flush
+    XML_JOURNAL_FSYNC_EVERY = int(os.getenv('XML_JOURNAL_FSYNC_EVERY', '32'))  # Journal records grouped per fsync
+    XML_TRANSLATION_WORKERS = int(os.getenv('XML_TRANSLATION_WORKERS', '1'))  # Translations kept in flight, match OLLAMA_NUM_PARALLEL
+    XML_SCHEDULER_BUCKETS = [int(bound) for bound in os.getenv('XML_SCHEDULER_BUCKETS', '8,24,96,384').split(',') if bound.strip()]  # Upper token bounds of the length buckets
+    XML_SCHEDULER_LOOKAHEAD = int(os.getenv('XML_SCHEDULER_LOOKAHEAD', '512'))  # Entries read ahead and bucketed before being written
+    
+    # XML job queue configuration
+    XML_JOBS_BASE_DIR = os.getenv('XML_JOBS_BASE_DIR', '')  # Job files must live under it, empty means the folder of XML_INPUT_FILE_PATH
+    XML_MAX_CONCURRENT_JOBS = int(os.getenv('XML_MAX_CONCURRENT_JOBS', '2'))
     
     def print_config(self):
         """Print configuration for debugging."""
         print(" ")
         print(f"[FILES-TRANSLATOR] Using OLLAMA_SERVICE_URL: {self.OLLAMA_SERVICE_URL}")
-        print(f"[FILES-TRANSLATOR] Using ENHANCE_PRODUCT_MODEL: {self.ENHANCE_PRODUCT_MODEL}")
+        print(f"[FILES-TRANSLATOR] Using Ollama backends: {', '.join(self.OLLAMA_SERVICE_URLS)} (out after {self.OLLAMA_BACKEND_FAILURE_THRESHOLD} failures, retried after {self.OLLAMA_BACKEND_RETRY_SECONDS}s)")
+        print(f"[FILES-TRANSLATOR] Using ENHANCE_PRODUCT_MODEL: {self.ENHANCE_PRODUCT_MODEL} (keep alive {self.OLLAMA_KEEP_ALIVE})")
+        print(f"[FILES-TRANSLATOR] Startup mode: {self.STARTUP_MODE}")
+        print(f"[FILES-TRANSLATOR] Translation memory: {self.TRANSLATION_MEMORY_PATH if self.TRANSLATION_MEMORY_ENABLED else 'disabled'} (max {self.TRANSLATION_MEMORY_MAX_ENTRIES} entries)")
+        print(f"[FILES-TRANSLATOR] Placeholder masking: {'enabled' if self.PLACEHOLDER_MASKING_ENABLED else 'disabled'}")
+        print(f"[FILES-TRANSLATOR] Fuzzy memory: {'enabled' if self.FUZZY_MEMORY_ENABLED else 'disabled'} (max {self.FUZZY_MEMORY_MAX_ENTRIES} pairs, {self.FUZZY_MEMORY_EXAMPLES} examples above {self.FUZZY_MEMORY_MIN_SIMILARITY}, reuse threshold {self.FUZZY_MEMORY_REUSE_THRESHOLD or 'off'})")
+        print(f"[FILES-TRANSLATOR] Packed prompts: up to {self.TRANSLATION_PACK_MAX_STRINGS} strings of at most {self.TRANSLATION_PACK_MAX_STRING_TOKENS} tokens, {self.TRANSLATION_PACK_TOKEN_BUDGET} tokens per pack")
+        print(f"[FILES-TRANSLATOR] Inference concurrency: {self.INFERENCE_CONCURRENCY} model calls")
+        print(f"[FILES-TRANSLATOR] Async pipeline: {'enabled' if self.ASYNC_PIPELINE_ENABLED else 'disabled'} (up to {self.ASYNC_MAX_IN_FLIGHT} in flight, {self.TRANSLATION_TIMEOUT_SECONDS}s timeout)")
+        print(f"[FILES-TRANSLATOR] Generation: temperature {self.GENERATION_TEMPERATURE}, up to {self.GENERATION_TOKENS_PER_SOURCE_TOKEN}x source tokens + {self.GENERATION_EXTRA_TOKENS}, streaming {'on' if self.GENERATION_STREAMING else 'off'}")
+        print(f"[FILES-TRANSLATOR] Prompt mode: {self.PROMPT_MODE}")
         print(f"[FILES-TRANSLATOR] Flask environment: {self.FLASK_ENV}")
         print(f"[FILES-TRANSLATOR] Flask debug mode: {self.FLASK_DEBUG}")
+        print(f"[FILES-TRANSLATOR] Production serving: {self.WEB_WORKERS} workers x {self.WEB_THREADS} threads")
+        print(f"[FILES-TRANSLATOR] Job store: {self.JOB_STORE_PATH} (heartbeat every {self.JOB_HEARTBEAT_SECONDS}s, lease {self.JOB_LEASE_SECONDS}s)")
         print(f"[FILES-TRANSLATOR] Input file path: {self.INPUT_FILE_PATH}")
         print(f"[FILES-TRANSLATOR] Output file path: {self.OUTPUT_FILE_PATH}")
+        print(f"[FILES-TRANSLATOR] Text checkpoint every: {self.TEXT_CHECKPOINT_EVERY} lines")
+        print(f"[FILES-TRANSLATOR] Text translation workers: {self.TEXT_TRANSLATION_WORKERS}")
         print(f"[FILES-TRANSLATOR] XML input file path: {self.XML_INPUT_FILE_PATH}")
         print(f"[FILES-TRANSLATOR] XML output file path: {self.XML_OUTPUT_FILE_PATH}")
         print(f"[FILES-TRANSLATOR] XML max entries to translate: {self.XML_MAX_ENTRIES_TO_TRANSLATE} (0 = no limit)")
+        print(f"[FILES-TRANSLATOR] XML output flush every: {self.XML_OUTPUT_FLUSH_EVERY} entries")
+        print(f"[FILES-TRANSLATOR] XML journal fsync every: {self.XML_JOURNAL_FSYNC_EVERY} records")
+        print(f"[FILES-TRANSLATOR] XML translation workers: {self.XML_TRANSLATION_WORKERS}")
+        print(f"[FILES-TRANSLATOR] XML scheduler buckets: {self.XML_SCHEDULER_BUCKETS} tokens, lookahead {self.XML_SCHEDULER_LOOKAHEAD} entries")
+        print(f"[FILES-TRANSLATOR] XML jobs: base dir {self.XML_JOBS_BASE_DIR or os.path.dirname(self.XML_INPUT_FILE_PATH)}, up to {self.XML_MAX_CONCURRENT_JOBS} running at once")
         print(" ")
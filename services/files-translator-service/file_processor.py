@@ -1,72 +1,98 @@
 """File processing utilities for basic text files."""
 
 import os
+import threading
+import time
+from itertools import islice
+from config import Config
 from services import ai_service
+from async_services import async_ai_service
+from line_reader import LineReader, LineProgressCursor, LineCounter
+from progress import ProgressTracker
+from metrics import file_io_seconds, timed_iter
+from translation_pool import TranslationPool
+
+read_seconds = file_io_seconds.labels('text', 'read')
+write_seconds = file_io_seconds.labels('text', 'write')
 
 class FileProcessor:
-    """Handles basic text file processing operations."""
+    """Handles basic text file processing operations.
+    
+    The input file is read once from a persisted byte-offset cursor instead
+    of being rewritten without its first line after every translation.
+    """
     
     def __init__(self, input_path, output_path):
         self.input_path = input_path
         self.output_path = output_path
+        self.reader = LineReader(input_path)
+        self.cursor = LineProgressCursor(input_path)
+        self.input_lines = LineCounter(input_path)
+        self.output_lines = LineCounter(output_path)
+        self.processing_lock = threading.Lock()
+        self.stop_requested = False
+        self.progress = ProgressTracker('lines')
     
-    def read_first_line(self):
-        """Read the first line from the input file."""
+    def read_next_line(self):
+        """Return (end offset, text) of the next unprocessed line, or None at the end of the input."""
         try:
             if not os.path.exists(self.input_path):
                 print(f"[FILE-PROCESSOR] Input file not found: {self.input_path}")
                 return None
             
-            with open(self.input_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-                if lines:
-                    return lines[0].strip()
-            
-            return None
+            self.cursor.load()
+            return next(self.reader.iter_lines(self.cursor.offset), None)
         except Exception as e:
             print(f"[FILE-PROCESSOR] Error reading from file {self.input_path}: {str(e)}")
             return None
-
-    def remove_first_line(self):
-        """Remove the first line from the input file."""
-        try:
-            if not os.path.exists(self.input_path):
-                return False
-            
-            with open(self.input_path, 'r', encoding='utf-8') as file:
-                lines = file.readlines()
-            
-            if lines:
-                # Remove the first line and write back
-                with open(self.input_path, 'w', encoding='utf-8') as file:
-                    file.writelines(lines[1:])
-                return True
-            return False
-        except Exception as e:
-            print(f"[FILE-PROCESSOR] Error removing line from file {self.input_path}: {str(e)}")
-            return False
-
-    def append_to_output(self, text):
-        """Append translated text to the output file."""
-        try:
+    
+    def open_output(self, buffering=-1):
+        """Open the output file for appending, dropping lines written after the last checkpoint."""
+        output_dir = os.path.dirname(self.output_path)
+        if output_dir:
             # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
-            
-            with open(self.output_path, 'a', encoding='utf-8') as file:
-                file.write(text + '\n')
+            os.makedirs(output_dir, exist_ok=True)
+        
+        output_file = open(self.output_path, 'ab', buffering=buffering)
+        if self.cursor.output_size is not None:
+            output_size = output_file.seek(0, os.SEEK_END)
+            if output_size < self.cursor.output_size:
+                # The output lost lines the cursor already counted (e.g. it was deleted), start over
+                print(f"[FILE-PROCESSOR] Output file is shorter than the last checkpoint, restarting from the first line")
+                self.cursor.reset()
+            elif output_size > self.cursor.output_size:
+                # Lines written after the last checkpoint are translated again
+                output_file.truncate(self.cursor.output_size)
+        return output_file
+    
+    def save_checkpoint(self, output_file):
+        """Make the output durable, then persist the cursor together with the output size it corresponds to."""
+        output_file.flush()
+        os.fsync(output_file.fileno())
+        self.cursor.output_size = output_file.tell()
+        self.cursor.save()
+    
+    def commit_line(self, end_offset, text):
+        """Append a translated line (None for a skipped one) and move the cursor past it."""
+        try:
+            with self.open_output() as output_file:
+                if text is not None:
+                    output_file.write((text + '\n').encode('utf-8'))
+                self.cursor.advance(end_offset)
+                self.save_checkpoint(output_file)
             return True
         except Exception as e:
             print(f"[FILE-PROCESSOR] Error writing to file {self.output_path}: {str(e)}")
             return False
     
     def count_lines(self, file_path):
-        """Count lines in a file."""
+        """Count lines in a file, from the in-memory counters for the input and output files."""
         try:
-            if not os.path.exists(file_path):
-                return 0
-            
-            with open(file_path, 'r', encoding='utf-8') as file:
-                return len(file.readlines())
+            if file_path == self.input_path:
+                return self.input_lines.count()
+            if file_path == self.output_path:
+                return self.output_lines.count()
+            return LineCounter(file_path).count()
         except Exception as e:
             print(f"[FILE-PROCESSOR] Error counting lines in {file_path}: {str(e)}")
             return 0
@@ -76,7 +102,13 @@ class FileProcessor:
         input_exists = os.path.exists(self.input_path)
         output_exists = os.path.exists(self.output_path)
         
-        lines_remaining = self.count_lines(self.input_path) if input_exists else 0
+        lines_remaining = 0
+        if input_exists:
+            # A running batch owns the cursor and keeps it current
+            if not self.processing_lock.locked():
+                self.cursor.load()
+            lines_remaining = max(0, self.count_lines(self.input_path) - self.cursor.entries_done)
+        # Output lines count once they are checkpointed to disk
         lines_translated = self.count_lines(self.output_path) if output_exists else 0
         
         return {
@@ -88,66 +120,167 @@ class FileProcessor:
             "lines_translated": lines_translated
         }
     
+    def processing_busy(self):
+        """Error result for a request arriving while another one is processing the file."""
+        return {
+            "status": "error",
+            "error": "Processing is already running",
+            "details": "Please wait for the current processing to complete before starting another one."
+        }
+    
     def process_next_line(self):
         """Process the next line from input file."""
-        english_text = self.read_first_line()
-        
-        if english_text is None:
-            return {"status": "completed", "message": "No more lines to process"}
-        
-        if not english_text:  # Empty line
-            self.remove_first_line()
-            return {"status": "skipped", "message": "Skipped empty line"}
+        if not self.processing_lock.acquire(blocking=False):
+            return self.processing_busy()
         
-        print(f"[FILE-PROCESSOR] Processing line: {english_text}")
-        
-        # Translate the text
-        romanian_text = ai_service.translate_text(english_text)
-        
-        if romanian_text is None:
-            return {"status": "error", "error": "Translation failed", "input": english_text}
-        
-        print(f"[FILE-PROCESSOR] Translation: {romanian_text}")
-        
-        # Append to output file
-        if not self.append_to_output(romanian_text):
-            return {"status": "error", "error": "Failed to write to output file"}
+        try:
+            next_line = self.read_next_line()
+            
+            if next_line is None:
+                return {"status": "completed", "message": "No more lines to process"}
+            
+            end_offset, english_text = next_line
+            
+            if not english_text:  # Empty line
+                self.commit_line(end_offset, None)
+                return {"status": "skipped", "message": "Skipped empty line"}
+            
+            print(f"[FILE-PROCESSOR] Processing line: {english_text}")
+            
+            # Translate the text
+            romanian_text = ai_service.translate_text(english_text)
+            
+            if romanian_text is None:
+                return {"status": "error", "error": "Translation failed", "input": english_text}
+            
+            print(f"[FILE-PROCESSOR] Translation: {romanian_text}")
+            
+            # Append to output file and move the cursor past the processed line
+            if not self.commit_line(end_offset, romanian_text):
+                return {"status": "error", "error": "Failed to write to output file"}
+            
+            return {
+                "status": "success",
+                "input": english_text,
+                "output": romanian_text,
+                "input_file_path": self.input_path,
+                "output_file_path": self.output_path
+            }
+        finally:
+            self.processing_lock.release()
+    
+    def translate_lines(self, texts, pool=None):
+        """Translate a window of lines, concurrently on the async pipeline or the worker pool."""
+        if Config.ASYNC_PIPELINE_ENABLED:
+            return async_ai_service.run(async_ai_service.translate_many(texts))
+        if pool is not None:
+            futures = [pool.submit(text) for text in texts]
+            return [future.result() for future in futures]
+        return [ai_service.translate_text(text) for text in texts]
+    
+    def process_all_lines(self, workers=None, fence=None):
+        """Process all remaining lines in one pass over the input file.
         
-        # Remove the processed line from input file
-        if not self.remove_first_line():
-            return {"status": "error", "error": "Failed to remove processed line from input file"}
+        fence, given by a job manager, tells whether this process still drives
+        the job; no line or checkpoint is written once it says no.
+        """
+        if not self.processing_lock.acquire(blocking=False):
+            return self.processing_busy()
         
-        return {
-            "status": "success",
-            "input": english_text,
-            "output": romanian_text,
-            "input_file_path": self.input_path,
-            "output_file_path": self.output_path
-        }
-    
-    def process_all_lines(self):
-        """Process all remaining lines in the input file."""
         processed_count = 0
         skipped_count = 0
         errors = []
+        output_file = None
+        pool = None
+        stopped = False
+        lost = False
+        outcome = 'failed'
+        
+        # The async pipeline translates a window of lines at once, the synchronous one a line per worker
+        workers = max(1, workers or Config.TEXT_TRANSLATION_WORKERS)
+        window_size = max(1, Config.ASYNC_MAX_IN_FLIGHT) if Config.ASYNC_PIPELINE_ENABLED else workers
         
-        while True:
-            result = self.process_next_line()
+        try:
+            if not Config.ASYNC_PIPELINE_ENABLED and workers > 1:
+                pool = TranslationPool(ai_service.translate_text, workers)
+            
+            self.cursor.load()
+            # Unbuffered, so a job taken over by another process leaves nothing behind to flush
+            output_file = self.open_output(buffering=0 if fence is not None else -1)
+            lines = timed_iter(self.reader.iter_lines(self.cursor.offset), read_seconds)
+            stop = False
+            self.progress.start(max(0, self.count_lines(self.input_path) - self.cursor.entries_done))
+            
+            while not stop:
+                if self.stop_requested:
+                    print(f"[FILE-PROCESSOR] Processing stopped by request after {processed_count} lines")
+                    stopped = True
+                    break
+                
+                window = list(islice(lines, window_size))
+                if not window:
+                    break
+                
+                # Translate the window, then commit it line by line in order
+                translations = iter(self.translate_lines([text for _, text in window if text], pool))
+                
+                for end_offset, english_text in window:
+                    if not english_text:  # Empty line
+                        self.cursor.advance(end_offset)
+                        skipped_count += 1
+                        self.progress.add('skipped')
+                        continue
+                    
+                    romanian_text = next(translations)
+                    if romanian_text is None:
+                        # Leave the cursor on the line so the next run retries it
+                        errors.append("Translation failed")
+                        self.progress.add('errors')
+                        stop = True
+                        break
+                    
+                    if fence is not None and not fence():
+                        print(f"[FILE-PROCESSOR] Another process took over the job writing {self.output_path}, no longer writing to it")
+                        errors.append("Another process took over the job")
+                        lost = True
+                        stop = True
+                        break
+                    
+                    started = time.perf_counter()
+                    try:
+                        output_file.write((romanian_text + '\n').encode('utf-8'))
+                    except Exception as e:
+                        print(f"[FILE-PROCESSOR] Error writing to file {self.output_path}: {str(e)}")
+                        errors.append("Failed to write to output file")
+                        self.progress.add('errors')
+                        stop = True
+                        break
+                    
+                    self.cursor.advance(end_offset)
+                    processed_count += 1
+                    self.progress.add('processed')
+                    print(f"[FILE-PROCESSOR] Successfully processed {processed_count} lines")
+                    
+                    if processed_count % max(1, Config.TEXT_CHECKPOINT_EVERY) == 0:
+                        self.save_checkpoint(output_file)
+                    write_seconds.observe(time.perf_counter() - started)
             
-            if result["status"] == "completed":
-                break
-            elif result["status"] == "skipped":
-                skipped_count += 1
-            elif result["status"] == "success":
-                processed_count += 1
-                print(f"[FILE-PROCESSOR] Successfully processed {processed_count} lines")
-            elif result["status"] == "error":
-                errors.append(result.get("error", "Unknown error"))
-                if "Failed to remove processed line" in result.get("error", ""):
-                    break  # Stop on critical error
+            outcome = 'failed' if errors else ('stopped' if stopped else 'completed')
+        finally:
+            try:
+                if pool is not None:
+                    pool.shutdown(cancel_pending=True)
+                if output_file is not None:
+                    if not lost:
+                        self.save_checkpoint(output_file)
+                    output_file.close()
+            finally:
+                self.progress.finish(outcome)
+                self.stop_requested = False
+                self.processing_lock.release()
         
         return {
-            "status": "completed",
+            "status": "stopped" if stopped else "completed",
             "processed_count": processed_count,
             "skipped_count": skipped_count,
             "errors": errors,
@@ -0,0 +1,168 @@
+"""In-memory MinHash index of translated strings for near-duplicate lookups."""
+
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from operator import eq
+from translation_memory import normalize_source_text
+
+SHINGLE_SIZE = 3
+
+# Python's string hash; the index lives in one process, so its per-process seed does not matter
+HASH_BITS = 64
+
+
+def shingles(text):
+    """Character 3-grams of the lowercased, normalized text."""
+    text = normalize_source_text(text).lower()
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[index:index + SHINGLE_SIZE] for index in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+class FuzzyTranslationIndex:
+    """Source/translation pairs findable by the Jaccard similarity of their source text.
+
+    Each source is reduced to a one permutation MinHash signature of
+    bands x rows slots and filed under one bucket per band (locality
+    sensitive hashing), so a lookup only looks at the pairs sharing a bucket
+    with the query instead of every stored pair. Buckets of common short
+    strings grow large, so only their most recent max_bucket_scan pairs are
+    counted. The max_candidates pairs sharing the most bands are ranked by
+    how many signature slots they share with the query, and only the best
+    max_scored of them are compared by exact Jaccard similarity of their
+    3-gram sets.
+    """
+
+    def __init__(self, bands=10, rows=5, max_entries=200000, max_candidates=32, max_scored=8, max_bucket_scan=128):
+        self.bands = bands
+        self.rows = rows
+        self.max_entries = max_entries
+        self.max_candidates = max_candidates
+        self.max_scored = max_scored
+        self.max_bucket_scan = max_bucket_scan
+        self.lock = threading.Lock()
+
+        # Each signature slot takes the smallest 3-gram hash falling into its share of the hash range
+        slots = bands * rows
+        self.slot_bounds = [-(-(slot << HASH_BITS) // slots) - (1 << (HASH_BITS - 1)) for slot in range(slots + 1)]
+
+        self.sources = []
+        self.translations = []
+        self.shingles = []
+        self.signatures = []
+        self.ids_by_source = {}
+        self.buckets = {}
+        self.seeded_paths = set()
+        self.full_logged = False
+
+        self.lookups = 0
+        self.lookup_seconds = 0.0
+
+    def __len__(self):
+        return len(self.sources)
+
+    def _signature(self, grams):
+        """One permutation MinHash signature of a 3-gram set: each 3-gram is hashed once."""
+        hashes = sorted(map(hash, grams))
+        count = len(hashes)
+        signature = []
+        for start, end in zip(self.slot_bounds, self.slot_bounds[1:]):
+            position = bisect_left(hashes, start)
+            signature.append(hashes[position] if position < count and hashes[position] < end else None)
+
+        # Short texts leave slots empty; each takes the hash of the next filled slot, wrapping around
+        if None in signature:
+            slots = len(signature)
+            following = None
+            for position in range(2 * slots - 1, -1, -1):
+                value = signature[position % slots]
+                if value is None:
+                    signature[position % slots] = following
+                else:
+                    following = value
+        return signature
+
+    def _band_keys(self, signature):
+        """One bucket key per band of the signature."""
+        return [(band, tuple(signature[band * self.rows:(band + 1) * self.rows])) for band in range(self.bands)]
+
+    def add(self, source_text, translated_text):
+        """Store or update a pair; returns False once the index is full."""
+        if not source_text.strip() or not translated_text:
+            return False
+
+        key = normalize_source_text(source_text)
+        with self.lock:
+            entry_id = self.ids_by_source.get(key)
+            if entry_id is not None:
+                self.translations[entry_id] = translated_text
+                return True
+
+            if len(self.sources) >= self.max_entries:
+                if not self.full_logged:
+                    print(f"[FUZZY-MEMORY] Index is full ({self.max_entries} pairs), new translations are no longer added")
+                    self.full_logged = True
+                return False
+
+        # Hash outside the lock, it is the expensive part
+        grams = shingles(source_text)
+        signature = self._signature(grams)
+        band_keys = self._band_keys(signature)
+
+        with self.lock:
+            if key in self.ids_by_source:
+                return True
+            entry_id = len(self.sources)
+            self.sources.append(source_text)
+            self.translations.append(translated_text)
+            self.shingles.append(frozenset(grams))
+            self.signatures.append(array('q', signature))
+            self.ids_by_source[key] = entry_id
+            for band_key in band_keys:
+                self.buckets.setdefault(band_key, []).append(entry_id)
+        return True
+
+    def find_similar(self, source_text, limit=3, min_similarity=0.0):
+        """Up to limit (similarity, source, translation) tuples, most similar first."""
+        started = time.perf_counter()
+        grams = shingles(source_text)
+        signature = self._signature(grams)
+        band_keys = self._band_keys(signature)
+
+        with self.lock:
+            # Pairs sharing more bands with the query are the likelier near-duplicates
+            band_hits = Counter()
+            for band_key in band_keys:
+                band_hits.update(self.buckets.get(band_key, ())[-self.max_bucket_scan:])
+
+            # Shared signature slots estimate the similarity, only the best estimates are compared exactly
+            candidates = [(sum(map(eq, signature, self.signatures[entry_id])), entry_id)
+                          for entry_id, _ in band_hits.most_common(self.max_candidates)]
+            candidates.sort(reverse=True)
+
+            matches = []
+            for _, entry_id in candidates[:self.max_scored]:
+                candidate = self.shingles[entry_id]
+                shared = len(grams & candidate)
+                similarity = shared / (len(grams) + len(candidate) - shared)
+                if similarity >= min_similarity:
+                    matches.append((similarity, self.sources[entry_id], self.translations[entry_id]))
+
+            self.lookups += 1
+            self.lookup_seconds += time.perf_counter() - started
+
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches[:limit]
+
+    def stats(self):
+        """Size and lookup cost of the index."""
+        with self.lock:
+            return {
+                "entries": len(self.sources),
+                "max_entries": self.max_entries,
+                "lookups": self.lookups,
+                "average_lookup_ms": round(self.lookup_seconds * 1000 / self.lookups, 3) if self.lookups else 0.0
+            }
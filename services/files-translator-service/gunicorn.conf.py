@@ -0,0 +1,17 @@
+"""Gunicorn settings of the production serving mode: gunicorn -c gunicorn.conf.py wsgi:app"""
+
+from config import Config
+
+bind = '0.0.0.0:5000'
+workers = Config.WEB_WORKERS
+
+# Threaded workers: progress streams stay open for hours, and a busy worker still heartbeats the arbiter
+worker_class = 'gthread'
+threads = Config.WEB_THREADS
+timeout = 120
+graceful_timeout = 30
+
+# Each worker imports the app itself, so it opens its own job store connection and starts its own job keeper
+preload_app = False
+
+accesslog = '-'
@@ -0,0 +1,91 @@
+"""Cap on concurrent model calls shared by worker threads and event loop tasks."""
+
+import asyncio
+import threading
+from collections import deque
+
+
+class InferenceBudget:
+    """INFERENCE_CONCURRENCY slots for model calls, from threads and coroutines alike.
+
+    Threads take a slot with `with budget:`, coroutines with `async with budget:`
+    and wait without holding a thread. A released slot is handed to the longest
+    waiting caller of either kind, so the synchronous and the async pipelines
+    together never run more model calls than there are slots.
+    """
+
+    def __init__(self, slots):
+        self.slots = max(1, slots)
+        self.in_use = 0
+        self.lock = threading.Lock()
+        # threading.Event of a waiting thread or (loop, future) of a waiting coroutine
+        self.waiters = deque()
+
+    def acquire(self):
+        """Block the calling thread until it holds a slot."""
+        with self.lock:
+            if self.in_use < self.slots and not self.waiters:
+                self.in_use += 1
+                return
+            event = threading.Event()
+            self.waiters.append(event)
+        # release() hands its slot over before setting the event
+        event.wait()
+
+    async def acquire_async(self):
+        """Wait on the running loop until the calling task holds a slot."""
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            if self.in_use < self.slots and not self.waiters:
+                self.in_use += 1
+                return
+            waiter = (loop, loop.create_future())
+            self.waiters.append(waiter)
+
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self.lock:
+                handed_over = waiter not in self.waiters
+                if not handed_over:
+                    self.waiters.remove(waiter)
+            if handed_over:
+                # The slot arrived together with the cancellation, pass it on
+                self.release()
+            raise
+
+    def release(self):
+        """Give a slot back, to the next waiter when there is one."""
+        with self.lock:
+            if not self.waiters:
+                self.in_use -= 1
+                return
+            waiter = self.waiters.popleft()
+
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            loop.call_soon_threadsafe(wake, future)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.release()
+        return False
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        self.release()
+        return False
+
+
+def wake(future):
+    """Resolve a waiting coroutine's future unless it was cancelled meanwhile."""
+    if not future.done():
+        future.set_result(None)
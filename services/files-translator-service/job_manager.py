@@ -0,0 +1,190 @@
+"""Queue of XML translation jobs running over several input files."""
+
+import os
+import threading
+from config import Config
+from job_store import JobStore, StoredJobManager
+from xml_processor import XMLProcessor
+
+# Options a job may override, with the type they are converted to
+JOB_OPTIONS = {
+    'max_entries_to_translate': int,
+    'workers': int
+}
+
+
+class XMLJobManager(StoredJobManager):
+    """Runs XML translation jobs, a few at a time, each on its own input/output pair.
+
+    Every job gets an ID that can be used to query or cancel it. Jobs beyond
+    XML_MAX_CONCURRENT_JOBS wait in the queue; all running jobs share the
+    inference budget of the AI service, so the model server stays busy when
+    one file runs out of work. The queue lives in the shared job store, so
+    with several server processes each job is driven by exactly one of them.
+    """
+
+    kind = 'xml'
+    log_tag = 'XML-JOBS'
+
+    def __init__(self, store, base_dir, max_concurrent_jobs=1, heartbeat_seconds=2.0):
+        super().__init__(store, max_concurrent_jobs, heartbeat_seconds)
+        self.base_dir = os.path.abspath(base_dir)
+        self.processors = {}
+
+    def get_processor(self, input_path, output_path):
+        """Return the processor of an input/output pair, creating it on first use."""
+        with self.lock:
+            key = (input_path, output_path)
+            if key not in self.processors:
+                self.processors[key] = XMLProcessor(input_path, output_path)
+            return self.processors[key]
+
+    def resolve_path(self, path):
+        """Resolve a job path against the base directory, refusing anything outside it."""
+        resolved = os.path.abspath(os.path.join(self.base_dir, path))
+        if os.path.commonpath([resolved, self.base_dir]) != self.base_dir:
+            raise ValueError(f"Path is outside of {self.base_dir}: {path}")
+        return resolved
+
+    @staticmethod
+    def parse_options(options):
+        """Validate the per-job overrides of the batch configuration."""
+        parsed = {}
+        for name, value in (options or {}).items():
+            if name not in JOB_OPTIONS:
+                raise ValueError(f"Unknown job option: {name}")
+            parsed[name] = JOB_OPTIONS[name](value)
+
+        if parsed.get('workers', 1) < 1:
+            raise ValueError("workers must be at least 1")
+        if parsed.get('max_entries_to_translate', 0) < 0:
+            raise ValueError("max_entries_to_translate must not be negative")
+        return parsed
+
+    def submit(self, input_path, output_path, options=None):
+        """Queue a job translating input_path into output_path, both relative to the base directory."""
+        try:
+            if not input_path or not output_path:
+                raise ValueError("Both input_file_path and output_file_path are required")
+            input_path = self.resolve_path(input_path)
+            output_path = self.resolve_path(output_path)
+        except (TypeError, ValueError) as e:
+            return {"status": "error", "error": "Invalid XML job", "details": str(e)}
+        return self.submit_pair(input_path, output_path, options)
+
+    def submit_pair(self, input_path, output_path, options=None):
+        """Queue a job for an already resolved input/output pair."""
+        try:
+            if input_path == output_path:
+                raise ValueError("The input and output files must differ")
+            if not os.path.exists(input_path):
+                raise ValueError(f"Input file not found: {input_path}")
+            options = self.parse_options(options)
+        except (TypeError, ValueError) as e:
+            return {"status": "error", "error": "Invalid XML job", "details": str(e)}
+
+        return self.queue_job(input_path, output_path, options, {
+            "status": "error",
+            "error": "A job for this file is already queued or running",
+            "details": "Cancel it or wait for it to finish before submitting the file again."
+        })
+
+    def resume_interrupted_job(self, input_path, output_path):
+        """Queue a job for a pair whose last batch was cut short by a crash or restart."""
+        self.start_keeper()
+        processor = self.get_processor(input_path, output_path)
+        if not processor.journal.is_interrupted() or self.store.active_job_for(input_path) is not None:
+            # Never interrupted, or still running (or about to be requeued) as a stored job
+            return None
+
+        print(f"[XML-JOBS] Found an interrupted batch in {processor.journal.path}, resuming it")
+        return self.submit_pair(input_path, output_path)
+
+    def active_job(self, input_path):
+        """The queued or running job of an input file, whichever process drives it."""
+        job = self.store.active_job_for(input_path)
+        return self.describe(job['id']) if job is not None and job['kind'] == self.kind else None
+
+    def get_status(self, input_path, output_path):
+        """Status of a pair, its sidecar indexes only rebuilt when no job or other process holds the files."""
+        processor = self.get_processor(input_path, output_path)
+        with self.file_lease(input_path, output_path) as acquired:
+            # Only the holder of the files may write their indexes; the others read them as stored
+            status = processor.get_status(rebuild_indexes=acquired)
+        # The batch may be driven by another server process
+        status["batch_processing_status"] = self.active_job(input_path) is not None
+        return status
+
+    def process_next_entry(self, input_path, output_path):
+        """Process one entry of a pair, unless a job or another process is working on its files."""
+        with self.file_lease(input_path, output_path) as acquired:
+            if not acquired:
+                return {
+                    "status": "error",
+                    "error": "Batch processing is currently running",
+                    "details": "Please wait for batch processing to complete or stop it before processing individual entries."
+                }
+            return self.get_processor(input_path, output_path).process_next_entry()
+
+    def run_local(self, job):
+        """Start the batch of a claimed job and watch it from another thread."""
+        processor = self.get_processor(job['input_file_path'], job['output_file_path'])
+        # The batch stops writing once another process has requeued and claimed the job
+        result = processor.start_batch_processing(job['options'], fence=self.ownership_check(job['id']))
+
+        if result['status'] != 'success':
+            # Nothing left to translate, or the pair is busy in this process outside the queue
+            status = 'completed' if result['status'] == 'completed' else 'failed'
+            self.finish_local(job['id'], status, message=result.get('message') or result.get('error'))
+            return
+
+        with self.lock:
+            self.local_jobs[job['id']] = processor
+        self.store.set_message(job['id'], result['message'])
+
+        watcher = threading.Thread(target=self._watch_job, args=(job, processor))
+        watcher.daemon = True
+        watcher.start()
+
+    def _watch_job(self, job, processor):
+        """Wait for a running job to finish, then record its result."""
+        processor.batch_thread.join()
+
+        outcome = processor.last_run['outcome'] if processor.last_run else 'error'
+        if self.store.get(job['id'])['cancel_requested']:
+            status = 'cancelled'
+        elif outcome in ('completed', 'stopped'):
+            status = outcome
+        else:
+            status = 'failed'
+        self.finish_local(job['id'], status, processor.last_run)
+
+    def stop_local(self, job_id):
+        with self.lock:
+            processor = self.local_jobs.get(job_id)
+        if processor is not None and processor.batch_processing and not processor.stop_requested:
+            processor.stop_batch_processing()
+
+    def local_tracker(self, job_id):
+        with self.lock:
+            processor = self.local_jobs.get(job_id)
+        return processor.progress if processor is not None else None
+
+    def local_progress(self, job_id):
+        with self.lock:
+            processor = self.local_jobs.get(job_id)
+        if processor is None:
+            return None
+        return {
+            **processor.progress.snapshot(),
+            "entries_remaining": processor.count_remaining_entries(),
+            "entries_translated": processor.count_string_entries(processor.output_path)
+        }
+
+
+# Global XML job manager instance, its queue shared by every server process through the job store
+job_store = JobStore(Config.JOB_STORE_PATH, Config.JOB_LEASE_SECONDS)
+job_manager = XMLJobManager(job_store,
+                            Config.XML_JOBS_BASE_DIR or os.path.dirname(Config.XML_INPUT_FILE_PATH),
+                            Config.XML_MAX_CONCURRENT_JOBS,
+                            Config.JOB_HEARTBEAT_SECONDS)
@@ -0,0 +1,504 @@
+"""Job state shared by every server process, kept in SQLite."""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from progress import DONE_EVENT
+
+ACTIVE_STATUSES = ('queued', 'running')
+FINISHED_STATUSES = ('completed', 'stopped', 'failed', 'cancelled')
+
+# Columns holding JSON documents
+JSON_COLUMNS = ('options', 'progress', 'result')
+
+# A single-step lease outlives any translation; it only expires early when its process died
+FILE_LEASE_SECONDS = 900
+
+# How long a statement waits for another process's write transaction before failing
+BUSY_TIMEOUT_SECONDS = 10
+
+# Heartbeats a job may miss, on top of a heartbeat waiting out the busy timeout, before it is requeued
+MISSED_HEARTBEATS = 5
+
+
+def worker_identity():
+    """Name of this server process, unique across the hosts sharing a job store."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:4]}"
+
+
+class JobStore:
+    """Jobs, their stop requests and progress, and short file leases, in one SQLite file.
+
+    Every server process opens the same file. Queueing a job (which checks
+    that no other job or lease uses its files), claiming one and taking a
+    lease run in IMMEDIATE transactions, so two processes never both win.
+    The process driving a running job renews it with every heartbeat; a job
+    whose driver stopped heartbeating for lease_seconds (it crashed or was
+    recycled) goes back to the queue and resumes from its persisted cursor.
+    """
+
+    def __init__(self, db_path, lease_seconds=60):
+        self.db_path = db_path
+        self.lease_seconds = max(1.0, lease_seconds)
+        self.pid = None
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._open()
+
+    def _open(self):
+        """Open the database for this process; a forked child must not reuse its parent's connection."""
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        # Autocommit mode, transactions are opened explicitly with BEGIN IMMEDIATE
+        self._connection = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                input_file_path TEXT NOT NULL,
+                output_file_path TEXT NOT NULL,
+                options TEXT NOT NULL,
+                submitted_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                owner TEXT,
+                heartbeat_at REAL,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                message TEXT,
+                progress TEXT,
+                result TEXT
+            )
+        ''')
+        self._connection.execute('CREATE INDEX IF NOT EXISTS jobs_kind_status ON jobs (kind, status, submitted_at)')
+        self._connection.execute('''
+            CREATE TABLE IF NOT EXISTS leases (
+                path TEXT PRIMARY KEY,
+                owner TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+
+    @property
+    def lock(self):
+        if self.pid != os.getpid():
+            self._open()
+        return self._lock
+
+    @property
+    def connection(self):
+        if self.pid != os.getpid():
+            self._open()
+        return self._connection
+
+    @contextmanager
+    def transaction(self):
+        """Write transaction holding the database lock from its first statement."""
+        with self.lock:
+            self.connection.execute('BEGIN IMMEDIATE')
+            try:
+                yield self.connection
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+            self.connection.execute('COMMIT')
+
+    @staticmethod
+    def _to_job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        for column in JSON_COLUMNS:
+            job[column] = json.loads(job[column]) if job[column] is not None else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def get(self, job_id):
+        """A job by ID, None when unknown."""
+        with self.lock:
+            row = self.connection.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_job(row)
+
+    def list(self, kind):
+        """Every job of a kind, oldest first."""
+        with self.lock:
+            rows = self.connection.execute('SELECT * FROM jobs WHERE kind = ? ORDER BY submitted_at',
+                                           (kind,)).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def queue_position(self, job):
+        """1-based place of a queued job among the queued jobs of its kind."""
+        with self.lock:
+            ahead = self.connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE kind = ? AND status = 'queued' AND submitted_at < ?",
+                (job['kind'], job['submitted_at'])).fetchone()[0]
+        return ahead + 1
+
+    def active_job_for(self, path):
+        """The queued or running job reading or writing path, if any."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') "
+                "AND (input_file_path = ? OR output_file_path = ?) ORDER BY submitted_at LIMIT 1",
+                (path, path)).fetchone()
+        return self._to_job(row)
+
+    def _paths_busy(self, connection, paths, owner=None):
+        """Whether an active job, or a lease of another owner, holds one of paths; inside a transaction."""
+        now = time.time()
+        for path in paths:
+            if connection.execute(
+                    "SELECT 1 FROM jobs WHERE status IN ('queued', 'running') "
+                    "AND (input_file_path = ? OR output_file_path = ?) LIMIT 1", (path, path)).fetchone():
+                return True
+            lease = connection.execute('SELECT owner, expires_at FROM leases WHERE path = ?', (path,)).fetchone()
+            if lease is not None and lease['owner'] != owner and lease['expires_at'] > now:
+                return True
+        return False
+
+    def create(self, kind, input_path, output_path, options):
+        """Queue a job, or return None when another job or a lease holds one of its files."""
+        job_id = uuid.uuid4().hex[:8]
+        with self.transaction() as connection:
+            if self._paths_busy(connection, (input_path, output_path)):
+                return None
+            connection.execute('''
+                INSERT INTO jobs (id, kind, status, input_file_path, output_file_path, options, submitted_at)
+                VALUES (?, ?, 'queued', ?, ?, ?, ?)
+            ''', (job_id, kind, input_path, output_path, json.dumps(options), time.time()))
+        return self.get(job_id)
+
+    def claim_next(self, kind, owner, max_running):
+        """Mark the oldest queued job of a kind as driven by owner, while fewer than max_running run."""
+        with self.transaction() as connection:
+            running = connection.execute("SELECT COUNT(*) FROM jobs WHERE kind = ? AND status = 'running'",
+                                         (kind,)).fetchone()[0]
+            if running >= max_running:
+                return None
+
+            row = connection.execute("SELECT id FROM jobs WHERE kind = ? AND status = 'queued' "
+                                     "ORDER BY submitted_at LIMIT 1", (kind,)).fetchone()
+            if row is None:
+                return None
+
+            now = time.time()
+            connection.execute('''
+                UPDATE jobs SET status = 'running', owner = ?, heartbeat_at = ?, started_at = COALESCE(started_at, ?)
+                WHERE id = ?
+            ''', (owner, now, now, row['id']))
+        return self.get(row['id'])
+
+    def heartbeat(self, job_id, owner, progress=None):
+        """Renew a running job of owner and store its progress; None when owner no longer drives it."""
+        with self.lock:
+            cursor = self.connection.execute('''
+                UPDATE jobs SET heartbeat_at = ?, progress = COALESCE(?, progress)
+                WHERE id = ? AND owner = ? AND status = 'running'
+            ''', (time.time(), json.dumps(progress) if progress is not None else None, job_id, owner))
+        if cursor.rowcount == 0:
+            return None
+        return self.get(job_id)
+
+    def finish(self, job_id, owner, status, result=None, message=None, progress=None):
+        """Record the outcome of a job owner was driving."""
+        with self.lock:
+            self.connection.execute('''
+                UPDATE jobs SET status = ?, finished_at = ?, result = ?, message = COALESCE(?, message),
+                                progress = COALESCE(?, progress), heartbeat_at = NULL
+                WHERE id = ? AND owner = ?
+            ''', (status, time.time(), json.dumps(result) if result is not None else None, message,
+                  json.dumps(progress) if progress is not None else None, job_id, owner))
+
+    def set_message(self, job_id, message):
+        with self.lock:
+            self.connection.execute('UPDATE jobs SET message = ? WHERE id = ?', (message, job_id))
+
+    def request_cancel(self, job_id):
+        """Cancel a queued job at once, or flag a running one for the process driving it."""
+        with self.transaction() as connection:
+            row = connection.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is not None and row['status'] == 'queued':
+                connection.execute("UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? "
+                                   "WHERE id = ?", (time.time(), job_id))
+            elif row is not None and row['status'] == 'running':
+                connection.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (job_id,))
+        return self.get(job_id)
+
+    def requeue_stale(self, kind):
+        """Put running jobs whose driver stopped heartbeating back in the queue; returns their IDs."""
+        deadline = time.time() - self.lease_seconds
+        with self.transaction() as connection:
+            rows = connection.execute("SELECT id, cancel_requested FROM jobs WHERE kind = ? AND status = 'running' "
+                                      "AND heartbeat_at < ?", (kind, deadline)).fetchall()
+            for row in rows:
+                if row['cancel_requested']:
+                    # It was being stopped anyway
+                    connection.execute("UPDATE jobs SET status = 'cancelled', owner = NULL, finished_at = ? "
+                                       "WHERE id = ?", (time.time(), row['id']))
+                else:
+                    connection.execute("UPDATE jobs SET status = 'queued', owner = NULL, heartbeat_at = NULL "
+                                       "WHERE id = ?", (row['id'],))
+        return [row['id'] for row in rows if not row['cancel_requested']]
+
+    def acquire_lease(self, paths, owner, seconds=FILE_LEASE_SECONDS):
+        """Hold paths for a single-step operation unless a job or another lease uses them."""
+        with self.transaction() as connection:
+            if self._paths_busy(connection, paths, owner):
+                return False
+            for path in paths:
+                connection.execute('INSERT OR REPLACE INTO leases (path, owner, expires_at) VALUES (?, ?, ?)',
+                                   (path, owner, time.time() + seconds))
+        return True
+
+    def release_lease(self, paths, owner):
+        with self.lock:
+            self.connection.executemany('DELETE FROM leases WHERE path = ? AND owner = ?',
+                                        [(path, owner) for path in paths])
+
+    def progress_events(self, job_id, interval=1.0, heartbeat=15.0):
+        """Server-Sent Events of a job driven by another process, polled from its stored progress.
+
+        The stream ends with the final progress and a done event once the job
+        has finished.
+        """
+        last_progress = None
+        last_sent = 0.0
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            progress = job['progress']
+            if job['status'] not in ACTIVE_STATUSES:
+                progress = dict(progress or {}, state=job['status'], eta_seconds=None)
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+                yield DONE_EVENT
+                return
+            if progress is not None and progress != last_progress:
+                last_progress = progress
+                last_sent = time.time()
+                yield f"event: progress\ndata: {json.dumps(progress)}\n\n"
+            elif time.time() - last_sent >= heartbeat:
+                last_sent = time.time()
+                yield ": keep-alive\n\n"
+            time.sleep(interval)
+
+
+class StoredJobManager:
+    """Drives the jobs of one kind that this process claimed from a shared JobStore.
+
+    Any process may queue, describe or cancel a job; a keeper thread in each
+    process claims queued jobs while fewer than max_concurrent_jobs run,
+    heartbeats the ones it drives (storing their progress and picking up
+    cancel requests made through other processes) and requeues the jobs of
+    processes that died. Subclasses start and stop the actual work.
+    """
+
+    kind = None
+    log_tag = 'JOBS'
+
+    def __init__(self, store, max_concurrent_jobs=1, heartbeat_seconds=2.0):
+        self.store = store
+        self.max_concurrent_jobs = max(1, max_concurrent_jobs)
+        self.heartbeat_seconds = max(0.1, heartbeat_seconds)
+
+        # A live process stalled on a busy database must not lose its jobs
+        min_lease_seconds = BUSY_TIMEOUT_SECONDS + MISSED_HEARTBEATS * self.heartbeat_seconds
+        if store.lease_seconds < min_lease_seconds:
+            print(f"[{self.log_tag}] Job lease of {store.lease_seconds}s is too short for {self.heartbeat_seconds}s heartbeats, using {min_lease_seconds}s")
+            store.lease_seconds = min_lease_seconds
+        self.owner = worker_identity()
+        self.lock = threading.RLock()
+        self.local_jobs = {}
+        self.keeper_pid = None
+
+    def start_keeper(self):
+        """Start the keeper thread of this process (again after a fork, threads do not survive it)."""
+        with self.lock:
+            if self.keeper_pid == os.getpid():
+                return
+            if self.keeper_pid is not None:
+                # A forked child inherits the parent's bookkeeping but drives none of its jobs
+                self.owner = worker_identity()
+                self.local_jobs = {}
+            self.keeper_pid = os.getpid()
+
+        keeper = threading.Thread(target=self._keep, name=f'{self.kind}-job-keeper')
+        keeper.daemon = True
+        keeper.start()
+
+    def _keep(self):
+        while True:
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"[{self.log_tag}] Error in job keeper: {str(e)}")
+            time.sleep(self.heartbeat_seconds)
+
+    def tick(self):
+        """Heartbeat the local jobs, requeue orphaned ones and claim queued ones."""
+        with self.lock:
+            job_ids = list(self.local_jobs)
+
+        for job_id in job_ids:
+            job = self.store.heartbeat(job_id, self.owner, self.local_progress(job_id))
+            if job is None:
+                print(f"[{self.log_tag}] Lost job {job_id} to another process, stopping it here")
+                self.stop_local(job_id)
+            elif job['cancel_requested']:
+                self.stop_local(job_id)
+
+        for job_id in self.store.requeue_stale(self.kind):
+            print(f"[{self.log_tag}] Job {job_id} stopped heartbeating, queued it again")
+
+        self.start_queued_jobs()
+
+    def start_queued_jobs(self):
+        """Claim and start queued jobs while there is room for them."""
+        while True:
+            job = self.store.claim_next(self.kind, self.owner, self.max_concurrent_jobs)
+            if job is None:
+                return
+            with self.lock:
+                self.local_jobs[job['id']] = None
+            print(f"[{self.log_tag}] Started job {job['id']} in process {os.getpid()}")
+            try:
+                self.run_local(job)
+            except Exception as e:
+                print(f"[{self.log_tag}] Error starting job {job['id']}: {str(e)}")
+                self.finish_local(job['id'], 'failed', message=str(e))
+
+    def ownership_check(self, job_id):
+        """Callable telling the work of job_id whether this process still drives it; call it before writing.
+
+        A True answer means the job was renewed less than a heartbeat ago, so
+        no other process can requeue it for at least lease_seconds minus that.
+        """
+        renewed_at = [time.monotonic()]
+
+        def still_owned():
+            if time.monotonic() - renewed_at[0] < self.heartbeat_seconds:
+                return True
+            try:
+                job = self.store.heartbeat(job_id, self.owner)
+            except sqlite3.Error as e:
+                # Ownership cannot be confirmed, writing would risk two writers
+                print(f"[{self.log_tag}] Could not renew job {job_id}: {str(e)}")
+                return False
+            if job is None:
+                return False
+            renewed_at[0] = time.monotonic()
+            return True
+
+        return still_owned
+
+    def finish_local(self, job_id, status, result=None, message=None):
+        """Record the outcome of a job this process drove and start the next one."""
+        progress = self.local_progress(job_id)
+        with self.lock:
+            self.local_jobs.pop(job_id, None)
+        self.store.finish(job_id, self.owner, status, result, message, progress)
+        print(f"[{self.log_tag}] Job {job_id} finished: {status}")
+        self.start_queued_jobs()
+
+    def run_local(self, job):
+        """Start driving a claimed job; call finish_local() once it is over."""
+        raise NotImplementedError
+
+    def stop_local(self, job_id):
+        """Ask a job this process drives to stop."""
+        raise NotImplementedError
+
+    def local_progress(self, job_id):
+        """Progress of a job this process drives, stored with every heartbeat."""
+        return None
+
+    def local_tracker(self, job_id):
+        """ProgressTracker of a job this process drives, None otherwise."""
+        return None
+
+    def queue_job(self, input_path, output_path, options, busy_result):
+        """Queue a job and start it if there is room; busy_result when its files are in use."""
+        self.start_keeper()
+        job = self.store.create(self.kind, input_path, output_path, options)
+        if job is None:
+            return busy_result
+        print(f"[{self.log_tag}] Queued job {job['id']}: {input_path} -> {output_path}")
+        self.start_queued_jobs()
+        return {"status": "success", "job": self.describe(job['id'])}
+
+    @contextmanager
+    def file_lease(self, *paths):
+        """Hold paths for a single-step operation; yields False when a job or another process uses them."""
+        acquired = self.store.acquire_lease(paths, self.owner)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.store.release_lease(paths, self.owner)
+
+    def cancel(self, job_id):
+        """Cancel a queued job or stop a running one, whichever process drives it."""
+        job = self.store.get(job_id)
+        if job is None or job['kind'] != self.kind:
+            return {"status": "error", "error": "Job not found", "details": f"No {self.kind} job with id {job_id}"}
+
+        if job['status'] in FINISHED_STATUSES:
+            return {"status": "error", "error": "Job already finished", "details": f"Job {job_id} is {job['status']}"}
+
+        job = self.store.request_cancel(job_id)
+        if job['status'] == 'cancelled':
+            message = f"Job {job_id} was removed from the queue."
+        else:
+            with self.lock:
+                local = job_id in self.local_jobs
+            if local:
+                self.stop_local(job_id)
+            message = f"Job {job_id} is stopping once the translations already in flight are written."
+        return {"status": "success", "message": message, "job": self.describe(job_id)}
+
+    def wait(self, job_id, poll_seconds=0.5):
+        """Block until a job has finished, whichever process drives it, and describe it."""
+        while True:
+            job = self.store.get(job_id)
+            if job is None or job['status'] in FINISHED_STATUSES:
+                return self.describe(job_id)
+            time.sleep(poll_seconds)
+
+    def describe(self, job_id):
+        """JSON-friendly view of a job, with live progress while it runs."""
+        job = self.store.get(job_id)
+        if job is None or job['kind'] != self.kind:
+            return None
+
+        description = {name: value for name, value in job.items()
+                       if name not in ('kind', 'cancel_requested', 'heartbeat_at')}
+        description['queue_position'] = self.store.queue_position(job) if job['status'] == 'queued' else None
+        with self.lock:
+            local = job_id in self.local_jobs
+        if job['status'] == 'running' and local:
+            description['progress'] = self.local_progress(job_id)
+        return description
+
+    def list_jobs(self):
+        """Every known job of this kind, oldest first."""
+        return [self.describe(job['id']) for job in self.store.list(self.kind)]
+
+    def progress_events(self, job_id):
+        """Server-Sent Events of a job, live when this process drives it; None for an unknown job."""
+        job = self.store.get(job_id)
+        if job is None or job['kind'] != self.kind:
+            return None
+        tracker = self.local_tracker(job_id)
+        if tracker is not None:
+            return tracker.events()
+        return self.store.progress_events(job_id)
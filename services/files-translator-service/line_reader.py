@@ -0,0 +1,145 @@
+"""Streaming reader and progress cursor for plain text input files."""
+
+import hashlib
+import os
+import threading
+from xml_reader import XMLProgressCursor, READ_CHUNK_SIZE
+
+# Input bytes before the cursor that must be unchanged for the cursor to stay valid
+FINGERPRINT_BYTES = 4096
+
+
+def count_newlines(file, start, end, chunk_size=READ_CHUNK_SIZE):
+    """Count the newlines between two byte offsets of an open binary file, one chunk in memory at a time."""
+    file.seek(start)
+    newlines = 0
+    remaining = end - start
+    while remaining > 0:
+        chunk = file.read(min(chunk_size, remaining))
+        if not chunk:
+            break
+        newlines += chunk.count(b'\n')
+        remaining -= len(chunk)
+    return newlines
+
+
+def fingerprint_before(file, offset):
+    """Hash of the FINGERPRINT_BYTES before offset of an open binary file, None when it is shorter than offset."""
+    start = max(0, offset - FINGERPRINT_BYTES)
+    file.seek(start)
+    data = file.read(offset - start)
+    if len(data) != offset - start:
+        return None
+    return hashlib.sha1(data).hexdigest()
+
+
+class LineReader:
+    """Walks the lines of a text file from a byte offset in a single streaming pass."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def iter_lines(self, start_offset=0):
+        """Yield (end byte offset, stripped text) for every line after start_offset."""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as file:
+            file.seek(start_offset)
+            offset = start_offset
+            for raw_line in file:
+                offset += len(raw_line)
+                yield offset, raw_line.decode('utf-8').strip()
+
+
+class LineProgressCursor(XMLProgressCursor):
+    """Persisted byte offset of the next unprocessed line of a text input file.
+
+    The input is never rewritten; entries_done counts the lines behind the
+    offset and output_size the output bytes written for them. Text dumps grow
+    by appending, so instead of the size and modification time the cursor
+    checks the bytes just before its offset: new lines at the end keep it,
+    a replaced input resets it.
+    """
+
+    log_tag = 'LINE-READER'
+
+    def _fingerprint(self, offset):
+        """Hash of the input bytes just before offset, None when the input is shorter than that."""
+        try:
+            with open(self.input_path, 'rb') as file:
+                return fingerprint_before(file, offset)
+        except OSError:
+            return None
+
+    def _input_signature(self):
+        """Fingerprint of the input up to the cursor, stored with the cursor."""
+        return {'input_fingerprint': self._fingerprint(self.offset)}
+
+    def _matches_input(self, data):
+        """Whether the input still holds the lines a stored cursor went past."""
+        fingerprint = data.get('input_fingerprint')
+        return fingerprint is not None and fingerprint == self._fingerprint(data.get('offset', 0))
+
+
+class LineCounter:
+    """Line count of a text file kept in memory, so status requests cost one stat().
+
+    The file is counted in chunks the first time only. Afterwards an
+    unchanged file is answered from memory and a file that grew in place
+    (the processor appending translations, new lines added to an input
+    dump) only has its new bytes counted. Growing in place is told apart
+    from a rewrite of the same file by the bytes before the old size, like
+    LineProgressCursor does; a replaced, rewritten or truncated file is
+    counted again. A last line without a newline counts as a line.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.signature = None
+        self.newlines = 0
+        self.ends_with_newline = True
+        # Fingerprint of the bytes before the counted size, to recognize an append
+        self.tail_fingerprint = None
+
+    def _signature(self):
+        """Inode, size and modification time of the file, None when it does not exist."""
+        try:
+            stat = os.stat(self.path)
+            return stat.st_ino, stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None
+
+    def count(self):
+        """Current number of lines in the file."""
+        signature = self._signature()
+        if signature is None:
+            return 0
+
+        with self.lock:
+            if signature != self.signature:
+                self._update(signature)
+            size = signature[1]
+            return self.newlines + (0 if size == 0 or self.ends_with_newline else 1)
+
+    def _update(self, signature):
+        """Bring the counters up to date with the file on disk."""
+        inode, size, _ = signature
+        with open(self.path, 'rb') as file:
+            start = 0
+            if (self.signature is not None and self.signature[0] == inode and self.signature[1] <= size
+                    and fingerprint_before(file, self.signature[1]) == self.tail_fingerprint):
+                # Grown in place, only the appended bytes are new
+                start = self.signature[1]
+            else:
+                self.newlines = 0
+
+            self.newlines += count_newlines(file, start, size)
+            self.tail_fingerprint = fingerprint_before(file, size)
+            if size > 0:
+                file.seek(size - 1)
+                self.ends_with_newline = file.read(1) == b'\n'
+            else:
+                self.ends_with_newline = True
+        self.signature = signature
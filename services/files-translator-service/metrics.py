@@ -0,0 +1,384 @@
+"""Counters, gauges and histograms of the translation hot path, served at /metrics.
+
+Samples are rendered in the Prometheus text exposition format. Recording an
+observation takes one uncontended lock around a couple of additions (each
+labelled series has its own lock), so the metrics stay on in production.
+"""
+
+import bisect
+import threading
+import time
+
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+FILE_IO_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+TOKENS_PER_SECOND_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 300, 500)
+
+
+def escape_label_value(value):
+    """Escape a label value for the text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=()):
+    """{name="value",...} for a sample, empty without labels."""
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + '}'
+
+
+def format_value(value):
+    """Sample value in the text format."""
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class CounterValue:
+    """One monotonically increasing series."""
+
+    __slots__ = ('lock', 'value')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+
+class GaugeValue(CounterValue):
+    """One series that goes up and down."""
+
+    __slots__ = ()
+
+    def dec(self, amount=1):
+        with self.lock:
+            self.value -= amount
+
+    def set(self, value):
+        with self.lock:
+            self.value = value
+
+
+class HistogramValue:
+    """Bucket counts and sum of one observed series."""
+
+    __slots__ = ('lock', 'bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        self.lock = threading.Lock()
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.bounds, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self):
+        """(per-bucket counts, sum) read together."""
+        with self.lock:
+            return list(self.counts), self.sum
+
+
+class Metric:
+    """A named family of series, one per combination of label values."""
+
+    metric_type = 'untyped'
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.children = {}
+
+    def new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        """Series for one combination of label values, created on first use."""
+        values = tuple(str(value) for value in values)
+        # A plain dict read, only creating a series takes the family lock
+        child = self.children.get(values)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(values, self.new_child())
+        return child
+
+    def inc(self, amount=1):
+        """Shortcut for a family without labels."""
+        self.labels().inc(amount)
+
+    def series(self):
+        """(label values, series) pairs in a stable order."""
+        with self.lock:
+            return sorted(self.children.items())
+
+    def samples(self):
+        for values, child in self.series():
+            yield f"{self.name}{format_labels(self.label_names, values)} {format_value(child.value)}"
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+        lines.extend(self.samples())
+        return lines
+
+
+class Counter(Metric):
+    metric_type = 'counter'
+
+    def new_child(self):
+        return CounterValue()
+
+
+class Gauge(Metric):
+    metric_type = 'gauge'
+
+    def new_child(self):
+        return GaugeValue()
+
+    def dec(self, amount=1):
+        self.labels().dec(amount)
+
+
+class Histogram(Metric):
+    metric_type = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.bounds = tuple(sorted(buckets))
+
+    def new_child(self):
+        return HistogramValue(self.bounds)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        for values, child in self.series():
+            counts, total = child.snapshot()
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), counts):
+                cumulative += count
+                labels = format_labels(self.label_names, values, [('le', format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.label_names, values)
+            yield f"{self.name}_sum{labels} {format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class FunctionMetric(Metric):
+    """Samples read from callbacks when /metrics is scraped, for values kept elsewhere.
+
+    Each source returns a number (no labels) or a {label values: number} dict.
+    """
+
+    def __init__(self, name, documentation, label_names=(), metric_type='gauge'):
+        super().__init__(name, documentation, label_names)
+        self.metric_type = metric_type
+        self.sources = []
+
+    def add_source(self, source):
+        self.sources.append(source)
+
+    def samples(self):
+        for source in self.sources:
+            try:
+                values = source()
+            except Exception as e:
+                print(f"[METRICS] Failed to collect {self.name}: {str(e)}")
+                continue
+            if values is None:
+                continue
+            if not isinstance(values, dict):
+                values = {(): values}
+            for label_values, value in sorted(values.items()):
+                yield f"{self.name}{format_labels(self.label_names, label_values)} {format_value(value)}"
+
+
+class MetricsRegistry:
+    """Every metric family of the process, in registration order."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.metrics = []
+
+    def register(self, metric):
+        with self.lock:
+            self.metrics.append(metric)
+        return metric
+
+    def register_series(self, metric):
+        """Register a recorded family; without labels its only series reports 0 from the start."""
+        if not metric.label_names:
+            metric.labels()
+        return self.register(metric)
+
+    def counter(self, name, documentation, label_names=()):
+        return self.register_series(Counter(name, documentation, label_names))
+
+    def gauge(self, name, documentation, label_names=()):
+        return self.register_series(Gauge(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        return self.register_series(Histogram(name, documentation, label_names, buckets))
+
+    def function(self, name, documentation, label_names=(), metric_type='gauge'):
+        return self.register(FunctionMetric(name, documentation, label_names, metric_type))
+
+    def render(self):
+        """Every family in the Prometheus text exposition format."""
+        with self.lock:
+            metrics = list(self.metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# Global registry and the metrics of the translation hot path
+registry = MetricsRegistry()
+
+model_calls = registry.counter(
+    'translator_model_calls_total',
+    'Model calls by endpoint and outcome (completed, stopped_early once the answer was complete, error)',
+    ['endpoint', 'outcome'])
+model_call_seconds = registry.histogram(
+    'translator_model_call_seconds',
+    'Model call latency by phase: total wall clock, first_chunk of streamed calls, and the load, prompt_eval, '
+    'generation and network (wall clock minus the server-side total) split of completed calls',
+    ['phase'])
+model_tokens = registry.counter(
+    'translator_model_tokens_total',
+    'Tokens of model calls: prompt_evaluated (prefix cache misses) and generated',
+    ['kind'])
+generation_tokens_per_second = registry.histogram(
+    'translator_generation_tokens_per_second',
+    'Generation speed of model calls',
+    buckets=TOKENS_PER_SECOND_BUCKETS)
+inference_waiting = registry.gauge(
+    'translator_inference_waiting',
+    'Model calls waiting for one of the INFERENCE_CONCURRENCY slots')
+inference_in_flight = registry.gauge(
+    'translator_inference_in_flight',
+    'Model calls holding an inference slot')
+translations_pending = registry.gauge(
+    'translator_translations_pending',
+    'Batch translations submitted and not finished yet (bucketed, packed, queued or at the model)')
+file_io_seconds = registry.histogram(
+    'translator_file_io_seconds',
+    'File I/O time per entry by processor: reading it, and writing it including the flush and checkpoint it triggers',
+    ['processor', 'operation'],
+    buckets=FILE_IO_BUCKETS)
+
+
+def nanoseconds_to_seconds(value):
+    """Ollama reports durations in nanoseconds."""
+    return value / 1e9 if value is not None else None
+
+
+class ModelCall:
+    """Times one model call, from the wait for an inference slot to its last chunk.
+
+    Wrap the slot in `with ModelCall(endpoint, streamed) as model_call:`, call
+    start() once the slot is held and seen() with every response or chunk.
+    Completed calls record the durations Ollama reports in their final chunk;
+    streams cut short never get it, their speed is estimated from the chunks
+    received, one token each.
+    """
+
+    def __init__(self, endpoint, streamed):
+        self.endpoint = endpoint
+        self.streamed = streamed
+        self.started_at = None
+        self.first_chunk_at = None
+        self.chunks = 0
+        self.response = None
+
+    def __enter__(self):
+        inference_waiting.inc()
+        return self
+
+    def start(self):
+        """The call got its inference slot."""
+        inference_waiting.dec()
+        inference_in_flight.inc()
+        self.started_at = time.perf_counter()
+
+    def seen(self, response):
+        """A response (or streamed chunk) arrived."""
+        if self.first_chunk_at is None:
+            self.first_chunk_at = time.perf_counter()
+        self.chunks += 1
+        self.response = response
+
+    def __exit__(self, exc_type, exc, traceback):
+        if self.started_at is None:
+            # Cancelled while waiting for a slot
+            inference_waiting.dec()
+            return False
+
+        inference_in_flight.dec()
+        self.record(time.perf_counter() - self.started_at, failed=exc_type is not None)
+        return False
+
+    def record(self, seconds, failed):
+        response = self.response
+        completed = response is not None and bool(response.get('done'))
+        outcome = 'error' if failed else ('completed' if completed else 'stopped_early')
+
+        model_calls.labels(self.endpoint, outcome).inc()
+        model_call_seconds.labels('total').observe(seconds)
+        first_chunk_seconds = self.first_chunk_at - self.started_at if self.first_chunk_at is not None else None
+        if self.streamed and first_chunk_seconds is not None:
+            model_call_seconds.labels('first_chunk').observe(first_chunk_seconds)
+
+        if completed:
+            self.record_server_timings(seconds, response)
+        elif self.streamed and self.chunks > 1:
+            model_tokens.labels('generated').inc(self.chunks)
+            generating = seconds - first_chunk_seconds
+            if generating > 0:
+                generation_tokens_per_second.observe((self.chunks - 1) / generating)
+
+    @staticmethod
+    def record_server_timings(seconds, response):
+        """Split a completed call by the durations of its final chunk."""
+        for phase, field in (('load', 'load_duration'), ('prompt_eval', 'prompt_eval_duration'),
+                             ('generation', 'eval_duration')):
+            duration = nanoseconds_to_seconds(response.get(field))
+            if duration is not None:
+                model_call_seconds.labels(phase).observe(duration)
+
+        total = nanoseconds_to_seconds(response.get('total_duration'))
+        if total is not None:
+            model_call_seconds.labels('network').observe(max(0.0, seconds - total))
+
+        prompt_evaluated = response.get('prompt_eval_count')
+        if prompt_evaluated:
+            model_tokens.labels('prompt_evaluated').inc(prompt_evaluated)
+
+        generated = response.get('eval_count')
+        generating = nanoseconds_to_seconds(response.get('eval_duration'))
+        if generated:
+            model_tokens.labels('generated').inc(generated)
+            if generating:
+                generation_tokens_per_second.observe(generated / generating)
+
+
+def timed_iter(iterable, histogram):
+    """Yield the items of iterable, observing how long producing each one took."""
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        histogram.observe(time.perf_counter() - started)
+        yield item
@@ -0,0 +1,402 @@
+"""Load-balanced pool of Ollama servers serving the same model."""
+
+import asyncio
+import threading
+import time
+import ollama
+
+
+class OllamaBackend:
+    """One Ollama server together with its load and health bookkeeping."""
+
+    def __init__(self, url, client_class=ollama.Client):
+        self.url = url
+        self.client = client_class(host=url)
+        self.outstanding = 0
+        self.healthy = True
+        self.consecutive_failures = 0
+        self.retry_at = 0.0
+        self.probing = False
+        self.requests = 0
+        self.failures = 0
+
+    def stats(self):
+        """JSON-friendly view of the backend."""
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding_requests": self.outstanding,
+            "requests": self.requests,
+            "failures": self.failures,
+            "consecutive_failures": self.consecutive_failures
+        }
+
+
+def is_backend_failure(error):
+    """Whether an error says something about the server rather than about the request."""
+    if isinstance(error, ollama.ResponseError):
+        # 4xx means the request itself was wrong, another backend would refuse it too
+        return error.status_code is None or error.status_code < 0 or error.status_code >= 500
+    return True
+
+
+class BackendStream:
+    """A streamed response holding its backend until it ends, breaks or is closed.
+
+    The pool has read the first chunk already, to know the backend answers.
+    An error while reading carries the backend_url the stream broke on.
+    """
+
+    def __init__(self, pool, backend, probe, stream, first_chunk):
+        self.pool = pool
+        self.backend = backend
+        self.probe = probe
+        self.stream = stream
+        self.first_chunk = first_chunk
+        self.released = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.first_chunk is not None:
+            chunk, self.first_chunk = self.first_chunk, None
+            return chunk
+        if self.released:
+            raise StopIteration
+        try:
+            return next(self.stream)
+        except StopIteration:
+            self.close()
+            raise
+        except Exception as e:
+            # Lets the caller generate again somewhere else
+            e.backend_url = self.backend.url
+            self.close(e)
+            raise
+
+    def close(self, error=None):
+        """Release the backend; closing a stream that is still open drops its connection."""
+        if self.released:
+            return
+        self.released = True
+        self.first_chunk = None
+        self.stream.close()
+        self.pool._release(self.backend, self.probe, error)
+
+    def __del__(self):
+        # A stream dropped unread still gives its backend back
+        self.close()
+
+
+class AsyncBackendStream:
+    """BackendStream of the async pool, read with async for and closed with aclose()."""
+
+    def __init__(self, pool, backend, probe, stream, first_chunk):
+        self.pool = pool
+        self.backend = backend
+        self.probe = probe
+        self.stream = stream
+        self.first_chunk = first_chunk
+        self.released = False
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.first_chunk is not None:
+            chunk, self.first_chunk = self.first_chunk, None
+            return chunk
+        if self.released:
+            raise StopAsyncIteration
+        try:
+            return await self.stream.__anext__()
+        except StopAsyncIteration:
+            await self.aclose()
+            raise
+        except Exception as e:
+            e.backend_url = self.backend.url
+            await self.aclose(e)
+            raise
+
+    async def aclose(self, error=None):
+        """Release the backend; closing a stream that is still open drops its connection."""
+        if self.released:
+            return
+        self.released = True
+        self.first_chunk = None
+        await self.stream.aclose()
+        self.pool._release(self.backend, self.probe, error)
+
+    def __del__(self):
+        if not self.released:
+            # Without a loop to close the stream on, at least give the backend back
+            self.released = True
+            self.pool._release(self.backend, self.probe)
+
+
+class OllamaBackendPool:
+    """Spreads requests over several Ollama servers, least outstanding requests first.
+
+    A backend failing failure_threshold requests in a row is taken out of
+    rotation. After retry_after seconds it gets a single probe request and
+    rejoins on success. A request failing on one backend is retried on the
+    next one, so callers only see an error when no backend could answer.
+    A stream is only returned once its first chunk arrived, so connection
+    errors fail over too; a stream breaking later is the caller's to retry,
+    passing the backend_url of its error as exclude on the next call.
+    The pool offers the generate/chat/list/show calls of ollama.Client.
+    """
+
+    client_class = ollama.Client
+
+    def __init__(self, urls, failure_threshold=3, retry_after=30.0):
+        if not urls:
+            raise ValueError("At least one Ollama backend URL is required")
+        self.backends = [OllamaBackend(url, self.client_class) for url in urls]
+        self.failure_threshold = max(1, failure_threshold)
+        self.retry_after = retry_after
+        self.lock = threading.Lock()
+        self.next_index = 0
+
+    def _acquire(self, exclude):
+        """Reserve the least loaded available backend: (backend, whether the request is its probe), or (None, False)."""
+        with self.lock:
+            now = time.monotonic()
+            candidates = []
+            count = len(self.backends)
+            for step in range(count):
+                # Start from a rotating index so ties are shared round robin
+                backend = self.backends[(self.next_index + step) % count]
+                if backend in exclude:
+                    continue
+                if backend.healthy:
+                    candidates.append(backend)
+                elif not backend.probing and now >= backend.retry_at:
+                    # The backend sat out long enough, let one request find out whether it is back
+                    backend.probing = True
+                    backend.outstanding += 1
+                    backend.requests += 1
+                    return backend, True
+
+            if not candidates:
+                return None, False
+
+            backend = min(candidates, key=lambda candidate: candidate.outstanding)
+            self.next_index = (self.backends.index(backend) + 1) % count
+            backend.outstanding += 1
+            backend.requests += 1
+            return backend, False
+
+    def _release(self, backend, probe, error=None):
+        """Return a backend after a request and update its health; probe says whether it was the probe request."""
+        with self.lock:
+            backend.outstanding -= 1
+            if probe:
+                # Requests that were in flight when the backend went down must not end its probe
+                backend.probing = False
+
+            if error is None or not is_backend_failure(error):
+                if not backend.healthy:
+                    print(f"[OLLAMA-POOL] Backend {backend.url} is healthy again, re-admitting it")
+                backend.healthy = True
+                backend.consecutive_failures = 0
+                return
+
+            backend.failures += 1
+            backend.consecutive_failures += 1
+            if backend.healthy and backend.consecutive_failures >= self.failure_threshold:
+                print(f"[OLLAMA-POOL] Removing backend {backend.url} after {backend.consecutive_failures} failed requests: {str(error)}")
+                backend.healthy = False
+            if not backend.healthy:
+                backend.retry_at = time.monotonic() + self.retry_after
+
+    def _call(self, method, *args, exclude=(), **kwargs):
+        """Run a client call on the best backend, failing over to the others."""
+        tried = [backend for backend in self.backends if backend.url in exclude]
+        last_error = None
+
+        while True:
+            backend, probe = self._acquire(tried)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            try:
+                result = getattr(backend.client, method)(*args, **kwargs)
+                if kwargs.get('stream'):
+                    # A stream only connects when it is read, read its first chunk so connect errors fail over
+                    first_chunk = next(result, None)
+            except Exception as e:
+                self._release(backend, probe, e)
+                if not is_backend_failure(e):
+                    raise
+                print(f"[OLLAMA-POOL] {method} failed on {backend.url}: {str(e)}")
+                last_error = e
+                continue
+
+            if kwargs.get('stream'):
+                # The backend stays busy until the caller has consumed the stream
+                return BackendStream(self, backend, probe, result, first_chunk)
+
+            self._release(backend, probe)
+            return result
+
+        if last_error is not None:
+            raise last_error
+        raise ConnectionError("No healthy Ollama backend is available")
+
+    def generate(self, *args, **kwargs):
+        """ollama.Client.generate on the least loaded backend."""
+        return self._call('generate', *args, **kwargs)
+
+    def chat(self, *args, **kwargs):
+        """ollama.Client.chat on the least loaded backend."""
+        return self._call('chat', *args, **kwargs)
+
+    def list(self):
+        """ollama.Client.list on the least loaded backend."""
+        return self._call('list')
+
+    def show(self, *args, **kwargs):
+        """ollama.Client.show on the least loaded backend."""
+        return self._call('show', *args, **kwargs)
+
+    def ensure_model(self, model):
+        """Make sure every backend has the model, pulling it only where it is missing.
+
+        Backends that cannot be reached are taken out of rotation; returns how
+        many backends are ready.
+        """
+        ready = 0
+        for backend in self.backends:
+            try:
+                try:
+                    # show is a local metadata lookup, pull would ask the registry
+                    backend.client.show(model)
+                except ollama.ResponseError as e:
+                    if e.status_code != 404:
+                        raise
+                    print(f"[OLLAMA-POOL] {model} is not installed on {backend.url}, pulling it")
+                    backend.client.pull(model)
+                ready += 1
+            except Exception as e:
+                self._mark_down(backend, f"Failed to prepare {model}", e)
+
+        if ready == 0:
+            raise ConnectionError(f"Could not prepare {model} on any Ollama backend")
+        return ready
+
+    def preload(self, model, keep_alive):
+        """Load the model into memory on every healthy backend and keep it there for keep_alive."""
+        for backend in self.backends:
+            if not backend.healthy:
+                continue
+            try:
+                # An empty prompt only loads the model
+                backend.client.generate(model=model, prompt='', keep_alive=keep_alive)
+            except Exception as e:
+                print(f"[OLLAMA-POOL] Failed to preload {model} on {backend.url}: {str(e)}")
+
+    def _mark_down(self, backend, reason, error):
+        """Take a backend out of rotation until its next probe."""
+        print(f"[OLLAMA-POOL] {reason} on {backend.url}: {str(error)}")
+        with self.lock:
+            backend.healthy = False
+            backend.failures += 1
+            backend.consecutive_failures = self.failure_threshold
+            backend.retry_at = time.monotonic() + self.retry_after
+
+    def stats(self):
+        """Load and health of every backend."""
+        with self.lock:
+            return [backend.stats() for backend in self.backends]
+
+
+class AsyncOllamaBackendPool(OllamaBackendPool):
+    """OllamaBackendPool on top of ollama.AsyncClient; every call is a coroutine.
+
+    Selection and health tracking are shared with the threaded pool, the
+    short critical sections under its lock never wait on the network.
+    """
+
+    client_class = ollama.AsyncClient
+
+    async def _call(self, method, *args, exclude=(), **kwargs):
+        """Run a client call on the best backend, failing over to the others."""
+        tried = [backend for backend in self.backends if backend.url in exclude]
+        last_error = None
+
+        while True:
+            backend, probe = self._acquire(tried)
+            if backend is None:
+                break
+            tried.append(backend)
+
+            try:
+                result = await getattr(backend.client, method)(*args, **kwargs)
+                first_chunk = None
+                if kwargs.get('stream'):
+                    # A stream only connects when it is read, read its first chunk so connect errors fail over
+                    try:
+                        first_chunk = await result.__anext__()
+                    except StopAsyncIteration:
+                        pass
+            except asyncio.CancelledError:
+                # A cancelled or timed out request says nothing about the backend
+                self._release(backend, probe)
+                raise
+            except Exception as e:
+                self._release(backend, probe, e)
+                if not is_backend_failure(e):
+                    raise
+                print(f"[OLLAMA-POOL] {method} failed on {backend.url}: {str(e)}")
+                last_error = e
+                continue
+
+            if kwargs.get('stream'):
+                # The backend stays busy until the caller has consumed the stream
+                return AsyncBackendStream(self, backend, probe, result, first_chunk)
+
+            self._release(backend, probe)
+            return result
+
+        if last_error is not None:
+            raise last_error
+        raise ConnectionError("No healthy Ollama backend is available")
+
+    async def generate(self, *args, **kwargs):
+        """ollama.AsyncClient.generate on the least loaded backend."""
+        return await self._call('generate', *args, **kwargs)
+
+    async def chat(self, *args, **kwargs):
+        """ollama.AsyncClient.chat on the least loaded backend."""
+        return await self._call('chat', *args, **kwargs)
+
+    async def list(self):
+        """ollama.AsyncClient.list on the least loaded backend."""
+        return await self._call('list')
+
+    async def show(self, *args, **kwargs):
+        """ollama.AsyncClient.show on the least loaded backend."""
+        return await self._call('show', *args, **kwargs)
+
+    async def ensure_model(self, model):
+        """Make sure every backend has the model, pulling it only where it is missing."""
+        ready = 0
+        for backend in self.backends:
+            try:
+                try:
+                    await backend.client.show(model)
+                except ollama.ResponseError as e:
+                    if e.status_code != 404:
+                        raise
+                    print(f"[OLLAMA-POOL] {model} is not installed on {backend.url}, pulling it")
+                    await backend.client.pull(model)
+                ready += 1
+            except Exception as e:
+                self._mark_down(backend, f"Failed to prepare {model}", e)
+
+        if ready == 0:
+            raise ConnectionError(f"Could not prepare {model} on any Ollama backend")
+        return ready
@@ -0,0 +1,71 @@
+"""Typed placeholders for the variable parts of Fallout 4 strings."""
+
+import re
+
+# Checked left to right, so a number inside a tag stays part of the tag
+variable_part_pattern = re.compile(r'''
+    (?P<ALIAS><Alias[^<>]*>)
+  | (?P<GLOBAL><Global[^<>]*>)
+  | (?P<TAG><[A-Za-z][\w.]*=[^<>]*>)
+  | (?P<VAR>%(?:\d+\$)?[-+\ 0\#]*\d*(?:\.\d+)?[sdif])
+  | (?P<N>(?<![\w%{])\d+(?:[.,]\d+)*(?![\w}]))
+''', re.VERBOSE)
+
+placeholder_pattern = re.compile(r'\{(?:ALIAS|GLOBAL|TAG|VAR|N)\d+\}')
+
+
+class MaskedText:
+    """Source text with its variable parts swapped for numbered, typed placeholders.
+
+    "Collect 5 Steel" and "Collect 10 Steel" both become "Collect {N1} Steel",
+    so they share one cache entry and one model call, and markup such as
+    <Alias=Player> never reaches the model.
+    """
+
+    def __init__(self, text, placeholders):
+        self.text = text
+        self.placeholders = placeholders
+
+    def restore(self, translated_text):
+        """Put the original values back, or None when the model lost or duplicated a placeholder."""
+        if not self.placeholders:
+            return translated_text
+
+        values = dict(self.placeholders)
+        found = placeholder_pattern.findall(translated_text)
+        if sorted(found) != sorted(values):
+            return None
+
+        return placeholder_pattern.sub(lambda match: values[match.group(0)], translated_text)
+
+    def mask_translation(self, translated_text):
+        """Swap this text's values for its placeholders in an existing translation, or None when one is missing."""
+        masked_translation = translated_text
+        for placeholder, value in self.placeholders:
+            if value not in masked_translation:
+                return None
+            masked_translation = masked_translation.replace(value, placeholder, 1)
+
+        # Values nested in each other (e.g. 5 and 15) can land in the wrong spot
+        if self.restore(masked_translation) != translated_text:
+            return None
+        return masked_translation
+
+
+def mask_placeholders(text, enabled=True):
+    """Replace numbers, <Alias=...>/<Global=...> tags and %s-style markers with typed placeholders."""
+    if not enabled or '{' in text:
+        # Text that already looks like a placeholder cannot be restored unambiguously
+        return MaskedText(text, [])
+
+    counters = {}
+    placeholders = []
+
+    def replace(match):
+        kind = match.lastgroup
+        counters[kind] = counters.get(kind, 0) + 1
+        placeholder = f"{{{kind}{counters[kind]}}}"
+        placeholders.append((placeholder, match.group(0)))
+        return placeholder
+
+    return MaskedText(variable_part_pattern.sub(replace, text), placeholders)
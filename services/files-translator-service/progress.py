@@ -0,0 +1,114 @@
+"""Live progress of batch runs, pushed to browsers as Server-Sent Events."""
+
+import json
+import threading
+import time
+
+# States of a tracker whose run has not ended yet; any other state is the outcome of a finished run
+LIVE_STATES = ('idle', 'starting', 'running')
+
+DONE_EVENT = "event: done\ndata: {}\n\n"
+
+
+class ProgressTracker:
+    """Counters of one batch run that the processing thread updates in memory.
+
+    Updating only touches a few integers under a lock and wakes the waiting
+    event streams; rate and ETA are computed on the streaming side, so a
+    monitored run costs the processor nothing beyond that.
+    """
+
+    def __init__(self, unit='entries'):
+        self.unit = unit
+        self.condition = threading.Condition()
+        self.version = 0
+        self.state = 'idle'
+        self.total = 0
+        self.counts = {'processed': 0, 'copied': 0, 'skipped': 0, 'errors': 0}
+        self.started_at = None
+        self.finished_at = None
+
+    def start(self, total):
+        """Reset the counters for a new run of total items."""
+        with self.condition:
+            self.state = 'running'
+            self.total = total
+            self.counts = {'processed': 0, 'copied': 0, 'skipped': 0, 'errors': 0}
+            self.started_at = time.time()
+            self.finished_at = None
+            self._changed()
+
+    def prepare(self):
+        """Mark a run as about to start, so streams opened before it counts its total wait for it."""
+        with self.condition:
+            self.state = 'starting'
+            self._changed()
+
+    def add(self, counter, amount=1):
+        """Count amount more processed/copied/skipped/errors items."""
+        with self.condition:
+            self.counts[counter] += amount
+            self._changed()
+
+    def finish(self, outcome):
+        """Mark the run as over with its outcome (completed, stopped, failed, ...)."""
+        with self.condition:
+            self.state = outcome
+            self.finished_at = time.time()
+            self._changed()
+
+    def _changed(self):
+        """Wake the event streams; the caller holds the condition."""
+        self.version += 1
+        self.condition.notify_all()
+
+    def _snapshot(self):
+        """Counters plus rate and ETA; the caller holds the condition."""
+        done = sum(self.counts.values())
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        rate = done / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, self.total - done)
+
+        return {
+            "state": self.state,
+            "unit": self.unit,
+            "total": self.total,
+            **self.counts,
+            "remaining": remaining,
+            "elapsed_seconds": round(elapsed, 1),
+            "rate_per_second": round(rate, 2),
+            "eta_seconds": round(remaining / rate) if rate > 0 and self.state == 'running' else None
+        }
+
+    def snapshot(self):
+        """Current counters plus rate and ETA."""
+        with self.condition:
+            return self._snapshot()
+
+    def events(self, min_interval=0.5, heartbeat=15.0):
+        """Yield Server-Sent Events: the current progress, then every change.
+
+        Changes are coalesced to at most one event per min_interval; a comment
+        line every heartbeat seconds keeps idle connections open. Once the run
+        has ended, the final progress is followed by a done event and the
+        stream closes.
+        """
+        version = None
+        while True:
+            with self.condition:
+                if self.version == version:
+                    self.condition.wait(heartbeat)
+                changed = self.version != version
+                version = self.version
+                snapshot = self._snapshot()
+
+            if changed:
+                yield f"event: progress\ndata: {json.dumps(snapshot)}\n\n"
+                if snapshot['state'] not in LIVE_STATES:
+                    yield DONE_EVENT
+                    return
+                time.sleep(min_interval)
+            else:
+                yield ": keep-alive\n\n"
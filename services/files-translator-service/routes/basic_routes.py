@@ -1,15 +1,13 @@
 """Blueprint for basic text file translation routes."""
 
-from flask import Blueprint, render_template_string, jsonify
+from flask import Blueprint, Response, render_template_string, jsonify, request
 from templates import BASIC_TRANSLATOR_TEMPLATE, RESULT_TEMPLATE
-from file_processor import FileProcessor
-from config import Config
+from text_jobs import text_job_manager
 
 basic_bp = Blueprint('basic', __name__)
-config = Config()
 
-# Initialize file processor
-file_processor = FileProcessor(config.INPUT_FILE_PATH, config.OUTPUT_FILE_PATH)
+# The file processor of the configured input/output pair, shared with the background jobs
+file_processor = text_job_manager.processor
 
 @basic_bp.route('/basic-file-translator', methods=['GET'])
 def basic_file_translator():
@@ -27,7 +25,8 @@ def status_view():
                                     result_type="status", 
                                     result=status_data,
                                     back_link="/basic-file-translator",
-                                    back_text="Text Translator")
+                                    back_text="Text Translator",
+                                    progress_stream="/progress-stream")
         
     except Exception as e:
         error_data = {
@@ -45,7 +44,7 @@ def status_view():
 def trigger_processing_view():
     """Process next line with HTML interface."""
     try:
-        result = file_processor.process_next_line()
+        result = text_job_manager.process_next_line()
         
         if result["status"] == "completed":
             return render_template_string(RESULT_TEMPLATE, 
@@ -106,29 +105,45 @@ def trigger_processing_view():
 
 @basic_bp.route('/process-all-view', methods=['GET'])
 def process_all_view():
-    """Process all lines with HTML interface."""
+    """Start processing all lines in the background with HTML interface."""
     try:
-        result = file_processor.process_all_lines()
+        result = text_job_manager.submit()
+        
+        if result["status"] == "error":
+            error_data = {
+                "error": result["error"],
+                "details": result.get("details", "")
+            }
+            return render_template_string(RESULT_TEMPLATE, 
+                                        title="Processing Already Running", 
+                                        result_type="error", 
+                                        result=error_data,
+                                        back_link="/basic-file-translator",
+                                        back_text="Text Translator",
+                                        progress_stream="/progress-stream")
         
+        job = result["job"]
         success_data = {
-            "message": f"Processing completed! Processed {result['processed_count']} lines, skipped {result['skipped_count']} empty lines.",
-            "processed_count": result["processed_count"],
-            "skipped_count": result["skipped_count"],
-            "errors": result["errors"],
-            "input_file_path": result["input_file_path"],
-            "output_file_path": result["output_file_path"]
+            "message": result["message"],
+            "job_id": job["id"],
+            "input_file_path": job["input_file_path"],
+            "output_file_path": job["output_file_path"]
         }
         
         return render_template_string(RESULT_TEMPLATE, 
-                                    title="Batch Processing Complete", 
+                                    title="Batch Processing Started", 
                                     result_type="success", 
                                     result=success_data,
                                     back_link="/basic-file-translator",
-                                    back_text="Text Translator")
+                                    back_text="Text Translator",
+                                    progress_stream=f"/text-jobs/{job['id']}/events",
+                                    job_link=f"/text-jobs/{job['id']}",
+                                    show_stop_batch=True,
+                                    stop_link="/stop-processing-view")
         
     except Exception as e:
         error_data = {
-            "error": "An error occurred while processing all lines",
+            "error": "An error occurred while starting to process all lines",
             "details": str(e)
         }
         return render_template_string(RESULT_TEMPLATE, 
@@ -138,12 +153,57 @@ def process_all_view():
                                     back_link="/basic-file-translator",
                                     back_text="Text Translator")
 
+@basic_bp.route('/stop-processing-view', methods=['GET'])
+def stop_processing_view():
+    """Stop the running /process-all job with HTML interface."""
+    try:
+        job_id = text_job_manager.running_job_id()
+        if job_id is None:
+            result = {
+                "status": "error",
+                "error": "No processing is currently running",
+                "details": "There is no active processing to stop."
+            }
+        else:
+            result = text_job_manager.cancel(job_id)
+        
+        if result["status"] == "error":
+            error_data = {
+                "error": result["error"],
+                "details": result.get("details", "")
+            }
+            return render_template_string(RESULT_TEMPLATE, 
+                                        title="No Processing to Stop", 
+                                        result_type="error", 
+                                        result=error_data,
+                                        back_link="/basic-file-translator",
+                                        back_text="Text Translator")
+        
+        return render_template_string(RESULT_TEMPLATE, 
+                                    title="Stop Request Sent", 
+                                    result_type="success", 
+                                    result={"message": result["message"]},
+                                    back_link="/basic-file-translator",
+                                    back_text="Text Translator")
+        
+    except Exception as e:
+        error_data = {
+            "error": "An error occurred while stopping processing",
+            "details": str(e)
+        }
+        return render_template_string(RESULT_TEMPLATE, 
+                                    title="Stop Error", 
+                                    result_type="error", 
+                                    result=error_data,
+                                    back_link="/basic-file-translator",
+                                    back_text="Text Translator")
+
 # API routes (for JSON responses)
 @basic_bp.route('/trigger-processing', methods=['GET'])
 def trigger_processing():
     """Process the next line from the input file - translate and move to output file."""
     try:
-        result = file_processor.process_next_line()
+        result = text_job_manager.process_next_line()
         
         if result["status"] == "success":
             return jsonify(result), 200
@@ -175,13 +235,93 @@ def get_status():
 
 @basic_bp.route('/process-all', methods=['POST'])
 def process_all():
-    """Process all remaining lines in the input file."""
+    """Start processing all remaining lines in the background and return the job.
+    
+    With ?wait=true the request blocks until the job has finished and returns its report.
+    """
     try:
-        result = file_processor.process_all_lines()
-        return jsonify(result), 200
+        data = request.get_json(silent=True) or {}
+        result = text_job_manager.submit(data.get('options'))
+        
+        if result["status"] == "error":
+            status_code = 400 if result["error"] == "Invalid text job" else 409
+            return jsonify(result), status_code
+        
+        if request.args.get('wait', 'false').lower() == 'true':
+            job = text_job_manager.wait(result["job"]["id"])
+            return jsonify(job["result"]), 200
+        return jsonify(result), 202
         
     except Exception as e:
         return jsonify({
             "error": "An error occurred while processing all lines",
             "details": str(e)
         }), 500
+
+@basic_bp.route('/progress-stream', methods=['GET'])
+def progress_stream():
+    """Stream the progress of /process-all as Server-Sent Events."""
+    job_id = text_job_manager.running_job_id()
+    events = text_job_manager.progress_events(job_id) if job_id is not None else None
+    return Response(events or file_processor.progress.events(),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# Text job API routes (for JSON responses)
+@basic_bp.route('/text-jobs', methods=['GET'])
+def list_text_jobs():
+    """List every running and finished /process-all job."""
+    try:
+        return jsonify({"jobs": text_job_manager.list_jobs()}), 200
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to list text jobs",
+            "details": str(e)
+        }), 500
+
+@basic_bp.route('/text-jobs/<job_id>', methods=['GET'])
+def get_text_job(job_id):
+    """Get the status, progress and final report of one /process-all job."""
+    try:
+        job = text_job_manager.describe(job_id)
+        
+        if job is None:
+            return jsonify({"error": "Job not found", "details": f"No text job with id {job_id}"}), 404
+        return jsonify(job), 200
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to get text job",
+            "details": str(e)
+        }), 500
+
+@basic_bp.route('/text-jobs/<job_id>/cancel', methods=['POST'])
+def cancel_text_job(job_id):
+    """Stop a running /process-all job."""
+    try:
+        result = text_job_manager.cancel(job_id)
+        
+        if result["status"] == "success":
+            return jsonify(result), 200
+        elif result["error"] == "Job not found":
+            return jsonify(result), 404
+        else:  # error
+            return jsonify(result), 409
+        
+    except Exception as e:
+        return jsonify({
+            "error": "An error occurred while cancelling the text job",
+            "details": str(e)
+        }), 500
+
+@basic_bp.route('/text-jobs/<job_id>/events', methods=['GET'])
+def text_job_events(job_id):
+    """Stream the progress of one /process-all job as Server-Sent Events."""
+    events = text_job_manager.progress_events(job_id)
+    
+    if events is None:
+        return jsonify({"error": "Job not found", "details": f"No text job with id {job_id}"}), 404
+    return Response(events,
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
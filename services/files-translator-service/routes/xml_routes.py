@@ -1,27 +1,27 @@
 """Blueprint for XML translation routes."""
 
-from flask import Blueprint, render_template_string, jsonify
+from flask import Blueprint, Response, render_template_string, jsonify, request
 from templates import XML_TRANSLATOR_TEMPLATE, RESULT_TEMPLATE
-from xml_processor import XMLProcessor, get_batch_processing_status
+from job_manager import job_manager
 from config import Config
 
 xml_bp = Blueprint('xml', __name__)
 config = Config()
 
-# Initialize XML processor
-xml_processor = XMLProcessor(config.XML_INPUT_FILE_PATH, config.XML_OUTPUT_FILE_PATH)
+# Initialize XML processor of the default input/output pair, shared with the job queue
+xml_processor = job_manager.get_processor(config.XML_INPUT_FILE_PATH, config.XML_OUTPUT_FILE_PATH)
 
 @xml_bp.route('/fallout4-xml-translator', methods=['GET'])
 def fallout4_xml_translator():
     """Fallout 4 XML translator interface."""
-    batch_status = get_batch_processing_status()
+    batch_status = job_manager.active_job(xml_processor.input_path) is not None
     return render_template_string(XML_TRANSLATOR_TEMPLATE, batch_processing_status=batch_status)
 
 @xml_bp.route('/xml-status-view', methods=['GET'])
 def xml_status_view():
     """View XML status with HTML interface."""
     try:
-        status_data = xml_processor.get_status()
+        status_data = job_manager.get_status(xml_processor.input_path, xml_processor.output_path)
         
         return render_template_string(RESULT_TEMPLATE, 
                                     title="XML Translation Status", 
@@ -30,7 +30,8 @@ def xml_status_view():
                                     back_link="/fallout4-xml-translator",
                                     back_text="XML Translator",
                                     show_refresh_status=True,
-                                    show_stop_batch=status_data["batch_processing_status"])
+                                    show_stop_batch=status_data["batch_processing_status"],
+                                    progress_stream="/xml-progress-stream")
         
     except Exception as e:
         error_data = {
@@ -48,7 +49,7 @@ def xml_status_view():
 def xml_trigger_processing_view():
     """Process next XML entry with HTML interface."""
     try:
-        result = xml_processor.process_next_entry()
+        result = job_manager.process_next_entry(xml_processor.input_path, xml_processor.output_path)
         
         if result["status"] == "completed":
             return render_template_string(RESULT_TEMPLATE, 
@@ -112,7 +113,8 @@ def xml_trigger_processing_view():
 def xml_process_all_view():
     """Start processing all XML entries in background."""
     try:
-        result = xml_processor.start_batch_processing()
+        result = job_manager.submit_pair(xml_processor.input_path, xml_processor.output_path)
+        job = result.get("job")
         
         if result["status"] == "error":
             error_data = {
@@ -126,18 +128,18 @@ def xml_process_all_view():
                                         back_link="/fallout4-xml-translator",
                                         back_text="XML Translator")
         
-        elif result["status"] == "completed":
+        elif job["status"] == "completed":
             return render_template_string(RESULT_TEMPLATE, 
                                         title="XML Processing Complete", 
                                         result_type="completed", 
-                                        result={"message": result["message"]},
+                                        result={"message": job["message"]},
                                         back_link="/fallout4-xml-translator",
                                         back_text="XML Translator")
         
-        elif result["status"] == "success":
+        else:
             success_data = {
-                "message": result["message"],
-                "entries_to_process": result["entries_to_process"]
+                "message": job["message"] or f"Job {job['id']} is queued and starts once a running job finishes.",
+                "job_id": job["id"]
             }
             
             return render_template_string(RESULT_TEMPLATE, 
@@ -145,7 +147,9 @@ def xml_process_all_view():
                                         result_type="success", 
                                         result=success_data,
                                         back_link="/fallout4-xml-translator",
-                                        back_text="XML Translator")
+                                        back_text="XML Translator",
+                                        progress_stream=f"/xml-jobs/{job['id']}/events",
+                                        job_link=f"/xml-jobs/{job['id']}")
         
     except Exception as e:
         error_data = {
@@ -163,7 +167,15 @@ def xml_process_all_view():
 def xml_stop_batch_processing():
     """Stop the running XML batch processing."""
     try:
-        result = xml_processor.stop_batch_processing()
+        job = job_manager.active_job(xml_processor.input_path)
+        if job is None:
+            result = {
+                "status": "error",
+                "error": "No batch processing is currently running",
+                "details": "There is no active batch processing to stop."
+            }
+        else:
+            result = job_manager.cancel(job["id"])
         
         if result["status"] == "error":
             error_data = {
@@ -200,3 +212,89 @@ def xml_stop_batch_processing():
                                     result=error_data,
                                     back_link="/fallout4-xml-translator",
                                     back_text="XML Translator")
+
+@xml_bp.route('/xml-progress-stream', methods=['GET'])
+def xml_progress_stream():
+    """Stream the progress of the XML batch as Server-Sent Events."""
+    job = job_manager.active_job(xml_processor.input_path)
+    events = job_manager.progress_events(job["id"]) if job is not None else None
+    return Response(events or xml_processor.progress.events(),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+# XML job queue API routes (for JSON responses)
+@xml_bp.route('/xml-jobs', methods=['POST'])
+def submit_xml_job():
+    """Queue a translation job for an XML file pair."""
+    try:
+        data = request.get_json(silent=True) or {}
+        result = job_manager.submit(data.get('input_file_path'), data.get('output_file_path'), data.get('options'))
+        
+        if result["status"] == "success":
+            return jsonify(result), 202
+        else:  # error
+            return jsonify(result), 400
+        
+    except Exception as e:
+        return jsonify({
+            "error": "An error occurred while submitting the XML job",
+            "details": str(e)
+        }), 500
+
+@xml_bp.route('/xml-jobs', methods=['GET'])
+def list_xml_jobs():
+    """List every queued, running and finished XML job."""
+    try:
+        return jsonify({"jobs": job_manager.list_jobs()}), 200
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to list XML jobs",
+            "details": str(e)
+        }), 500
+
+@xml_bp.route('/xml-jobs/<job_id>', methods=['GET'])
+def get_xml_job(job_id):
+    """Get the status and progress of one XML job."""
+    try:
+        job = job_manager.describe(job_id)
+        
+        if job is None:
+            return jsonify({"error": "Job not found", "details": f"No XML job with id {job_id}"}), 404
+        return jsonify(job), 200
+        
+    except Exception as e:
+        return jsonify({
+            "error": "Failed to get XML job",
+            "details": str(e)
+        }), 500
+
+@xml_bp.route('/xml-jobs/<job_id>/cancel', methods=['POST'])
+def cancel_xml_job(job_id):
+    """Cancel a queued XML job or stop a running one."""
+    try:
+        result = job_manager.cancel(job_id)
+        
+        if result["status"] == "success":
+            return jsonify(result), 200
+        elif result["error"] == "Job not found":
+            return jsonify(result), 404
+        else:  # error
+            return jsonify(result), 409
+        
+    except Exception as e:
+        return jsonify({
+            "error": "An error occurred while cancelling the XML job",
+            "details": str(e)
+        }), 500
+
+@xml_bp.route('/xml-jobs/<job_id>/events', methods=['GET'])
+def xml_job_events(job_id):
+    """Stream the progress of one XML job as Server-Sent Events."""
+    events = job_manager.progress_events(job_id)
+    
+    if events is None:
+        return jsonify({"error": "Job not found", "details": f"No XML job with id {job_id}"}), 404
+    return Response(events,
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
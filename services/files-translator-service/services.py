@@ -1,7 +1,257 @@
 """Services for AI client and translation."""
 
-import ollama
+import re
+import threading
+import time
 from config import Config
+from fuzzy_memory import FuzzyTranslationIndex
+from inference_budget import InferenceBudget
+from metrics import ModelCall, registry
+from ollama_backends import OllamaBackendPool, is_backend_failure
+from placeholders import mask_placeholders, placeholder_pattern
+from translation_memory import TranslationMemory
+
+# Bump whenever the translation prompt changes so old cached translations are not reused
+PROMPT_VERSION = '4'
+SOURCE_LANGUAGE = 'en'
+TARGET_LANGUAGE = 'ro'
+
+numbered_line_pattern = re.compile(r'^\s*(\d+)\s*[.):]\s*(.*?)\s*$')
+
+# What the strings of common Fallout 4 record types are, for the chat system prompt
+RECORD_TYPE_HINTS = {
+    'INFO': 'dialogue lines spoken by characters',
+    'DIAL': 'dialogue topics and player dialogue choices',
+    'QUST': 'quest names, objectives and log entries',
+    'BOOK': 'texts of books, notes and holotapes',
+    'TERM': 'computer terminal texts and menu items',
+    'MESG': 'on-screen messages and prompts',
+    'PERK': 'perk names and descriptions',
+    'WEAP': 'weapon names and descriptions',
+    'ARMO': 'armor and clothing names and descriptions',
+    'NPC_': 'character names',
+    'LCTN': 'location names',
+    'CELL': 'location names'
+}
+
+
+def prompt_version():
+    """Version of the prompt a translation was made with, for the translation memory key."""
+    return f"{PROMPT_VERSION}-{Config.PROMPT_MODE}"
+
+
+def estimate_tokens(text):
+    """Rough token count used for packing and scheduling decisions."""
+    return len(text) // 4 + 1
+
+
+def parse_numbered_translations(response_text, expected_count):
+    """Map a "<number>. <text>" answer back to its inputs, or None if any line is missing."""
+    translations = {}
+    
+    for line in response_text.splitlines():
+        match = numbered_line_pattern.match(line)
+        if match and match.group(2):
+            translations.setdefault(int(match.group(1)), match.group(2))
+    
+    if sorted(translations) != list(range(1, expected_count + 1)):
+        return None
+    
+    return [translations[number] for number in range(1, expected_count + 1)]
+
+
+def placeholder_instruction(texts):
+    """Extra prompt sentence for texts holding placeholders, empty otherwise."""
+    if any(placeholder_pattern.search(text) for text in texts):
+        return ". Keep placeholders such as {N1} or {ALIAS1} exactly as they are"
+    return ""
+
+
+def format_examples(examples):
+    """English/Romanian lines of the few-shot examples."""
+    return '\n'.join(f"English: {source}\nRomanian: {translation}" for source, translation in examples)
+
+
+def build_translation_prompt(text, examples=None):
+    """Prompt asking the model for the translation of one string, optionally with similar translated examples."""
+    if not examples:
+        return f'''Translate the following English text to Romanian. Return only the Romanian translation, no additional text or formatting{placeholder_instruction([text])}:
+
+{text}'''
+    
+    return f'''Translate the following English text to Romanian. Return only the Romanian translation, no additional text or formatting{placeholder_instruction([text])}. Similar strings were translated like this, keep the wording consistent with them:
+
+{format_examples(examples)}
+
+Text to translate:
+
+{text}'''
+
+
+def build_packed_prompt(texts):
+    """Prompt asking the model for the translations of several numbered strings."""
+    numbered_lines = '\n'.join(f"{number}. {text}" for number, text in enumerate(texts, start=1))
+    return f'''Translate each numbered English line below to Romanian. Keep the numbering and return exactly {len(texts)} lines in the form "<number>. <Romanian translation>", with no additional text or formatting{placeholder_instruction(texts)}:
+
+{numbered_lines}'''
+
+
+def build_system_prompt(record_type=None):
+    """Fixed chat system prompt; identical for every call on one record type so the backend can keep it cached."""
+    system_prompt = ('You translate English text from the video game Fallout 4 to Romanian. '
+                     'Return only the Romanian translation, no additional text or formatting. '
+                     'Keep placeholders such as {N1} or {ALIAS1} exactly as they are. '
+                     'When given numbered lines, return exactly one line per input line in the form "<number>. <Romanian translation>".')
+    if record_type:
+        # Appended last so calls on different record types still share most of the prefix
+        system_prompt += f" The texts are {RECORD_TYPE_HINTS.get(record_type, f'strings of {record_type} records')}."
+    return system_prompt
+
+
+def build_translation_request(text, examples=None, record_type=None):
+    """Arguments of the model call translating one string: a prompt, or chat messages in chat mode."""
+    if Config.PROMPT_MODE != 'chat':
+        return {'prompt': build_translation_prompt(text, examples)}
+    
+    user_message = text
+    if examples:
+        user_message = f"Similar strings were translated like this, keep the wording consistent with them:\n\n{format_examples(examples)}\n\nText to translate:\n\n{text}"
+    
+    return {'messages': [{'role': 'system', 'content': build_system_prompt(record_type)},
+                         {'role': 'user', 'content': user_message}]}
+
+
+def build_packed_request(texts, record_type=None):
+    """Arguments of the model call translating several numbered strings."""
+    if Config.PROMPT_MODE != 'chat':
+        return {'prompt': build_packed_prompt(texts)}
+    
+    numbered_lines = '\n'.join(f"{number}. {text}" for number, text in enumerate(texts, start=1))
+    return {'messages': [{'role': 'system', 'content': build_system_prompt(record_type)},
+                         {'role': 'user', 'content': f"Translate these {len(texts)} numbered lines:\n\n{numbered_lines}"}]}
+
+
+def request_prompt_text(request):
+    """Every piece of prompt text a request sends to the model."""
+    if 'messages' in request:
+        return ''.join(message['content'] for message in request['messages'])
+    return request['prompt']
+
+
+def generated_text(request, chunk):
+    """Text of a generate or chat response (or stream chunk)."""
+    if 'messages' in request:
+        return chunk['message']['content']
+    return chunk['response']
+
+
+class PromptUsageStats:
+    """Prompt tokens the model actually evaluated, from the prompt_eval_count of finished calls.
+
+    Ollama leaves the cached prefix of a prompt out of prompt_eval_count, so
+    the difference to the (estimated) full prompt length is what prefix reuse
+    saved. Streamed calls cut short never receive the final counters and are
+    not measured.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.measured_calls = 0
+        self.prompt_tokens = 0
+        self.evaluated_tokens = 0
+    
+    def record(self, request, response):
+        """Count one finished call."""
+        evaluated = response.get('prompt_eval_count')
+        if evaluated is None:
+            return
+        
+        with self.lock:
+            self.measured_calls += 1
+            self.prompt_tokens += estimate_tokens(request_prompt_text(request))
+            self.evaluated_tokens += evaluated
+    
+    def stats(self):
+        """Evaluated and saved prompt tokens so far."""
+        with self.lock:
+            saved = max(0, self.prompt_tokens - self.evaluated_tokens)
+            return {
+                "mode": Config.PROMPT_MODE,
+                "measured_calls": self.measured_calls,
+                "prompt_tokens_estimated": self.prompt_tokens,
+                "prompt_tokens_evaluated": self.evaluated_tokens,
+                "prompt_tokens_saved": saved,
+                "saved_ratio": round(saved / self.prompt_tokens, 4) if self.prompt_tokens else 0.0
+            }
+
+
+def clean_translation(response_text):
+    """Strip the formatting the model sometimes wraps a single translation in."""
+    translated_text = response_text.strip()
+    return translated_text.replace("```", "").replace("json", "")
+
+
+def first_complete_line(response_text):
+    """First non-empty, newline terminated line of a streamed answer, or None."""
+    lines = response_text.split('\n')
+    for line in lines[:-1]:  # The last piece is still being generated
+        cleaned_line = clean_translation(line)
+        if cleaned_line:
+            return cleaned_line
+    return None
+
+
+def generation_options(texts):
+    """Sampling options for translating texts: deterministic, with room for the answer and little more."""
+    source_tokens = sum(estimate_tokens(text) for text in texts)
+    options = {
+        'temperature': Config.GENERATION_TEMPERATURE,
+        'num_predict': int(source_tokens * Config.GENERATION_TOKENS_PER_SOURCE_TOKEN) + Config.GENERATION_EXTRA_TOKENS * len(texts)
+    }
+    
+    if len(texts) == 1 and '\n' not in texts[0]:
+        # A one line source needs a one line answer, a blank line means the model started explaining
+        options['stop'] = ['\n\n']
+    
+    return options
+
+
+def single_line_complete(text):
+    """Completion check for a streamed translation of text, None when the whole answer is needed."""
+    if '\n' in text:
+        return None
+    return lambda response_text: first_complete_line(response_text) is not None
+
+
+def packed_lines_complete(expected_count):
+    """Completion check for a streamed packed answer: every numbered line has arrived."""
+    def is_complete(response_text):
+        finished_lines = response_text[:response_text.rfind('\n')]
+        return parse_numbered_translations(finished_lines.replace("```", ""), expected_count) is not None
+    return is_complete
+
+
+def read_translation(response_text, is_complete):
+    """The translation in a single translation answer, generated with the is_complete check."""
+    # A one line source keeps only the first line, dropping any explanation after it
+    if is_complete is not None:
+        translated_line = first_complete_line(response_text + '\n')
+        if translated_line is not None:
+            return translated_line
+    
+    return clean_translation(response_text)
+
+
+def read_packed_translations(response_text, expected_count):
+    """The translations in a packed answer, None when its numbered lines do not line up."""
+    return parse_numbered_translations(response_text.replace("```", ""), expected_count)
+
+
+def log_length_stop(response, options):
+    """Warn when a generation ran into its num_predict cap."""
+    if response.get('done_reason') == 'length':
+        print(f"[AI-SERVICE] Generation stopped at the {options['num_predict']} token cap")
+
 
 class AIService:
     """Service for managing AI client and translations."""
@@ -9,41 +259,346 @@ class AIService:
     def __init__(self):
         self.client = None
         self.config = Config()
+        self.client_lock = threading.Lock()
+        self.memory = None
+        self.memory_lock = threading.Lock()
+        self.memory_disabled = not self.config.TRANSLATION_MEMORY_ENABLED
+        self.fuzzy_index = None
+        if self.config.FUZZY_MEMORY_ENABLED:
+            self.fuzzy_index = FuzzyTranslationIndex(max_entries=self.config.FUZZY_MEMORY_MAX_ENTRIES)
+        # Shared by every job, worker and the async service so the model server never gets more calls than it runs in parallel
+        self.inference_slots = InferenceBudget(self.config.INFERENCE_CONCURRENCY)
+        self.warmup_status = {"state": "pending", "error": None, "seconds": None}
+        self.prompt_usage = PromptUsageStats()
         
     def get_client(self):
         """Get or initialize the AI client."""
-        if self.client is None:
+        # Translation workers may ask for the client at the same time
+        with self.client_lock:
+            if self.client is None:
+                try:
+                    client = OllamaBackendPool(self.config.OLLAMA_SERVICE_URLS,
+                                               failure_threshold=self.config.OLLAMA_BACKEND_FAILURE_THRESHOLD,
+                                               retry_after=self.config.OLLAMA_BACKEND_RETRY_SECONDS)
+                    ready = client.ensure_model(self.config.ENHANCE_PRODUCT_MODEL)
+                    self.client = client
+                    print(f"[AI-SERVICE] Connected to {ready} of {len(self.config.OLLAMA_SERVICE_URLS)} Ollama backends: {', '.join(self.config.OLLAMA_SERVICE_URLS)}")
+                except Exception as e:
+                    print(f"[AI-SERVICE] Error while connecting to Ollama service: {str(e)}")
+                    raise e
+        return self.client
+    
+    def warm_up(self):
+        """Connect, make sure the model is installed and load it so the first translation is fast."""
+        started = time.monotonic()
+        self.warmup_status = {"state": "warming", "error": None, "seconds": None}
+        try:
+            client = self.get_client()
+            client.preload(self.config.ENHANCE_PRODUCT_MODEL, self.config.OLLAMA_KEEP_ALIVE)
+            self.warmup_status = {"state": "ready", "error": None, "seconds": round(time.monotonic() - started, 2)}
+            print(f"[AI-SERVICE] Model {self.config.ENHANCE_PRODUCT_MODEL} is loaded (warm-up took {self.warmup_status['seconds']}s)")
+        except Exception as e:
+            self.warmup_status = {"state": "failed", "error": str(e), "seconds": round(time.monotonic() - started, 2)}
+            raise
+    
+    def start_background_warm_up(self):
+        """Warm up on a background thread so the web server can start serving right away."""
+        def warm_up_in_background():
             try:
-                self.client = ollama.Client(host=self.config.OLLAMA_SERVICE_URL)
-                self.client.pull(self.config.ENHANCE_PRODUCT_MODEL)
-                print(f"[AI-SERVICE] Connected to Ollama at {self.config.OLLAMA_SERVICE_URL}")
+                self.warm_up()
             except Exception as e:
-                print(f"[AI-SERVICE] Error while connecting to Ollama service: {str(e)}")
-                raise e
-        return self.client
+                # Translations retry the connection on their own, the service keeps running
+                print(f"[AI-SERVICE] Background warm-up failed: {str(e)}")
+        
+        warm_up_thread = threading.Thread(target=warm_up_in_background, name='model-warm-up')
+        warm_up_thread.daemon = True
+        warm_up_thread.start()
     
-    def translate_text(self, text):
-        """Translate English text to Romanian using AI."""
-        prompt = f'''Translate the following English text to Romanian. Return only the Romanian translation, no additional text or formatting:
-
-{text}'''
+    def get_backend_stats(self):
+        """Load and health of every Ollama backend, None before the first connection."""
+        client = self.client
+        return client.stats() if client else None
+    
+    def get_prompt_usage(self):
+        """Evaluated and saved prompt tokens of the finished model calls."""
+        return self.prompt_usage.stats()
+    
+    def get_memory(self):
+        """Get or open the persistent translation memory, None when disabled."""
+        with self.memory_lock:
+            if self.memory is None and not self.memory_disabled:
+                try:
+                    self.memory = TranslationMemory(self.config.TRANSLATION_MEMORY_PATH,
+                                                    self.config.TRANSLATION_MEMORY_MAX_ENTRIES)
+                    print(f"[AI-SERVICE] Translation memory opened at {self.config.TRANSLATION_MEMORY_PATH} ({self.memory.entry_count} entries)")
+                except Exception as e:
+                    print(f"[AI-SERVICE] Translation memory disabled, failed to open it: {str(e)}")
+                    self.memory_disabled = True
+        return self.memory
+    
+    def get_memory_stats(self):
+        """Hit/miss counters of the translation memory, None when disabled."""
+        memory = self.get_memory()
+        return memory.stats() if memory else None
+    
+    def lookup_memory(self, text):
+        """Return the stored translation for text, or None."""
+        memory = self.get_memory()
+        if memory is None:
+            return None
+        
+        try:
+            return memory.get(self.config.ENHANCE_PRODUCT_MODEL, prompt_version(), SOURCE_LANGUAGE, TARGET_LANGUAGE, text)
+        except Exception as e:
+            print(f"[AI-SERVICE] Translation memory lookup failed: {str(e)}")
+            return None
+    
+    def store_memory(self, text, translated_text):
+        """Remember a successful translation."""
+        memory = self.get_memory()
+        if memory is None or not translated_text:
+            return
+        
+        try:
+            memory.put(self.config.ENHANCE_PRODUCT_MODEL, prompt_version(), SOURCE_LANGUAGE, TARGET_LANGUAGE, text, translated_text)
+        except Exception as e:
+            print(f"[AI-SERVICE] Translation memory store failed: {str(e)}")
+    
+    def get_fuzzy_stats(self):
+        """Size and lookup cost of the similarity index, None when disabled."""
+        return self.fuzzy_index.stats() if self.fuzzy_index else None
+    
+    def remember_similar(self, text, translated_text):
+        """Make a translated template findable for near-duplicate lookups."""
+        if self.fuzzy_index is not None and translated_text:
+            self.fuzzy_index.add(text, translated_text)
+    
+    def find_similar(self, text):
+        """Translated templates resembling text, most similar first (empty when the index is disabled)."""
+        if self.fuzzy_index is None:
+            return []
+        return self.fuzzy_index.find_similar(text, limit=max(1, self.config.FUZZY_MEMORY_EXAMPLES),
+                                             min_similarity=self.config.FUZZY_MEMORY_MIN_SIMILARITY)
+    
+    def reuse_similar(self, text, matches):
+        """Translation of the best match when it is similar enough to stand in for text, else None."""
+        threshold = self.config.FUZZY_MEMORY_REUSE_THRESHOLD
+        if threshold <= 0 or not matches:
+            return None
+        
+        similarity, source_text, translated_text = matches[0]
+        # The borrowed translation must carry exactly the placeholders text will be restored into
+        if similarity < threshold or sorted(placeholder_pattern.findall(source_text)) != sorted(placeholder_pattern.findall(text)):
+            return None
+        
+        print(f"[AI-SERVICE] Reusing the translation of {source_text!r} for {text!r} (similarity {similarity:.2f})")
+        return translated_text
+    
+    def prompt_examples(self, matches):
+        """(source, translation) few-shot examples taken from similarity matches."""
+        return [(source_text, translated_text) for _, source_text, translated_text in matches[:self.config.FUZZY_MEMORY_EXAMPLES]]
+    
+    def translate_text(self, text, record_type=None):
+        """Translate English text to Romanian through its placeholder template."""
+        masked_text = mask_placeholders(text, self.config.PLACEHOLDER_MASKING_ENABLED)
+        return self.restore_translation(text, masked_text, self.translate_template(masked_text.text, record_type), record_type)
+    
+    def fill_template(self, masked_text, translated_template):
+        """(translation, False) from a translated template, or (None, True) when the original text must be translated instead."""
+        if translated_template is None:
+            return None, False
+        
+        translated_text = masked_text.restore(translated_template)
+        if translated_text is None:
+            print(f"[AI-SERVICE] Placeholders were lost in the translation of {masked_text.text!r}, translating the original text")
+            return None, True
+        
+        return translated_text, False
+    
+    def restore_translation(self, text, masked_text, translated_template, record_type=None):
+        """Fill a translated template with the values of text, translating text as is when that fails."""
+        translated_text, translate_original = self.fill_template(masked_text, translated_template)
+        if translate_original:
+            return self.generate_translation(text, record_type=record_type)
+        return translated_text
+    
+    def recall_template(self, text):
+        """(translation, None) when the memory or a near duplicate knows text, else (None, few-shot examples for it)."""
+        cached_text = self.lookup_memory(text)
+        if cached_text is not None:
+            self.remember_similar(text, cached_text)
+            return cached_text, None
+        
+        matches = self.find_similar(text)
+        reused_text = self.reuse_similar(text, matches)
+        if reused_text is not None:
+            # Not stored in the memory, which only holds exact translations
+            return reused_text, None
+        
+        return None, self.prompt_examples(matches)
+    
+    def recall_batch(self, texts):
+        """recall_template for several texts: their known translations and the examples of the others by index."""
+        results = []
+        examples_by_index = {}
+        
+        for index, text in enumerate(texts):
+            translated_text, examples = self.recall_template(text)
+            results.append(translated_text)
+            if translated_text is None:
+                examples_by_index[index] = examples
+        
+        return results, examples_by_index
+    
+    def remember_translation(self, text, translated_text):
+        """Keep a generated translation in the memory and the similarity index."""
+        self.store_memory(text, translated_text)
+        self.remember_similar(text, translated_text)
+    
+    def translate_template(self, text, record_type=None):
+        """Translate a (placeholder masked) text, consulting the translation memory first."""
+        translated_text, examples = self.recall_template(text)
+        if translated_text is not None:
+            return translated_text
+        
+        translated_text = self.generate_translation(text, examples, record_type)
+        self.remember_translation(text, translated_text)
+        
+        return translated_text
+    
+    def translate_batch(self, texts, record_type=None):
+        """Translate several short templates, packing the ones missing from the memory into one prompt."""
+        results, examples_by_index = self.recall_batch(texts)
+        missing = list(examples_by_index)
+        
+        if not missing:
+            return results
+        
+        missing_texts = [texts[index] for index in missing]
+        translations = self.generate_packed_translations(missing_texts, record_type) if len(missing_texts) > 1 else None
+        
+        if translations is None:
+            # Packing failed or was pointless, translate the strings one by one
+            translations = [self.generate_translation(texts[index], examples_by_index[index], record_type)
+                            for index in missing]
+        
+        for index, translated_text in zip(missing, translations):
+            results[index] = translated_text
+            self.remember_translation(texts[index], translated_text)
+        
+        return results
+    
+    def record_response(self, request, response, options, model_call):
+        """Account for a model response or streamed chunk and return its text."""
+        model_call.seen(response)
+        log_length_stop(response, options)
+        self.prompt_usage.record(request, response)
+        return generated_text(request, response)
+    
+    def run_generation(self, client, request, options, is_complete=None):
+        """Generate within the inference budget, streaming until is_complete says the answer is there.
+        
+        request holds either a prompt for the generate endpoint or messages for the chat endpoint.
+        """
+        endpoint = 'chat' if 'messages' in request else 'generate'
+        call = client.chat if endpoint == 'chat' else client.generate
+        streamed = self.config.GENERATION_STREAMING and is_complete is not None
+        
+        with ModelCall(endpoint, streamed) as model_call, self.inference_slots:
+            model_call.start()
+            if not streamed:
+                response = call(model=self.config.ENHANCE_PRODUCT_MODEL, options=options,
+                                keep_alive=self.config.OLLAMA_KEEP_ALIVE, **request)
+                return self.record_response(request, response, options, model_call)
+            
+            # A stream breaking midway is generated again, on another backend when there is one
+            attempts = len(client.backends)
+            broken = []
+            for attempt in range(1, attempts + 1):
+                stream = call(model=self.config.ENHANCE_PRODUCT_MODEL, options=options,
+                              keep_alive=self.config.OLLAMA_KEEP_ALIVE, stream=True, exclude=broken,
+                              **request)
+                parts = []
+                try:
+                    for chunk in stream:
+                        parts.append(self.record_response(request, chunk, options, model_call))
+                        # Stop reading (and let the server stop generating) once the answer is complete
+                        if '\n' in parts[-1] and is_complete(''.join(parts)):
+                            break
+                    return ''.join(parts)
+                except Exception as e:
+                    if attempt == attempts or not is_backend_failure(e):
+                        raise
+                    print(f"[AI-SERVICE] Stream broke after {len(parts)} chunks, generating again: {str(e)}")
+                    broken.append(getattr(e, 'backend_url', None))
+                finally:
+                    stream.close()
+    
+    def generate_packed_translations(self, texts, record_type=None):
+        """Translate numbered strings in one call; None when the answer does not line up."""
+        request = build_packed_request(texts, record_type)
         
         try:
             client = self.get_client()
             
-            response = client.generate(
-                model=self.config.ENHANCE_PRODUCT_MODEL, 
-                prompt=prompt,
-            )
+            response_text = self.run_generation(client, request, generation_options(texts), packed_lines_complete(len(texts)))
             
-            # Clean up the response
-            translated_text = response['response'].strip()
-            translated_text = translated_text.replace("```", "").replace("json", "")
+            translations = read_packed_translations(response_text, len(texts))
+            if translations is None:
+                print(f"[AI-SERVICE] Packed translation of {len(texts)} strings did not line up, falling back to single calls")
             
-            return translated_text
+            return translations
+        except Exception as e:
+            print(f"[AI-SERVICE] Error during packed translation: {str(e)}")
+            return None
+    
+    def generate_translation(self, text, examples=None, record_type=None):
+        """Translate English text to Romanian using AI."""
+        request = build_translation_request(text, examples, record_type)
+        
+        try:
+            client = self.get_client()
+            
+            is_complete = single_line_complete(text)
+            response_text = self.run_generation(client, request, generation_options([text]), is_complete)
+            return read_translation(response_text, is_complete)
         except Exception as e:
             print(f"[AI-SERVICE] Error during translation: {str(e)}")
             return None
 
 # Global AI service instance
 ai_service = AIService()
+
+
+def memory_lookup_samples():
+    """Hit/miss counters of the translation memory, nothing before it is opened."""
+    memory = ai_service.memory
+    if memory is None:
+        return None
+    return {('hit',): memory.hits, ('miss',): memory.misses}
+
+
+def memory_hit_ratio():
+    """Share of translation memory lookups answered from the memory."""
+    memory = ai_service.memory
+    if memory is None:
+        return None
+    lookups = memory.hits + memory.misses
+    return memory.hits / lookups if lookups else 0.0
+
+
+def backend_samples(client_name, client):
+    """Requests in flight per Ollama backend of a client, nothing before it connects."""
+    if client is None:
+        return None
+    return {(client_name, backend['url']): backend['outstanding_requests'] for backend in client.stats()}
+
+
+registry.function('translator_translation_memory_lookups_total',
+                  'Translation memory lookups of this process by result', ['result'],
+                  metric_type='counter').add_source(memory_lookup_samples)
+registry.function('translator_translation_memory_hit_ratio',
+                  'Share of translation memory lookups answered without a model call').add_source(memory_hit_ratio)
+ollama_backend_in_flight = registry.function('translator_ollama_backend_requests_in_flight',
+                                             'Requests in flight per Ollama backend', ['client', 'backend'])
+ollama_backend_in_flight.add_source(lambda: backend_samples('sync', ai_service.client))
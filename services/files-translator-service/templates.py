@@ -73,6 +73,12 @@ RESULT_TEMPLATE = '''
         {% if result_type == 'success' %}
             <div class="result-box success">
                 <h3>✅ Success!</h3>
+                {% if result.message %}
+                    <p>{{ result.message }}</p>
+                {% endif %}
+                {% if result.job_id %}
+                    <p><strong>Job:</strong> <a href="{{ job_link }}">{{ result.job_id }}</a></p>
+                {% endif %}
                 {% if result.input %}
                     <p><strong>Input:</strong> {{ result.input }}</p>
                 {% endif %}
@@ -147,7 +153,79 @@ RESULT_TEMPLATE = '''
                    {% endif %}
                 </p>
                 {% endif %}
+                {% if result.deduplication %}
+                <p><strong>Deduplication:</strong> 
+                   {{ result.deduplication.unique_sources }} unique of {{ result.deduplication.total_entries }} entries to translate, 
+                   {{ result.deduplication.reused_translations }} translations reused so far</p>
+                {% endif %}
+                {% if result.length_buckets %}
+                <p><strong>Length Buckets (estimated tokens):</strong></p>
+                <ul>
+                    {% for bucket in result.length_buckets %}
+                    <li>{{ bucket.bucket }}: {{ bucket.completed }}/{{ bucket.dispatched }} done, 
+                        {{ bucket.entries_per_second }} entries/s, {{ bucket.average_latency_seconds }}s average latency</li>
+                    {% endfor %}
+                </ul>
+                {% endif %}
+                {% if result.translation_memory %}
+                <p><strong>Translation Memory:</strong> 
+                   {{ result.translation_memory.entries }} entries, 
+                   {{ result.translation_memory.hits }} hits / {{ result.translation_memory.misses }} misses 
+                   ({{ (result.translation_memory.hit_ratio * 100) | round(1) }}% hit ratio)</p>
+                {% endif %}
+                {% if result.fuzzy_memory %}
+                <p><strong>Fuzzy Memory:</strong> 
+                   {{ result.fuzzy_memory.entries }} / {{ result.fuzzy_memory.max_entries }} pairs, 
+                   {{ result.fuzzy_memory.lookups }} lookups ({{ result.fuzzy_memory.average_lookup_ms }} ms average)</p>
+                {% endif %}
+                {% if result.prompt_usage and result.prompt_usage.measured_calls %}
+                <p><strong>Prompt Tokens ({{ result.prompt_usage.mode }} mode):</strong> 
+                   {{ result.prompt_usage.prompt_tokens_evaluated }} evaluated of ~{{ result.prompt_usage.prompt_tokens_estimated }} sent, 
+                   ~{{ result.prompt_usage.prompt_tokens_saved }} saved by prefix reuse 
+                   ({{ (result.prompt_usage.saved_ratio * 100) | round(1) }}%) over {{ result.prompt_usage.measured_calls }} calls</p>
+                {% endif %}
+                {% if result.ollama_backends %}
+                <p><strong>Ollama Backends:</strong></p>
+                <ul>
+                    {% for backend in result.ollama_backends %}
+                    <li>{{ backend.url }}: {{ '✅ healthy' if backend.healthy else '❌ out of rotation' }}, 
+                        {{ backend.outstanding_requests }} in flight, {{ backend.requests }} requests, {{ backend.failures }} failures</li>
+                    {% endfor %}
+                </ul>
+                {% endif %}
+            </div>
+        {% endif %}
+        
+        {% if progress_stream %}
+            <div class="result-box info" id="live-progress">
+                <h3>📡 Live Progress</h3>
+                <p><strong>State:</strong> <span data-progress="state">connecting...</span></p>
+                <p><strong>Done:</strong> 
+                   <span data-progress="processed">0</span> translated, 
+                   <span data-progress="copied">0</span> copied, 
+                   <span data-progress="skipped">0</span> skipped, 
+                   <span data-progress="errors">0</span> errors 
+                   (<span data-progress="remaining">0</span> of <span data-progress="total">0</span> <span data-progress="unit">entries</span> remaining)</p>
+                <p><strong>Rate:</strong> <span data-progress="rate_per_second">0</span>/s, 
+                   <strong>ETA:</strong> <span data-progress="eta">-</span></p>
             </div>
+            <script>
+                (function () {
+                    var source = new EventSource("{{ progress_stream }}");
+                    source.addEventListener("progress", function (event) {
+                        var progress = JSON.parse(event.data);
+                        var eta = progress.eta_seconds;
+                        progress.eta = eta === null ? "-" : Math.floor(eta / 60) + "m " + (eta % 60) + "s";
+                        document.querySelectorAll("#live-progress [data-progress]").forEach(function (element) {
+                            element.textContent = progress[element.dataset.progress];
+                        });
+                    });
+                    // The run is over, do not let the browser reconnect
+                    source.addEventListener("done", function () {
+                        source.close();
+                    });
+                })();
+            </script>
         {% endif %}
         
         {% if result.errors %}
@@ -171,7 +249,7 @@ RESULT_TEMPLATE = '''
             <a href="javascript:location.reload()" class="btn btn-success">🔄 Refresh Status</a>
         {% endif %}
         {% if show_stop_batch %}
-            <a href="/xml-stop-batch-processing" class="btn" style="background: #dc3545; margin-left: 10px;">🛑 Stop processing</a>
+            <a href="{{ stop_link or '/xml-stop-batch-processing' }}" class="btn" style="background: #dc3545; margin-left: 10px;">🛑 Stop processing</a>
         {% endif %}
     </div>
 </body>
@@ -218,8 +296,9 @@ BASIC_TRANSLATOR_TEMPLATE = '''
         
         <div class="route-card">
             <h3>🚀 Process All Lines</h3>
-            <p>Translate all remaining lines in the input file. This may take some time.</p>
+            <p>Translate all remaining lines in the input file in the background and follow the progress live.</p>
             <a href="/process-all-view" class="btn btn-warning">Process All</a>
+            <a href="/stop-processing-view" class="btn" style="background: #dc3545;">🛑 Stop processing</a>
         </div>
         
         <div style="text-align: center; margin-top: 30px;">
@@ -300,6 +379,12 @@ XML_TRANSLATOR_TEMPLATE = '''
             {% endif %}
         </div>
         
+        <div class="route-card">
+            <h3>📚 XML Translation Jobs</h3>
+            <p>Queue other string files (e.g. the Automatron, Far Harbor or Nuka-World DLCs) with <code>POST /xml-jobs</code> and follow them here. Running jobs share the model concurrency budget.</p>
+            <a href="/xml-jobs" class="btn">View XML Jobs</a>
+        </div>
+        
         <div style="text-align: center; margin-top: 30px;">
             <a href="/" class="btn btn-secondary">🏠 Back to Home</a>
         </div>
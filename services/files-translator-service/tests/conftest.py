@@ -0,0 +1,42 @@
+"""Test setup: the service modules import each other as top-level modules."""
+
+import os
+import socket
+import sys
+import tempfile
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if SERVICE_DIR not in sys.path:
+    sys.path.insert(0, SERVICE_DIR)
+
+# Keep the stores the services open at import time out of /app
+os.environ.setdefault('JOB_STORE_PATH', os.path.join(tempfile.mkdtemp(prefix='translator-tests-'), 'jobs.sqlite3'))
+os.environ.setdefault('TRANSLATION_MEMORY_ENABLED', 'false')
+
+from benchmarks.stub_ollama import StubOllamaServer  # noqa: E402
+
+
+def free_port():
+    """A local port nothing listens on (until a test starts something there)."""
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def start_stub():
+    """Start stub Ollama servers for a test and stop them after it."""
+    stubs = []
+
+    def start(**options):
+        options.setdefault('latency', 'fixed:0.01')
+        options.setdefault('tokens_per_second', 'fixed:500')
+        stub = StubOllamaServer(**options).start()
+        stubs.append(stub)
+        return stub
+
+    yield start
+    for stub in stubs:
+        stub.stop()
@@ -0,0 +1,77 @@
+"""Stored XML jobs: a process whose job was requeued and claimed elsewhere stops writing its files."""
+
+import time
+
+import pytest
+
+from benchmarks.synthetic import write_xml_file
+from config import Config
+from job_manager import XMLJobManager
+from job_store import BUSY_TIMEOUT_SECONDS, MISSED_HEARTBEATS, JobStore
+from ollama_backends import OllamaBackendPool
+from services import ai_service
+from xml_writer import XML_FOOTER
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def file_state(path):
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def test_lease_outlives_the_busy_timeout_and_several_heartbeats(tmp_path):
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'), lease_seconds=5)
+    XMLJobManager(store, str(tmp_path), heartbeat_seconds=2)
+
+    assert store.lease_seconds == BUSY_TIMEOUT_SECONDS + MISSED_HEARTBEATS * 2
+
+
+def test_job_taken_over_after_its_lease_expired_stops_writing(tmp_path, start_stub, monkeypatch):
+    stub = start_stub(latency='fixed:0.01')
+    monkeypatch.setattr(ai_service, 'client', OllamaBackendPool([stub.url]))
+    monkeypatch.setattr(ai_service, 'fuzzy_index', None)
+    monkeypatch.setattr(Config, 'XML_OUTPUT_FLUSH_EVERY', 5)
+    monkeypatch.setattr(Config, 'XML_TRANSLATION_WORKERS', 1)
+    monkeypatch.setattr(Config, 'ASYNC_PIPELINE_ENABLED', False)
+
+    input_path = str(tmp_path / 'in.xml')
+    output_path = str(tmp_path / 'out.xml')
+    write_xml_file(input_path, 400, seed=3)
+
+    store = JobStore(str(tmp_path / 'jobs.sqlite3'))
+    manager = XMLJobManager(store, str(tmp_path), heartbeat_seconds=0.1)
+    # No keeper thread: the lease is expired by hand below
+    job = store.create('xml', input_path, output_path, {})
+    manager.start_queued_jobs()
+    processor = manager.get_processor(input_path, output_path)
+    wait_for(lambda: processor.cursor.output_size is not None)
+
+    # The driver stalled past its lease: another process requeues and claims the job
+    store.connection.execute('UPDATE jobs SET heartbeat_at = 0 WHERE id = ?', (job['id'],))
+    assert store.requeue_stale('xml') == [job['id']]
+    assert store.claim_next('xml', 'other-process', 1)['id'] == job['id']
+
+    wait_for(lambda: processor.files_lost or not processor.batch_processing)
+    assert processor.files_lost
+    output = file_state(output_path)
+    cursor = file_state(processor.cursor.cursor_path)
+
+    processor.batch_thread.join(10)
+    assert not processor.batch_processing
+    assert processor.last_run['outcome'] == 'failed'
+
+    # Nothing was flushed, checkpointed or finalized after the takeover was noticed
+    assert file_state(output_path) == output
+    assert file_state(processor.cursor.cursor_path) == cursor
+    assert not output.endswith(XML_FOOTER.encode('utf-8'))
+    # The journal stays open for the new driver, which resumes from it
+    assert processor.journal.is_interrupted()
+
+    job = store.get(job['id'])
+    assert job['status'] == 'running' and job['owner'] == 'other-process'
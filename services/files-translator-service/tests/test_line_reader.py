@@ -0,0 +1,41 @@
+"""LineCounter: appends are counted incrementally, rewrites and truncations from the start."""
+
+from line_reader import LineCounter
+
+
+def write(path, text, mode='w'):
+    with open(path, mode, encoding='utf-8') as file:
+        file.write(text)
+
+
+def test_appended_lines_are_added_to_the_count(tmp_path):
+    path = tmp_path / 'input.txt'
+    write(path, 'one\ntwo\n')
+    counter = LineCounter(str(path))
+    assert counter.count() == 2
+
+    write(path, 'three\nfour', mode='a')
+    assert counter.count() == 4
+
+
+def test_file_rewritten_in_place_is_counted_again(tmp_path):
+    path = tmp_path / 'input.txt'
+    write(path, 'a single line, longer than the first lines of the rewrite\n')
+    counter = LineCounter(str(path))
+    assert counter.count() == 1
+
+    # Same inode, larger size, but not an append
+    inode = path.stat().st_ino
+    write(path, ''.join(f'line {index}\n' for index in range(20)))
+    assert path.stat().st_ino == inode
+    assert counter.count() == 20
+
+
+def test_truncated_file_is_counted_again(tmp_path):
+    path = tmp_path / 'input.txt'
+    write(path, 'a\nb\nc\n')
+    counter = LineCounter(str(path))
+    assert counter.count() == 3
+
+    write(path, 'a\n')
+    assert counter.count() == 1
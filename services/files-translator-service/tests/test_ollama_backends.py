@@ -0,0 +1,161 @@
+"""OllamaBackendPool against stub Ollama servers: balancing, removal, re-admission and failover."""
+
+import asyncio
+import time
+
+import pytest
+
+from conftest import free_port
+from ollama_backends import AsyncOllamaBackendPool, OllamaBackendPool
+from services import AIService, single_line_complete
+
+
+def generate(pool, prompt='Hello', **options):
+    return pool.generate(model='stub', prompt=prompt, **options)['response']
+
+
+def streamed_text(stream):
+    return ''.join(chunk.get('response') or '' for chunk in stream)
+
+
+def test_least_outstanding_backend_is_chosen(start_stub):
+    stubs = [start_stub(), start_stub()]
+    pool = OllamaBackendPool([stub.url for stub in stubs])
+
+    # An open stream keeps its backend busy, so the next call must go to the idle one
+    first = pool.generate(model='stub', prompt='First', stream=True)
+    second = pool.generate(model='stub', prompt='Second', stream=True)
+    assert [backend.outstanding for backend in pool.backends] == [1, 1]
+    assert [stub.stats()['generations'] for stub in stubs] == [1, 1]
+
+    assert streamed_text(first) == '[ro] First\n'
+    assert pool.backends[0].outstanding + pool.backends[1].outstanding == 1
+    busy = 0 if pool.backends[0].outstanding else 1
+    generate(pool, 'Third')
+    assert stubs[1 - busy].stats()['generations'] == 2
+
+    second.close()
+    assert [backend.outstanding for backend in pool.backends] == [0, 0]
+
+
+def test_idle_backends_share_requests_round_robin(start_stub):
+    stubs = [start_stub(), start_stub(), start_stub()]
+    pool = OllamaBackendPool([stub.url for stub in stubs])
+
+    for index in range(6):
+        generate(pool, f'Line {index}')
+
+    assert [stub.stats()['generations'] for stub in stubs] == [2, 2, 2]
+
+
+def test_backend_is_removed_after_consecutive_failures(start_stub):
+    stub = start_stub()
+    dead_url = f"http://127.0.0.1:{free_port()}"
+    pool = OllamaBackendPool([dead_url, stub.url], failure_threshold=2, retry_after=60)
+
+    answers = [generate(pool, f'Line {index}') for index in range(6)]
+
+    assert answers == [f'[ro] Line {index}' for index in range(6)]
+    dead, alive = pool.backends
+    assert not dead.healthy
+    assert dead.failures == 2 and dead.requests == 2
+    assert alive.healthy and alive.requests == 6
+
+
+def test_removed_backend_is_readmitted_after_a_successful_probe(start_stub):
+    port = free_port()
+    stub = start_stub()
+    pool = OllamaBackendPool([f"http://127.0.0.1:{port}", stub.url], failure_threshold=1, retry_after=0.2)
+
+    generate(pool, 'Before')
+    revived = pool.backends[0]
+    assert not revived.healthy
+
+    # Still down when its probe comes: it stays out and waits another retry_after
+    time.sleep(0.25)
+    generate(pool, 'Probe fails')
+    assert not revived.healthy and revived.failures == 2
+
+    restarted = start_stub(port=port)
+    generate(pool, 'Too early')
+    assert restarted.stats()['generations'] == 0
+    time.sleep(0.25)
+    answers = [generate(pool, f'After {index}') for index in range(4)]
+
+    assert answers == [f'[ro] After {index}' for index in range(4)]
+    assert revived.healthy and revived.consecutive_failures == 0
+    # The probe and then its share of the round robin
+    assert restarted.stats()['generations'] == 3
+
+
+def test_request_in_flight_when_a_backend_went_down_does_not_end_its_probe(start_stub):
+    flaky = start_stub(break_streams_after=2)
+    stub = start_stub()
+    pool = OllamaBackendPool([flaky.url, stub.url], failure_threshold=1, retry_after=0.2)
+    backend = pool.backends[0]
+
+    in_flight = pool.generate(model='stub', prompt='Before', stream=True)
+    pool._mark_down(backend, "Test", "marked down")
+    time.sleep(0.25)
+    probe = pool.generate(model='stub', prompt='Probe', stream=True)
+    assert backend.probing
+
+    # The old request breaks while the probe is still running
+    with pytest.raises(Exception):
+        streamed_text(in_flight)
+    assert backend.probing
+
+    generate(pool, 'Meanwhile')
+    assert flaky.stats()['generations'] == 2
+    probe.close()
+    assert not backend.probing
+
+
+def test_streams_fail_over_when_a_backend_refuses_connections(start_stub):
+    stub = start_stub()
+    dead_url = f"http://127.0.0.1:{free_port()}"
+    pool = OllamaBackendPool([dead_url, stub.url], failure_threshold=2, retry_after=60)
+
+    answers = [streamed_text(pool.generate(model='stub', prompt=f'Line {index}', stream=True)) for index in range(4)]
+
+    assert answers == [f'[ro] Line {index}\n' for index in range(4)]
+    assert not pool.backends[0].healthy
+    assert [backend.outstanding for backend in pool.backends] == [0, 0]
+
+
+def test_async_streams_fail_over_when_a_backend_refuses_connections(start_stub):
+    stub = start_stub()
+    dead_url = f"http://127.0.0.1:{free_port()}"
+
+    async def translate_all():
+        pool = AsyncOllamaBackendPool([dead_url, stub.url], failure_threshold=2, retry_after=60)
+
+        async def translate(prompt):
+            stream = await pool.generate(model='stub', prompt=prompt, stream=True)
+            return ''.join([chunk.get('response') or '' async for chunk in stream])
+
+        answers = await asyncio.gather(*(translate(f'Line {index}') for index in range(4)))
+        return pool, answers
+
+    pool, answers = asyncio.run(translate_all())
+
+    assert answers == [f'[ro] Line {index}\n' for index in range(4)]
+    assert not pool.backends[0].healthy
+    assert [backend.outstanding for backend in pool.backends] == [0, 0]
+
+
+def test_stream_breaking_midway_is_generated_again_on_another_backend(start_stub):
+    breaking = start_stub(break_streams_after=2)
+    stub = start_stub()
+    pool = OllamaBackendPool([breaking.url, stub.url], failure_threshold=2, retry_after=60)
+    service = AIService()
+    service.config.ENHANCE_PRODUCT_MODEL = 'stub'
+    service.config.GENERATION_STREAMING = True
+
+    answers = [service.run_generation(pool, {'prompt': f'Line {index}'}, {}, single_line_complete(f'Line {index}'))
+               for index in range(4)]
+
+    assert answers == [f'[ro] Line {index}\n' for index in range(4)]
+    assert breaking.stats()['broken_streams'] == 2
+    assert not pool.backends[0].healthy
+    assert [backend.outstanding for backend in pool.backends] == [0, 0]
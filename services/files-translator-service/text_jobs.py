@@ -0,0 +1,114 @@
+"""Background jobs translating the text input file with /process-all."""
+
+import threading
+from config import Config
+from file_processor import FileProcessor
+from job_manager import job_store
+from job_store import StoredJobManager
+
+# Options a job may override, with the type they are converted to
+JOB_OPTIONS = {
+    'workers': int
+}
+
+
+class TextJobManager(StoredJobManager):
+    """Runs /process-all of the text file on a background thread, one job at a time.
+
+    Submitting returns a job ID at once; the job can then be queried for its
+    progress, followed as Server-Sent Events or cancelled, from any server
+    process. Its result is the report /process-all used to return (processed
+    and skipped counts, errors, file paths).
+    """
+
+    kind = 'text'
+    log_tag = 'TEXT-JOBS'
+
+    def __init__(self, store, processor, heartbeat_seconds=2.0):
+        super().__init__(store, 1, heartbeat_seconds)
+        self.processor = processor
+
+    @staticmethod
+    def parse_options(options):
+        """Validate the per-job overrides of the processing configuration."""
+        parsed = {}
+        for name, value in (options or {}).items():
+            if name not in JOB_OPTIONS:
+                raise ValueError(f"Unknown job option: {name}")
+            parsed[name] = JOB_OPTIONS[name](value)
+
+        if parsed.get('workers', 1) < 1:
+            raise ValueError("workers must be at least 1")
+        return parsed
+
+    def submit(self, options=None):
+        """Start translating the remaining lines of the input file in the background."""
+        try:
+            options = self.parse_options(options)
+        except (TypeError, ValueError) as e:
+            return {"status": "error", "error": "Invalid text job", "details": str(e)}
+
+        result = self.queue_job(self.processor.input_path, self.processor.output_path, options,
+                                self.processor.processing_busy())
+        if result["status"] == "success":
+            result["message"] = f"Processing started in the background as job {result['job']['id']}."
+        return result
+
+    def running_job_id(self):
+        """ID of the job processing the file, whichever process drives it."""
+        job = self.store.active_job_for(self.processor.input_path)
+        return job['id'] if job is not None and job['kind'] == self.kind else None
+
+    def process_next_line(self):
+        """Process one line, unless a job or another process is working on the file."""
+        with self.file_lease(self.processor.input_path, self.processor.output_path) as acquired:
+            if not acquired:
+                return self.processor.processing_busy()
+            return self.processor.process_next_line()
+
+    def run_local(self, job):
+        """Process every remaining line of a claimed job on a background thread."""
+        self.processor.stop_requested = False
+        self.processor.progress.prepare()
+        with self.lock:
+            self.local_jobs[job['id']] = self.processor
+
+        thread = threading.Thread(target=self._run_job, args=(job,))
+        thread.daemon = True
+        thread.start()
+
+    def _run_job(self, job):
+        """Process every remaining line and record the report."""
+        try:
+            result = self.processor.process_all_lines(job['options'].get('workers'),
+                                                      fence=self.ownership_check(job['id']))
+        except Exception as e:
+            print(f"[TEXT-JOBS] Error in job {job['id']}: {str(e)}")
+            result = {"status": "error", "error": "An error occurred while processing all lines", "details": str(e)}
+
+        if result['status'] == 'stopped':
+            status = 'cancelled' if self.store.get(job['id'])['cancel_requested'] else 'stopped'
+        elif result['status'] == 'completed' and not result['errors']:
+            status = 'completed'
+        else:
+            status = 'failed'
+        self.finish_local(job['id'], status, result)
+
+    def stop_local(self, job_id):
+        with self.lock:
+            if job_id in self.local_jobs:
+                self.processor.stop_requested = True
+
+    def local_tracker(self, job_id):
+        with self.lock:
+            return self.processor.progress if job_id in self.local_jobs else None
+
+    def local_progress(self, job_id):
+        tracker = self.local_tracker(job_id)
+        return tracker.snapshot() if tracker is not None else None
+
+
+# Global text job manager instance, owning the processor of the configured input/output pair
+text_job_manager = TextJobManager(job_store,
+                                  FileProcessor(Config.INPUT_FILE_PATH, Config.OUTPUT_FILE_PATH),
+                                  Config.JOB_HEARTBEAT_SECONDS)
@@ -0,0 +1,113 @@
+"""Persistent SQLite translation memory."""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+whitespace_pattern = re.compile(r'[ \t]+')
+
+
+def normalize_source_text(text):
+    """Normalize source text so trivially different copies share one entry."""
+    text = unicodedata.normalize('NFC', text).strip()
+    return whitespace_pattern.sub(' ', text)
+
+
+class TranslationMemory:
+    """Translations keyed by model, prompt version, languages and normalized source text."""
+
+    def __init__(self, db_path, max_entries=500000):
+        self.db_path = db_path
+        self.max_entries = max(1, max_entries)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('''
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                source_language TEXT NOT NULL,
+                target_language TEXT NOT NULL,
+                source_text TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                last_used REAL NOT NULL
+            )
+        ''')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS translations_last_used ON translations (last_used)')
+        self.connection.commit()
+
+        self.entry_count = self.connection.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+
+    @staticmethod
+    def make_key(model, prompt_version, source_language, target_language, text):
+        """Hash every part that influences the translation into one lookup key."""
+        parts = [model, prompt_version, source_language, target_language, normalize_source_text(text)]
+        return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, model, prompt_version, source_language, target_language, text):
+        """Return the stored translation, or None on a miss."""
+        key = self.make_key(model, prompt_version, source_language, target_language, text)
+
+        with self.lock:
+            row = self.connection.execute('SELECT translation FROM translations WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.connection.execute('UPDATE translations SET last_used = ? WHERE key = ?', (time.time(), key))
+            self.connection.commit()
+            return row[0]
+
+    def put(self, model, prompt_version, source_language, target_language, text, translation):
+        """Store a translation, evicting the least recently used entries when full."""
+        key = self.make_key(model, prompt_version, source_language, target_language, text)
+
+        with self.lock:
+            cursor = self.connection.execute('''
+                INSERT OR IGNORE INTO translations
+                    (key, model, prompt_version, source_language, target_language, source_text, translation, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (key, model, prompt_version, source_language, target_language,
+                  normalize_source_text(text), translation, time.time()))
+            self.entry_count += cursor.rowcount
+
+            if self.entry_count > self.max_entries:
+                self._evict()
+
+            self.connection.commit()
+
+    def _evict(self):
+        """Drop the least recently used tenth of the memory."""
+        target = int(self.max_entries * 0.9)
+        self.connection.execute('''
+            DELETE FROM translations WHERE key IN (
+                SELECT key FROM translations ORDER BY last_used ASC LIMIT ?
+            )
+        ''', (self.entry_count - target,))
+        self.entry_count = target
+        print(f"[TRANSLATION-MEMORY] Evicted least recently used entries, {self.entry_count} remaining")
+
+    def stats(self):
+        """Hit/miss counters for this process and the stored entry count."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.entry_count,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,356 @@
+"""Concurrent translation pool with in-order result delivery."""
+
+import asyncio
+import bisect
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from metrics import translations_pending
+from services import estimate_tokens
+
+
+def completed_future(result):
+    """Wrap an already known result so it can sit in the reorder buffer."""
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+class TranslationPool:
+    """Keeps up to N translation requests in flight against the AI service.
+
+    When a batch function is given, short single-line strings are collected
+    into packs bounded by a token budget and translated with one call each.
+    A pack only holds strings of one group (the record type), which is passed
+    on to the translate functions.
+    """
+
+    def __init__(self, translate_fn, workers=1, translate_batch_fn=None,
+                 pack_max_strings=1, pack_token_budget=0, pack_max_string_tokens=0):
+        self.translate_fn = translate_fn
+        self.translate_batch_fn = translate_batch_fn
+        self.workers = max(1, workers)
+        self.pack_max_strings = max(1, pack_max_strings)
+        self.pack_token_budget = pack_token_budget
+        self.pack_max_string_tokens = pack_max_string_tokens
+        self.executor = self.create_executor()
+        self.pending_pack = []
+        self.pending_pack_tokens = 0
+        self.pending_pack_group = None
+
+    def create_executor(self):
+        """Worker threads running the translate functions."""
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='translation-worker')
+
+    def window_size(self):
+        """How many entries a caller should keep in flight to saturate the workers."""
+        return self.workers * self.pack_max_strings * 2
+
+    def can_pack(self, text):
+        """Whether text is short enough to share a prompt with other strings."""
+        return (self.translate_batch_fn is not None
+                and self.pack_max_strings > 1
+                and '\n' not in text
+                and estimate_tokens(text) <= self.pack_max_string_tokens)
+
+    def submit(self, text, group=None):
+        """Queue a translation and return its future."""
+        if not self.can_pack(text):
+            return self.executor.submit(self.translate_fn, text, group)
+
+        tokens = estimate_tokens(text)
+        if self.pending_pack and (self.pending_pack_tokens + tokens > self.pack_token_budget
+                                  or group != self.pending_pack_group):
+            self.flush()
+
+        future = Future()
+        self.pending_pack.append((text, future))
+        self.pending_pack_tokens += tokens
+        self.pending_pack_group = group
+
+        if len(self.pending_pack) >= self.pack_max_strings:
+            self.flush()
+
+        return future
+
+    def flush(self):
+        """Send the partially filled pack to the workers."""
+        if not self.pending_pack:
+            return
+
+        pack = self.pending_pack
+        self.pending_pack = []
+        self.pending_pack_tokens = 0
+        self.executor.submit(self._translate_pack, pack, self.pending_pack_group)
+
+    def _translate_pack(self, pack, group=None):
+        """Translate one pack and resolve the future of every string in it."""
+        try:
+            results = self.translate_batch_fn([text for text, _ in pack], group)
+        except Exception as e:
+            print(f"[TRANSLATION-POOL] Error during packed translation: {str(e)}")
+            results = [None] * len(pack)
+
+        for (_, future), result in zip(pack, results):
+            if future.set_running_or_notify_cancel():
+                future.set_result(result)
+
+    def shutdown(self, cancel_pending=False):
+        """Stop the workers, optionally dropping translations that have not started."""
+        if cancel_pending:
+            for _, future in self.pending_pack:
+                future.cancel()
+            self.pending_pack = []
+        else:
+            self.flush()
+        self.executor.shutdown(wait=True, cancel_futures=cancel_pending)
+
+
+class AsyncTranslationPool(TranslationPool):
+    """TranslationPool running every request as a task on the AsyncAIService loop.
+
+    workers is the number of requests kept in flight; they cost no OS thread,
+    the model calls themselves are bounded by the service's inference budget.
+    Futures are the service's concurrent futures, so callers cannot tell the
+    two pools apart.
+    """
+
+    def __init__(self, async_service, workers=1, pack_max_strings=1,
+                 pack_token_budget=0, pack_max_string_tokens=0):
+        self.async_service = async_service
+        super().__init__(async_service.translate_template, workers, async_service.translate_batch,
+                         pack_max_strings, pack_token_budget, pack_max_string_tokens)
+        self.lock = threading.Lock()
+        self.in_flight = set()
+
+    def create_executor(self):
+        """No worker threads, every request runs on the event loop."""
+        return None
+
+    def _track(self, future):
+        """Remember a running task until it finishes so shutdown can cancel it."""
+        with self.lock:
+            self.in_flight.add(future)
+        future.add_done_callback(self._forget)
+        return future
+
+    def _forget(self, future):
+        """Drop a finished task from the in-flight set."""
+        with self.lock:
+            self.in_flight.discard(future)
+
+    def submit(self, text, group=None):
+        """Queue a translation and return its future."""
+        if not self.can_pack(text):
+            return self._track(self.async_service.submit(self.translate_fn(text, group)))
+        return super().submit(text, group)
+
+    def flush(self):
+        """Send the partially filled pack to the event loop."""
+        if not self.pending_pack:
+            return
+
+        pack = self.pending_pack
+        self.pending_pack = []
+        self.pending_pack_tokens = 0
+        self._track(self.async_service.submit(self._translate_pack(pack, self.pending_pack_group)))
+
+    async def _translate_pack(self, pack, group=None):
+        """Translate one pack and resolve the future of every string in it."""
+        try:
+            results = await self.translate_batch_fn([text for text, _ in pack], group)
+        except asyncio.CancelledError:
+            for _, future in pack:
+                future.cancel()
+            raise
+        except Exception as e:
+            print(f"[TRANSLATION-POOL] Error during packed translation: {str(e)}")
+            results = [None] * len(pack)
+
+        for (_, future), result in zip(pack, results):
+            if future.set_running_or_notify_cancel():
+                future.set_result(result)
+
+    def shutdown(self, cancel_pending=False):
+        """Wait for the in-flight tasks, or cancel them when cancel_pending is set."""
+        if cancel_pending:
+            for _, future in self.pending_pack:
+                future.cancel()
+            self.pending_pack = []
+        else:
+            self.flush()
+
+        with self.lock:
+            in_flight = list(self.in_flight)
+        if cancel_pending:
+            for future in in_flight:
+                future.cancel()
+        wait(in_flight)
+
+
+class ReorderBuffer:
+    """Holds in-flight work and releases it strictly in submission order."""
+
+    def __init__(self, capacity, before_wait=None):
+        self.capacity = max(1, capacity)
+        self.before_wait = before_wait
+        self.items = deque()
+
+    def __len__(self):
+        return len(self.items)
+
+    def add(self, item, future):
+        """Append a work item together with the future producing its result."""
+        self.items.append((item, future))
+
+    def is_full(self):
+        """Whether the caller should wait for the oldest item before adding more."""
+        return len(self.items) >= self.capacity
+
+    def head_ready(self):
+        """Whether the oldest item can be released without blocking."""
+        return bool(self.items) and self.items[0][1].done()
+
+    def pop(self):
+        """Wait for the oldest item and return (item, result)."""
+        item, future = self.items.popleft()
+        if not future.done() and self.before_wait is not None:
+            # Make sure the item we are about to wait for has actually been sent
+            self.before_wait()
+        return item, future.result()
+
+    def cancel_all(self):
+        """Drop every item that has not been released yet."""
+        while self.items:
+            _, future = self.items.popleft()
+            future.cancel()
+
+
+class LengthBucketScheduler:
+    """Groups pending translations by estimated token length before sending them to the pool.
+
+    Short buckets are released a full pack at a time and longer ones once
+    there is one item per worker, so similar-sized work runs side by side
+    instead of a holotape stalling a pack of labels. Within a bucket, strings
+    of the same group (record type) are sent one after another, so they share
+    packs and the cached system prompt of their record type. Results still
+    come back through per-entry futures, so callers keep their own ordering.
+    """
+
+    def __init__(self, pool, bucket_bounds):
+        self.pool = pool
+        self.bucket_bounds = sorted(bucket_bounds)
+        self.lock = threading.Lock()
+        self.buckets = []
+
+        lower_bound = 0
+        for upper_bound in self.bucket_bounds + [None]:
+            if upper_bound is None:
+                label = f">{lower_bound}"
+            else:
+                label = f"{lower_bound + 1}-{upper_bound}"
+            packable = upper_bound is not None and upper_bound <= pool.pack_max_string_tokens
+            self.buckets.append({
+                'label': label,
+                'dispatch_size': pool.pack_max_strings if packable else pool.workers,
+                'pending': [],
+                'dispatched': 0,
+                'completed': 0,
+                'tokens': 0,
+                'latency_total': 0.0,
+                'first_dispatch': None,
+                'last_completion': None
+            })
+            lower_bound = upper_bound
+
+    def _bucket_for(self, tokens):
+        """Index of the bucket holding strings of the given estimated length."""
+        return bisect.bisect_left(self.bucket_bounds, tokens)
+
+    def submit(self, text, group=None):
+        """Queue a translation in its length bucket and return its future."""
+        tokens = estimate_tokens(text)
+        bucket = self.buckets[self._bucket_for(tokens)]
+        future = Future()
+        translations_pending.inc()
+        future.add_done_callback(lambda done: translations_pending.dec())
+        bucket['pending'].append((text, tokens, future, group))
+
+        if len(bucket['pending']) >= bucket['dispatch_size']:
+            self._dispatch(bucket)
+
+        return future
+
+    def flush(self):
+        """Send every partially filled bucket to the pool."""
+        for bucket in self.buckets:
+            if bucket['pending']:
+                self._dispatch(bucket)
+
+    def _dispatch(self, bucket):
+        """Hand one bucket's pending strings to the pool as a group."""
+        pending = bucket['pending']
+        bucket['pending'] = []
+        dispatched_at = time.monotonic()
+
+        # Stable sort: same-group strings become consecutive, each group keeps its source order
+        pending.sort(key=lambda item: item[3] or '')
+
+        with self.lock:
+            bucket['dispatched'] += len(pending)
+            if bucket['first_dispatch'] is None:
+                bucket['first_dispatch'] = dispatched_at
+
+        for text, tokens, future, group in pending:
+            inner_future = self.pool.submit(text, group)
+            inner_future.add_done_callback(
+                lambda done, bucket=bucket, tokens=tokens, future=future: self._complete(bucket, tokens, dispatched_at, future, done))
+
+        # Close the pack now so it only holds strings from this bucket
+        self.pool.flush()
+
+    def _complete(self, bucket, tokens, dispatched_at, future, inner_future):
+        """Copy a pool result onto the scheduler future and record bucket timing."""
+        completed_at = time.monotonic()
+
+        with self.lock:
+            bucket['completed'] += 1
+            bucket['tokens'] += tokens
+            bucket['latency_total'] += completed_at - dispatched_at
+            bucket['last_completion'] = completed_at
+
+        if not future.set_running_or_notify_cancel():
+            return
+        if inner_future.cancelled():
+            future.set_result(None)
+        elif inner_future.exception() is not None:
+            future.set_exception(inner_future.exception())
+        else:
+            future.set_result(inner_future.result())
+
+    def cancel_pending(self):
+        """Drop strings that were never sent to the pool."""
+        for bucket in self.buckets:
+            for _, _, future, _ in bucket['pending']:
+                future.cancel()
+            bucket['pending'] = []
+
+    def stats(self):
+        """Per-bucket throughput so bucket boundaries can be tuned."""
+        with self.lock:
+            report = []
+            for bucket in self.buckets:
+                elapsed = 0.0
+                if bucket['first_dispatch'] is not None and bucket['last_completion'] is not None:
+                    elapsed = bucket['last_completion'] - bucket['first_dispatch']
+                completed = bucket['completed']
+                report.append({
+                    "bucket": bucket['label'],
+                    "dispatched": bucket['dispatched'],
+                    "completed": completed,
+                    "entries_per_second": round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+                    "tokens_per_second": round(bucket['tokens'] / elapsed, 2) if elapsed > 0 else 0.0,
+                    "average_latency_seconds": round(bucket['latency_total'] / completed, 3) if completed else 0.0
+                })
+            return report
@@ -0,0 +1,13 @@
+"""WSGI entry point of the production serving mode.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Every worker process imports the app, warms up the model and runs a job
+keeper; jobs, stop requests and file leases live in the shared job store
+(JOB_STORE_PATH), so each job is driven by exactly one worker while any
+worker answers its status, progress and cancel requests.
+"""
+
+from app import app
+
+application = app
@@ -0,0 +1,157 @@
+"""Persistent sidecar offset index for Fallout 4 XML files."""
+
+import hashlib
+import os
+import re
+import struct
+from xml_reader import XMLEntryReader, parse_string_entry
+
+INDEX_MAGIC = b'SSTIDX01'
+
+# magic, XML file size, XML file mtime (ns), number of entries
+INDEX_HEADER = struct.Struct('<8sQqQ')
+
+# byte offset, byte length, attributes hash
+INDEX_RECORD = struct.Struct('<QIQ')
+
+raw_string_tag_pattern = re.compile(rb'<String([^>]*)>')
+
+
+def hash_attributes(attributes):
+    """Stable 64-bit hash of the attributes of a <String> tag."""
+    if isinstance(attributes, str):
+        attributes = attributes.encode('utf-8')
+    return int.from_bytes(hashlib.blake2b(attributes, digest_size=8).digest(), 'little')
+
+
+class XMLEntryIndex:
+    """Byte offsets, lengths and attribute hashes of every <String> in an XML file.
+
+    The index lives next to the XML file as <path>.idx and remembers the size
+    and mtime of the file it describes, so a stale index is rebuilt on the
+    next access instead of being trusted.
+    """
+
+    def __init__(self, xml_path):
+        self.xml_path = xml_path
+        self.index_path = f"{xml_path}.idx"
+        self.count = 0
+        self.synced_count = 0
+        self.pending_records = []
+
+    def _xml_signature(self):
+        """Size and modification time of the indexed XML file."""
+        try:
+            stat = os.stat(self.xml_path)
+            return stat.st_size, stat.st_mtime_ns
+        except OSError:
+            return None, None
+
+    def _read_header(self):
+        """Read the index header, or None when the index is missing or damaged."""
+        try:
+            with open(self.index_path, 'rb') as file:
+                header = file.read(INDEX_HEADER.size)
+            if len(header) != INDEX_HEADER.size:
+                return None
+            magic, size, mtime_ns, count = INDEX_HEADER.unpack(header)
+            return (size, mtime_ns, count) if magic == INDEX_MAGIC else None
+        except OSError:
+            return None
+
+    def ensure(self, rebuild=True):
+        """Make sure the index matches the XML file and return its entry count.
+
+        With rebuild=False a stale index is left alone and the count it was
+        last stamped with is returned: a process that does not write the XML
+        file must not replace the index its writer keeps appending to.
+        """
+        size, mtime_ns = self._xml_signature()
+        header = self._read_header()
+        if not rebuild:
+            return header[2] if size is not None and header is not None else 0
+
+        if size is None:
+            self.count = self.synced_count = 0
+            self.pending_records = []
+            return 0
+
+        if header is not None and header[:2] == (size, mtime_ns):
+            self.count = self.synced_count = header[2]
+            self.pending_records = []
+            return self.count
+
+        return self.build()
+
+    def build(self):
+        """Scan the XML file once and write a fresh index."""
+        reader = XMLEntryReader(self.xml_path)
+        temp_path = f"{self.index_path}.tmp"
+        count = 0
+
+        with open(temp_path, 'wb') as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, 0, 0, 0))
+            for offset, raw_entry in reader.iter_raw_entries():
+                tag_match = raw_string_tag_pattern.match(raw_entry)
+                attributes = tag_match.group(1) if tag_match else b''
+                file.write(INDEX_RECORD.pack(offset, len(raw_entry), hash_attributes(attributes)))
+                count += 1
+
+            size, mtime_ns = self._xml_signature()
+            file.seek(0)
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, size or 0, mtime_ns or 0, count))
+
+        os.replace(temp_path, self.index_path)
+        self.count = self.synced_count = count
+        self.pending_records = []
+        print(f"[XML-INDEX] Indexed {count} entries of {self.xml_path}")
+        return count
+
+    def get_record(self, entry_number):
+        """Return (offset, length, attributes hash) of entry N."""
+        if entry_number >= self.synced_count:
+            return self.pending_records[entry_number - self.synced_count]
+
+        with open(self.index_path, 'rb') as file:
+            file.seek(INDEX_HEADER.size + entry_number * INDEX_RECORD.size)
+            return INDEX_RECORD.unpack(file.read(INDEX_RECORD.size))
+
+    def read_entry(self, entry_number):
+        """Read and parse entry N straight from its byte offset."""
+        offset, length, _ = self.get_record(entry_number)
+        with open(self.xml_path, 'rb') as file:
+            file.seek(offset)
+            return parse_string_entry(file.read(length), offset)
+
+    def append(self, offset, length, attributes):
+        """Record an entry that was just appended to the XML file."""
+        self.pending_records.append((offset, length, hash_attributes(attributes)))
+        self.count += 1
+
+    def truncate(self, xml_size):
+        """Forget entries that no longer fit inside an XML file cut to xml_size."""
+        while self.count > 0:
+            offset, length, _ = self.get_record(self.count - 1)
+            if offset + length <= xml_size:
+                break
+            if self.pending_records:
+                self.pending_records.pop()
+            else:
+                self.synced_count -= 1
+            self.count -= 1
+
+    def sync(self):
+        """Write pending records and stamp the index with the current XML signature."""
+        size, mtime_ns = self._xml_signature()
+        mode = 'r+b' if os.path.exists(self.index_path) else 'w+b'
+
+        with open(self.index_path, mode) as file:
+            file.seek(INDEX_HEADER.size + self.synced_count * INDEX_RECORD.size)
+            file.truncate()
+            for record in self.pending_records:
+                file.write(INDEX_RECORD.pack(*record))
+            file.seek(0)
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, size or 0, mtime_ns or 0, self.count))
+
+        self.synced_count = self.count
+        self.pending_records = []
@@ -0,0 +1,138 @@
+"""Write-ahead journal of finished XML translations for crash-safe resume."""
+
+import json
+import os
+import threading
+from xml_index import hash_attributes
+
+START_MARKER = 'start'
+END_MARKER = 'end'
+
+
+def entry_key(xml_entry):
+    """Identity of an input entry: its byte offset plus a hash of its attributes."""
+    return f"{xml_entry['start_pos']}:{hash_attributes(xml_entry['attributes']):016x}"
+
+
+def entry_key_offset(key):
+    """Input byte offset encoded in an entry key."""
+    return int(key.split(':', 1)[0])
+
+
+class TranslationJournal:
+    """Append-only log of every translation the model returned during a batch run.
+
+    Records reach the OS immediately and are fsynced in groups of fsync_every.
+    A run that was started but never ended (the process died) is reported as
+    interrupted, and its records let the next run write those entries, and
+    any later entry sharing their (placeholder masked) source text, without
+    asking the model again.
+    """
+
+    def __init__(self, path, fsync_every=32):
+        self.path = path
+        self.fsync_every = max(1, fsync_every)
+        self.lock = threading.Lock()
+        self.file = None
+        self.unsynced_records = 0
+
+    def is_interrupted(self):
+        """Whether the last run recorded in the journal never reached its end marker."""
+        interrupted = False
+        for record in self._read_records():
+            if record.get('marker') == START_MARKER:
+                interrupted = True
+            elif record.get('marker') == END_MARKER:
+                interrupted = False
+        return interrupted
+
+    def _read_records(self):
+        """Yield the journal records, ignoring a torn last line."""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    # A crash can leave half a line at the end of the journal
+                    continue
+
+    def load(self, min_offset=0):
+        """Return the useful records for a run resuming at min_offset.
+
+        The result holds one record per entry at or after min_offset plus one
+        record per source text for entries that were already written.
+        """
+        records = {}
+        try:
+            for record in self._read_records():
+                key = record.get('key')
+                if key is None:
+                    continue
+                if entry_key_offset(key) < min_offset:
+                    # Only the source text of an already written entry is still useful
+                    key = f"source:{record['source']}"
+                records[key] = record
+        except Exception as e:
+            print(f"[XML-JOURNAL] Error reading journal {self.path}: {str(e)}")
+        return list(records.values())
+
+    def begin(self, records):
+        """Start a run, compacting the journal down to the still useful records."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record) + '\n')
+            file.write(json.dumps({'marker': START_MARKER}) + '\n')
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path)
+
+        self.file = open(self.path, 'a', encoding='utf-8')
+        self.unsynced_records = 0
+
+    def record(self, key, source_text, translation):
+        """Log a finished translation; it is fsynced with its group."""
+        with self.lock:
+            if self.file is None:
+                return
+            self.file.write(json.dumps({'key': key, 'source': source_text, 'translation': translation}) + '\n')
+            # Hand every record to the OS so a process crash loses nothing, fsync in groups
+            self.file.flush()
+            self.unsynced_records += 1
+            if self.unsynced_records >= self.fsync_every:
+                self._sync()
+
+    def _sync(self):
+        """Flush and fsync the journal file."""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced_records = 0
+
+    def end(self, completed):
+        """Close the run; a completed run no longer needs its journal."""
+        with self.lock:
+            if self.file is None:
+                return
+            try:
+                self.file.write(json.dumps({'marker': END_MARKER}) + '\n')
+                self._sync()
+            finally:
+                self.file.close()
+                self.file = None
+
+        if completed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def abandon(self):
+        """Close the run without ending it, for a process whose job another process took over."""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
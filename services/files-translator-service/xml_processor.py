@@ -1,15 +1,22 @@
 """XML processing utilities for Fallout 4 XML files."""
 
 import os
-import re
 import threading
-from xml.sax.saxutils import escape, unescape
+import time
 from services import ai_service
+from async_services import async_ai_service
 from config import Config
+from xml_reader import XMLEntryReader, XMLProgressCursor
+from xml_writer import XMLOutputWriter
+from xml_index import XMLEntryIndex
+from xml_journal import TranslationJournal, entry_key
+from placeholders import mask_placeholders
+from metrics import file_io_seconds, timed_iter
+from progress import ProgressTracker
+from translation_pool import TranslationPool, AsyncTranslationPool, ReorderBuffer, LengthBucketScheduler, completed_future
 
-# Global state for XML batch processing
-xml_batch_processing = False
-xml_batch_stop_requested = False
+read_seconds = file_io_seconds.labels('xml', 'read')
+write_seconds = file_io_seconds.labels('xml', 'write')
 
 class XMLProcessor:
     """Handles XML file processing operations for Fallout 4 language files."""
@@ -17,150 +24,156 @@ class XMLProcessor:
     def __init__(self, input_path, output_path):
         self.input_path = input_path
         self.output_path = output_path
+        self.reader = XMLEntryReader(input_path)
+        self.cursor = XMLProgressCursor(input_path)
+        self.input_index = XMLEntryIndex(input_path)
+        self.output_index = XMLEntryIndex(output_path)
+        self.writer = None
+        self.journal = TranslationJournal(f"{output_path}.journal", Config.XML_JOURNAL_FSYNC_EVERY)
+        self.dedup_stats = None
+        self.scheduler = None
+        self.progress = ProgressTracker('entries')
+        
+        # Batch processing state of this input/output pair
+        self.batch_processing = False
+        self.stop_requested = False
+        self.batch_options = {}
+        self.batch_thread = None
+        self.last_run = None
+        
+        # Tells the running batch whether this process still drives the job writing these files
+        self.fence = None
+        self.files_lost = False
     
     def find_next_string_entry(self):
-        """Find the next <String> entry in the XML file and return its details."""
+        """Find the next unprocessed <String> entry in the XML file and return its details."""
         try:
-            if not os.path.exists(self.input_path):
-                return None
-            
-            with open(self.input_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            # Look for the first <String> entry
-            string_pattern = re.compile(r'(<String[^>]*>.*?</String>)', re.DOTALL)
-            match = string_pattern.search(content)
-            
-            if not match:
-                return None
-            
-            string_entry = match.group(1)
-            
-            # Extract the source text
-            source_match = re.search(r'<Source>(.*?)</Source>', string_entry, re.DOTALL)
-            if not source_match:
-                return None
-            
-            source_text = source_match.group(1).strip()
-            
-            # Extract attributes from the String tag
-            string_tag_match = re.search(r'<String([^>]*)>', string_entry)
-            attributes = string_tag_match.group(1) if string_tag_match else ''
-            
-            return {
-                'full_entry': string_entry,
-                'source_text': unescape(source_text),
-                'attributes': attributes,
-                'start_pos': match.start(),
-                'end_pos': match.end()
-            }
-            
+            self.load_cursor()
+            return self.reader.read_entry_at(self.cursor.offset)
         except Exception as e:
             print(f"[XML-PROCESSOR] Error finding next XML entry: {str(e)}")
             return None
 
-    def remove_string_entry(self, start_pos, end_pos):
-        """Remove a specific XML string entry from the file."""
+    def mark_entry_processed(self, xml_entry):
+        """Move the cursor past an XML entry; it is persisted on the next output flush."""
+        self.cursor.advance(xml_entry['end_pos'])
+
+    def load_cursor(self):
+        """Load the persisted cursor, starting over when the output lost entries it already counted.
+        
+        Runs before any entry is read at the cursor, so nothing is read from
+        a position the output no longer matches.
+        """
+        self.cursor.load()
+        
+        # The output lost entries the cursor already counted (e.g. it was deleted), start over
+        if self.cursor.output_size is not None:
+            output_size = os.path.getsize(self.output_path) if os.path.exists(self.output_path) else 0
+            if output_size < self.cursor.output_size:
+                print(f"[XML-PROCESSOR] Output file is shorter than the last checkpoint, restarting from the first entry")
+                self.cursor.reset()
+
+    def open_output_writer(self):
+        """Open the output XML file for appending translated entries at the loaded cursor."""
+        self.writer = XMLOutputWriter(self.output_path,
+                                      flush_every=Config.XML_OUTPUT_FLUSH_EVERY,
+                                      on_flush=self.save_checkpoint,
+                                      index=self.output_index,
+                                      fsync=True)
+        self.writer.open(checkpoint_size=self.cursor.output_size)
+
+    def holds_files(self):
+        """Whether this process may still write the output, cursor and journal of the pair."""
+        if self.fence is None:
+            # Not driven by a stored job: a file lease or the caller keeps others out
+            return True
+        if not self.files_lost and not self.fence():
+            print(f"[XML-PROCESSOR] Another process took over the job writing {self.output_path}, no longer writing to it")
+            self.files_lost = True
+        return not self.files_lost
+
+    def save_checkpoint(self):
+        """Persist the cursor together with the output size it corresponds to."""
+        self.cursor.output_size = self.writer.offset
+        self.cursor.save()
+
+    def close_output_writer(self):
+        """Finalize the output XML file and persist the cursor."""
         try:
-            if not os.path.exists(self.input_path):
-                return False
-            
-            with open(self.input_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            # Remove the entry and any trailing newline
-            new_content = content[:start_pos] + content[end_pos:]
-            new_content = re.sub(r'\n\s*\n', '\n', new_content)  # Remove extra empty lines
-            
-            with open(self.input_path, 'w', encoding='utf-8') as file:
-                file.write(new_content)
-            
+            if self.writer is not None:
+                if not self.holds_files():
+                    # The output and cursor belong to the process that took the job over
+                    self.writer.abandon()
+                    return False
+                self.writer.finalize()
             return True
-            
         except Exception as e:
-            print(f"[XML-PROCESSOR] Error removing XML entry: {str(e)}")
+            print(f"[XML-PROCESSOR] Error finalizing XML output file: {str(e)}")
             return False
+        finally:
+            self.writer = None
 
-    def append_string_entry(self, attributes, source_text, dest_text):
-        """Append a translated XML string entry to the output file."""
-        try:
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(self.output_path), exist_ok=True)
-            
-            # Check if file exists and has proper structure
-            if not os.path.exists(self.output_path):
-                # Create new XML file with proper structure
-                xml_header = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
-<SSTXMLRessources>
-  <Params>
-    <Addon>Fallout4</Addon>
-    <Source>en</Source>
-    <Dest>ro</Dest>
-    <Version>2</Version>
-  </Params>
-  <Content>
-  </Content>
-</SSTXMLRessources>'''
-                with open(self.output_path, 'w', encoding='utf-8') as file:
-                    file.write(xml_header)
-            
-            # Read current content
-            with open(self.output_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            # Prepare the new string entry
-            escaped_source = escape(source_text)
-            escaped_dest = escape(dest_text)
-            
-            new_entry = f'''    <String{attributes}>
-      <Source>{escaped_source}</Source>
-      <Dest>{escaped_dest}</Dest>
-    </String>'''
-            
-            # Find the </Content> tag and insert before it
-            content_end_pos = content.find('  </Content>')
-            if content_end_pos != -1:
-                new_content = content[:content_end_pos] + new_entry + '\n' + content[content_end_pos:]
-                
-                with open(self.output_path, 'w', encoding='utf-8') as file:
-                    file.write(new_content)
-                return True
-            
+    def commit_entry(self, xml_entry, dest_text):
+        """Append a translated entry to the output file and move the cursor past it."""
+        # Checked before the entry is buffered, so the flush and cursor save it may trigger are covered too
+        if not self.holds_files():
             return False
-            
+        
+        try:
+            started = time.perf_counter()
+            self.writer.write_entry(xml_entry['attributes'], xml_entry['source_text'], dest_text)
+            self.mark_entry_processed(xml_entry)
+            self.writer.flush_if_needed()
+            write_seconds.observe(time.perf_counter() - started)
+            return True
         except Exception as e:
             print(f"[XML-PROCESSOR] Error appending XML entry: {str(e)}")
             return False
 
-    def count_string_entries(self, file_path=None):
-        """Count the number of <String> entries in an XML file."""
+    def count_string_entries(self, file_path=None, rebuild_index=True):
+        """Count the number of <String> entries in an XML file using its sidecar index.
+        
+        rebuild_index=False reads the index as stored, for a caller that does
+        not hold the files while another process may be writing them.
+        """
         try:
             path = file_path or self.input_path
-            if not os.path.exists(path):
-                return 0
             
-            with open(path, 'r', encoding='utf-8') as file:
-                content = file.read()
+            if path == self.output_path:
+                # The batch thread keeps the output index up to date while it runs
+                if self.batch_processing:
+                    return self.output_index.count
+                return self.output_index.ensure(rebuild_index)
             
-            # Count <String> entries
-            string_pattern = re.compile(r'<String[^>]*>', re.DOTALL)
-            matches = string_pattern.findall(content)
+            if path == self.input_path:
+                return self.input_index.ensure(rebuild_index)
             
-            return len(matches)
+            return XMLEntryIndex(path).ensure(rebuild_index)
             
         except Exception as e:
             print(f"[XML-PROCESSOR] Error counting XML entries: {str(e)}")
             return 0
 
-    def get_status(self):
+    def count_remaining_entries(self, rebuild_index=True):
+        """Count the <String> entries that have not been processed yet."""
+        # The batch thread owns the cursor while it runs
+        if not self.batch_processing:
+            self.cursor.load()
+        return max(0, self.count_string_entries(self.input_path, rebuild_index) - self.cursor.entries_done)
+
+    def get_entry(self, entry_number):
+        """Read entry N of the input file without scanning the entries before it."""
+        if entry_number >= self.count_string_entries(self.input_path):
+            return None
+        return self.input_index.read_entry(entry_number)
+
+    def get_status(self, rebuild_indexes=True):
         """Get the current status of XML translation files."""
-        global xml_batch_processing
-        
         input_exists = os.path.exists(self.input_path)
         output_exists = os.path.exists(self.output_path)
         
-        entries_remaining = self.count_string_entries(self.input_path) if input_exists else 0
-        entries_translated = self.count_string_entries(self.output_path) if output_exists else 0
+        entries_remaining = self.count_remaining_entries(rebuild_indexes) if input_exists else 0
+        entries_translated = self.count_string_entries(self.output_path, rebuild_indexes) if output_exists else 0
         
         return {
             "input_file_path": self.input_path,
@@ -169,15 +182,19 @@ class XMLProcessor:
             "output_file_path": self.output_path,
             "output_file_exists": output_exists,
             "lines_translated": entries_translated,
-            "batch_processing_status": xml_batch_processing
+            "batch_processing_status": self.batch_processing,
+            "deduplication": self.dedup_stats,
+            "length_buckets": self.scheduler.stats() if self.scheduler else None,
+            "translation_memory": ai_service.get_memory_stats(),
+            "fuzzy_memory": ai_service.get_fuzzy_stats(),
+            "prompt_usage": ai_service.get_prompt_usage(),
+            "ollama_backends": ai_service.get_backend_stats()
         }
 
     def process_next_entry(self):
         """Process the next XML entry."""
-        global xml_batch_processing
-        
         # Check if batch processing is running
-        if xml_batch_processing:
+        if self.batch_processing:
             return {
                 "status": "error",
                 "error": "Batch processing is currently running",
@@ -192,26 +209,29 @@ class XMLProcessor:
         source_text = xml_entry['source_text']
         
         if not source_text.strip():  # Empty source
-            # Remove the empty entry and add to output with empty translation
-            self.remove_string_entry(xml_entry['start_pos'], xml_entry['end_pos'])
-            self.append_string_entry(xml_entry['attributes'], source_text, source_text)
+            # Add the empty entry to output with empty translation and move past it
+            self.open_output_writer()
+            self.commit_entry(xml_entry, source_text)
+            self.close_output_writer()
             return {"status": "skipped", "message": "Skipped empty XML entry"}
         
         # Translate the text using AI
-        romanian_text = ai_service.translate_text(source_text)
+        romanian_text = ai_service.translate_text(source_text, xml_entry['record_type'])
         
         if romanian_text is None:
             return {"status": "error", "error": "XML translation failed", "input": source_text}
         
         print(f"[XML-PROCESSOR] Translation: {romanian_text}")
         
-        # Append to output XML file
-        if not self.append_string_entry(xml_entry['attributes'], source_text, romanian_text):
-            return {"status": "error", "error": "Failed to write to XML output file"}
+        # Append to output XML file and move the cursor past the processed entry
+        self.open_output_writer()
+        written = self.commit_entry(xml_entry, romanian_text)
         
-        # Remove the processed entry from input file
-        if not self.remove_string_entry(xml_entry['start_pos'], xml_entry['end_pos']):
-            return {"status": "error", "error": "Failed to remove processed XML entry from input file"}
+        if not self.close_output_writer():
+            return {"status": "error", "error": "Failed to finalize XML output file"}
+        
+        if not written:
+            return {"status": "error", "error": "Failed to write to XML output file"}
         
         return {
             "status": "success",
@@ -221,12 +241,14 @@ class XMLProcessor:
             "output_file_path": self.output_path
         }
 
-    def start_batch_processing(self):
-        """Start processing all XML entries in background."""
-        global xml_batch_processing, xml_batch_stop_requested
+    def start_batch_processing(self, options=None, fence=None):
+        """Start processing all XML entries in background.
         
+        fence, given by a job manager, tells the batch whether its process
+        still drives the job; the batch stops writing once it says no.
+        """
         # Check if batch processing is already running
-        if xml_batch_processing:
+        if self.batch_processing:
             return {
                 "status": "error",
                 "error": "Batch processing already in progress",
@@ -234,19 +256,24 @@ class XMLProcessor:
             }
         
         # Count remaining entries for user info
-        remaining_entries = self.count_string_entries()
+        remaining_entries = self.count_remaining_entries()
         
         if remaining_entries == 0:
             return {"status": "completed", "message": "No XML entries found to process."}
         
         # Set the flags to indicate batch processing is starting
-        xml_batch_processing = True
-        xml_batch_stop_requested = False
+        self.batch_processing = True
+        self.fence = fence
+        self.files_lost = False
+        self.progress.prepare()
+        self.stop_requested = False
+        self.batch_options = options or {}
         
         # Start the background processing thread
         processing_thread = threading.Thread(target=self._process_all_entries_background)
         processing_thread.daemon = True  # Thread will die when main program exits
         processing_thread.start()
+        self.batch_thread = processing_thread
         
         return {
             "status": "success",
@@ -256,9 +283,7 @@ class XMLProcessor:
 
     def stop_batch_processing(self):
         """Stop the running XML batch processing."""
-        global xml_batch_processing, xml_batch_stop_requested
-        
-        if not xml_batch_processing:
+        if not self.batch_processing:
             return {
                 "status": "error",
                 "error": "No batch processing is currently running",
@@ -266,102 +291,306 @@ class XMLProcessor:
             }
         
         # Set the stop flag
-        xml_batch_stop_requested = True
+        self.stop_requested = True
         
         return {
             "status": "success",
-            "message": "Stop request sent. The batch processing will stop after completing the current entry."
+            "message": "Stop request sent. The batch processing will stop once the translations already in flight are written."
         }
 
+    def prescan_unique_sources(self):
+        """Walk the remaining entries once and count how many distinct source texts they hold."""
+        total_entries = 0
+        unique_sources = set()
+        
+        for xml_entry in self.reader.iter_entries(self.cursor.offset):
+            source_text = xml_entry['source_text']
+            if source_text.strip():
+                total_entries += 1
+                # Variants differing only in numbers or tags share one translation
+                unique_sources.add(mask_placeholders(source_text, Config.PLACEHOLDER_MASKING_ENABLED).text)
+        
+        return {
+            "total_entries": total_entries,
+            "unique_sources": len(unique_sources),
+            "duplicate_entries": total_entries - len(unique_sources),
+            "reused_translations": 0
+        }
+
+    def seed_fuzzy_index(self):
+        """Load the Source/Dest pairs already in the output file into the similarity index, once per process.
+        
+        Seeding runs on its own thread so the batch starts at once; lookups
+        made meanwhile simply see fewer earlier translations.
+        """
+        fuzzy_index = ai_service.fuzzy_index
+        if fuzzy_index is None or self.output_path in fuzzy_index.seeded_paths:
+            return
+        fuzzy_index.seeded_paths.add(self.output_path)
+        
+        # Entries the batch appends from now on reach the index as they are translated
+        seeding_thread = threading.Thread(target=self._seed_fuzzy_index, args=(fuzzy_index, self.writer.offset))
+        seeding_thread.daemon = True
+        seeding_thread.start()
+
+    def _seed_fuzzy_index(self, fuzzy_index, end_offset):
+        """Add the translated pairs written before end_offset to the similarity index."""
+        started = time.monotonic()
+        added = 0
+        try:
+            for xml_entry in XMLEntryReader(self.output_path).iter_entries():
+                if xml_entry['start_pos'] >= end_offset:
+                    break
+                
+                source_text = xml_entry['source_text']
+                dest_text = xml_entry['dest_text']
+                # Empty and copied entries hold no translation
+                if not source_text.strip() or not dest_text or dest_text == source_text:
+                    continue
+                
+                # The index holds templates, like the translations it is fed during a run
+                masked_text = mask_placeholders(source_text, Config.PLACEHOLDER_MASKING_ENABLED)
+                masked_translation = masked_text.mask_translation(dest_text)
+                if masked_translation is not None and fuzzy_index.add(masked_text.text, masked_translation):
+                    added += 1
+            
+            print(f"[XML-PROCESSOR] Similarity index seeded with {added} translated pairs from {self.output_path} in {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            print(f"[XML-PROCESSOR] Error seeding the similarity index: {str(e)}")
+
+    def _journal_translation(self, key, template_text, future):
+        """Log a finished translation to the resume journal."""
+        if future.cancelled() or future.exception() is not None or self.files_lost:
+            return
+        
+        translated_text = future.result()
+        if translated_text is None:
+            return
+        
+        try:
+            self.journal.record(key, template_text, translated_text)
+        except Exception as e:
+            print(f"[XML-PROCESSOR] Error writing to the resume journal: {str(e)}")
+
+    def _commit_batch_item(self, xml_entry, kind, masked_text, result, counts, errors):
+        """Write one finished batch item in source order; False means the batch must stop."""
+        source_text = xml_entry['source_text']
+        
+        if kind == 'translate' and result is not None:
+            # Put this entry's own numbers and tags back into the shared translated template
+            result = ai_service.restore_translation(source_text, masked_text, result, xml_entry['record_type'])
+        
+        if kind == 'translate' and result is None:
+            errors.append(f"Translation failed for: {source_text}")
+            self.progress.add('errors')
+            self.mark_entry_processed(xml_entry)
+            return True
+        
+        # Append to output XML file and move the cursor past the entry
+        if not self.commit_entry(xml_entry, result):
+            if kind == 'skip':
+                errors.append("Failed to write empty XML entry")
+            elif kind == 'copy':
+                errors.append(f"Failed to write copied text for: {source_text}")
+            else:
+                errors.append(f"Failed to write translation for: {source_text}")
+            self.progress.add('errors')
+            return False
+        
+        if kind == 'skip':
+            counts['skipped'] += 1
+            self.progress.add('skipped')
+        elif kind == 'copy':
+            counts['copied'] += 1
+            self.progress.add('copied')
+            # Log progress every 100 entries for copied items too
+            if (counts['processed'] + counts['copied']) % 100 == 0:
+                print(f"[XML-PROCESSOR] Progress: {counts['processed']} translated, {counts['copied']} copied, {counts['skipped']} skipped (empty strings)")
+        else:
+            counts['processed'] += 1
+            self.progress.add('processed')
+            # Log progress every 100 entries
+            if counts['processed'] % 100 == 0:
+                print(f"[XML-PROCESSOR] Progress: {counts['processed']} XML entries translated")
+        
+        return True
+
     def _process_all_entries_background(self):
         """Background function to process all XML entries."""
-        global xml_batch_processing, xml_batch_stop_requested
+        pool = None
+        outcome = 'error'
+        counts = {'processed': 0, 'skipped': 0, 'copied': 0, 'recovered': 0}  # copied = written without translation
+        errors = []
         
         try:
-            processed_count = 0
-            skipped_count = 0
-            copied_count = 0  # Count entries that were copied without translation
-            errors = []
+            # Entries given a translation, duplicates included, counted against the translation limit
+            entries_translated = 0
+            
+            # Get the translation limit and worker count, a job may override the config
+            max_entries_to_translate = self.batch_options.get('max_entries_to_translate', Config.XML_MAX_ENTRIES_TO_TRANSLATE)
+            
+            # Keep N translations in flight and write their results back in source order
+            if Config.ASYNC_PIPELINE_ENABLED:
+                workers = self.batch_options.get('workers', Config.ASYNC_MAX_IN_FLIGHT)
+                print(f"[XML-PROCESSOR] Starting background batch processing of {self.input_path} with up to {workers} async translations in flight...")
+                pool = AsyncTranslationPool(async_ai_service, workers,
+                                            pack_max_strings=Config.TRANSLATION_PACK_MAX_STRINGS,
+                                            pack_token_budget=Config.TRANSLATION_PACK_TOKEN_BUDGET,
+                                            pack_max_string_tokens=Config.TRANSLATION_PACK_MAX_STRING_TOKENS)
+            else:
+                workers = self.batch_options.get('workers', Config.XML_TRANSLATION_WORKERS)
+                print(f"[XML-PROCESSOR] Starting background batch processing of {self.input_path} with {workers} translation workers...")
+                pool = TranslationPool(ai_service.translate_template, workers,
+                                       translate_batch_fn=ai_service.translate_batch,
+                                       pack_max_strings=Config.TRANSLATION_PACK_MAX_STRINGS,
+                                       pack_token_budget=Config.TRANSLATION_PACK_TOKEN_BUDGET,
+                                       pack_max_string_tokens=Config.TRANSLATION_PACK_MAX_STRING_TOKENS)
+            
+            # Bucket the lookahead window by length so similar-sized work is dispatched together
+            scheduler = LengthBucketScheduler(pool, Config.XML_SCHEDULER_BUCKETS)
+            self.scheduler = scheduler
+            in_flight = ReorderBuffer(max(pool.window_size(), Config.XML_SCHEDULER_LOOKAHEAD), before_wait=scheduler.flush)
+            
+            # Resume from the persisted cursor and walk the remaining entries once
+            self.load_cursor()
+            self.progress.start(self.count_remaining_entries())
             
-            # Get the translation limit from config
-            max_entries_to_translate = Config.XML_MAX_ENTRIES_TO_TRANSLATE
+            # Pre-scan so the status can show how much inference deduplication saves
+            self.dedup_stats = self.prescan_unique_sources()
+            print(f"[XML-PROCESSOR] Pre-scan: {self.dedup_stats['unique_sources']} unique source strings in {self.dedup_stats['total_entries']} non-empty entries")
             
-            print(f"[XML-PROCESSOR] Starting background batch processing...")
+            self.open_output_writer()
             
-            while True:
+            # Earlier translations serve as few-shot examples (or stand-ins) for near-duplicate sources
+            self.seed_fuzzy_index()
+            
+            # Translations finished before a crash are written again without calling the model
+            journal_records = self.journal.load(min_offset=self.cursor.offset)
+            self.journal.begin(journal_records)
+            recovered = {}
+            
+            # One translation future per distinct source template, shared by every entry using it
+            translations_by_template = {}
+            
+            for record in journal_records:
+                recovered[record['key']] = record['translation']
+                translations_by_template[record['source']] = completed_future(record['translation'])
+            
+            if journal_records:
+                print(f"[XML-PROCESSOR] Loaded {len(journal_records)} finished translations from the resume journal")
+            
+            stopped = False
+            failed = False
+            
+            for xml_entry in timed_iter(self.reader.iter_entries(self.cursor.offset), read_seconds):
                 # Check if stop was requested
-                if xml_batch_stop_requested:
-                    print(f"[XML-PROCESSOR] Batch processing stopped by user request after {processed_count} processed, {skipped_count} skipped, {copied_count} copied entries.")
+                if self.stop_requested:
+                    stopped = True
                     break
                 
-                xml_entry = self.find_next_string_entry()
-                
-                if xml_entry is None:
-                    print(f"[XML-PROCESSOR] Batch processing completed - no more entries found")
-                    break  # No more entries
-                
                 source_text = xml_entry['source_text']
+                key = entry_key(xml_entry)
                 
                 if not source_text.strip():  # Empty entry
-                    self.remove_string_entry(xml_entry['start_pos'], xml_entry['end_pos'])
-                    self.append_string_entry(xml_entry['attributes'], source_text, source_text)
-                    skipped_count += 1
-                    continue
-                
-                # Check if we've reached the translation limit
-                if max_entries_to_translate > 0 and processed_count >= max_entries_to_translate:
-                    # Copy original text as Romanian translation (no AI call)
-                    if not self.append_string_entry(xml_entry['attributes'], source_text, source_text):
-                        errors.append(f"Failed to write copied text for: {source_text}")
-                        continue
-                    
-                    # Remove the processed entry from input file
-                    if not self.remove_string_entry(xml_entry['start_pos'], xml_entry['end_pos']):
-                        errors.append(f"Failed to remove copied XML entry: {source_text}")
-                        break
-                    
-                    copied_count += 1
-                    
-                    # Log progress every 100 entries for copied items too
-                    if (processed_count + copied_count) % 100 == 0:
-                        print(f"[XML-PROCESSOR] Progress: {processed_count} translated, {copied_count} copied, {skipped_count} skipped (empty strings)")
+                    in_flight.add((xml_entry, 'skip', None), completed_future(source_text))
+                else:
+                    masked_text = mask_placeholders(source_text, Config.PLACEHOLDER_MASKING_ENABLED)
+                    template_text = masked_text.text
                     
-                    continue
-                
-                # Translate the text using AI
-                romanian_text = ai_service.translate_text(source_text)
+                    if key in recovered:
+                        # Finished before the restart, take it from the journal
+                        in_flight.add((xml_entry, 'translate', masked_text), completed_future(recovered.pop(key)))
+                        counts['recovered'] += 1
+                        entries_translated += 1
+                    elif max_entries_to_translate > 0 and entries_translated >= max_entries_to_translate:
+                        # Copy original text as Romanian translation (no AI call)
+                        in_flight.add((xml_entry, 'copy', None), completed_future(source_text))
+                    elif template_text in translations_by_template:
+                        # Fan out the translation already requested for the same source template
+                        future = translations_by_template[template_text]
+                        future.add_done_callback(lambda done, key=key, template_text=template_text: self._journal_translation(key, template_text, done))
+                        in_flight.add((xml_entry, 'translate', masked_text), future)
+                        self.dedup_stats['reused_translations'] += 1
+                        entries_translated += 1
+                    else:
+                        # Translate the template using AI, grouped with entries of the same record type
+                        future = scheduler.submit(template_text, xml_entry['record_type'])
+                        future.add_done_callback(lambda done, key=key, template_text=template_text: self._journal_translation(key, template_text, done))
+                        translations_by_template[template_text] = future
+                        in_flight.add((xml_entry, 'translate', masked_text), future)
+                        entries_translated += 1
                 
-                if romanian_text is None:
-                    errors.append(f"Translation failed for: {source_text}")
-                    self.remove_string_entry(xml_entry['start_pos'], xml_entry['end_pos'])
-                    continue
+                # Write every finished head item, waiting only when the window is full
+                while in_flight.is_full() or in_flight.head_ready():
+                    (entry, kind, masked_text), result = in_flight.pop()
+                    if not self._commit_batch_item(entry, kind, masked_text, result, counts, errors):
+                        failed = True
+                        break
                 
-                # Append to output XML file
-                if not self.append_string_entry(xml_entry['attributes'], source_text, romanian_text):
-                    errors.append(f"Failed to write translation for: {source_text}")
-                    continue                # Remove the processed entry from input file
-                if not self.remove_string_entry(xml_entry['start_pos'], xml_entry['end_pos']):
-                    errors.append(f"Failed to remove processed XML entry: {source_text}")
+                if failed:
                     break
-                
-                processed_count += 1
-                
-                # Log progress every 100 entries
-                if processed_count % 100 == 0:
-                    print(f"[XML-PROCESSOR] Progress: {processed_count} XML entries translated")
             
-            print(f"[XML-PROCESSOR] Background batch processing finished. Translated: {processed_count}, Copied: {copied_count}, Skipped: {skipped_count}, Errors: {len(errors)}")
+            # Drain the translations that are already in flight, also when stopping
+            while in_flight and not failed:
+                (entry, kind, masked_text), result = in_flight.pop()
+                if not self._commit_batch_item(entry, kind, masked_text, result, counts, errors):
+                    failed = True
+            in_flight.cancel_all()
+            scheduler.cancel_pending()
+            
+            if self.files_lost:
+                print(f"[XML-PROCESSOR] Batch processing aborted, another process drives its job now")
+                outcome = 'failed'
+            elif failed:
+                print(f"[XML-PROCESSOR] Batch processing aborted after an output write failure")
+                outcome = 'failed'
+            elif stopped:
+                print(f"[XML-PROCESSOR] Batch processing stopped by user request after {counts['processed']} processed, {counts['skipped']} skipped, {counts['copied']} copied entries.")
+                outcome = 'stopped'
+            else:
+                print(f"[XML-PROCESSOR] Batch processing completed - no more entries found")
+                outcome = 'completed'
+            
+            print(f"[XML-PROCESSOR] Background batch processing finished. Translated: {counts['processed']} ({counts['recovered']} from the resume journal), Copied: {counts['copied']}, Skipped: {counts['skipped']}, Errors: {len(errors)}")
+            print(f"[XML-PROCESSOR] Deduplication: {self.dedup_stats}")
+            for bucket_stats in scheduler.stats():
+                print(f"[XML-PROCESSOR] Length bucket {bucket_stats['bucket']} tokens: {bucket_stats}")
+            print(f"[XML-PROCESSOR] Translation memory: {ai_service.get_memory_stats()}")
+            print(f"[XML-PROCESSOR] Prompt usage: {ai_service.get_prompt_usage()}")
             
         except Exception as e:
             print(f"[XML-PROCESSOR] Error in background batch processing: {str(e)}")
+            errors.append(str(e))
         
         finally:
+            if pool is not None:
+                pool.shutdown(cancel_pending=True)
+            
+            # Write the closing tags on completion or stop
+            finalized = self.close_output_writer()
+            self.progress.finish(outcome)
+            
+            # Only a finished run drops its journal, a stop keeps it for the next start
+            try:
+                if self.files_lost:
+                    self.journal.abandon()
+                else:
+                    self.journal.end(completed=outcome == 'completed' and finalized)
+            except Exception as e:
+                print(f"[XML-PROCESSOR] Error closing the resume journal: {str(e)}")
+            
+            self.last_run = {
+                "outcome": outcome,
+                "processed_count": counts['processed'],
+                "recovered_count": counts['recovered'],
+                "copied_count": counts['copied'],
+                "skipped_count": counts['skipped'],
+                "error_count": len(errors),
+                "recent_errors": errors[-20:]
+            }
+            
             # Always reset the flags when processing is done
-            xml_batch_processing = False
-            xml_batch_stop_requested = False
+            self.fence = None
+            self.batch_processing = False
+            self.stop_requested = False
             print(f"[XML-PROCESSOR] Background batch processing flags reset")
-
-def get_batch_processing_status():
-    """Get current batch processing status."""
-    global xml_batch_processing
-    return xml_batch_processing
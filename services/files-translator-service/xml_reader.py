@@ -0,0 +1,176 @@
+"""Streaming reader and progress cursor for Fallout 4 XML files."""
+
+import json
+import os
+import re
+from xml.sax.saxutils import unescape
+
+# Size of the blocks read from disk while scanning for <String> elements
+READ_CHUNK_SIZE = 1024 * 1024
+
+STRING_OPEN_TAG = b'<String'
+STRING_CLOSE_TAG = b'</String>'
+
+string_open_pattern = re.compile(rb'<String[\s>]')
+string_tag_pattern = re.compile(r'<String([^>]*)>')
+source_pattern = re.compile(r'<Source>(.*?)</Source>', re.DOTALL)
+dest_pattern = re.compile(r'<Dest>(.*?)</Dest>', re.DOTALL)
+record_pattern = re.compile(r'<REC[^>]*>([^<:]*)')
+
+
+def parse_string_entry(raw_entry, start_pos):
+    """Build the entry dictionary for one raw <String> element."""
+    string_entry = raw_entry.decode('utf-8')
+
+    # Extract the source text
+    source_match = source_pattern.search(string_entry)
+    source_text = source_match.group(1).strip() if source_match else ''
+
+    # Extract the translated text
+    dest_match = dest_pattern.search(string_entry)
+    dest_text = dest_match.group(1).strip() if dest_match else ''
+
+    # Record signature (INFO, QUST, WEAP, ...) of the <REC> element, e.g. <REC>INFO:NAM1</REC>
+    record_match = record_pattern.search(string_entry)
+    record_type = record_match.group(1).strip() if record_match else ''
+
+    # Extract attributes from the String tag
+    string_tag_match = string_tag_pattern.match(string_entry)
+    attributes = string_tag_match.group(1) if string_tag_match else ''
+
+    return {
+        'full_entry': string_entry,
+        'source_text': unescape(source_text),
+        'dest_text': unescape(dest_text),
+        'attributes': attributes,
+        'record_type': record_type or None,
+        'start_pos': start_pos,
+        'end_pos': start_pos + len(raw_entry)
+    }
+
+
+class XMLEntryReader:
+    """Walks the <String> elements of an XML file in a single streaming pass."""
+
+    def __init__(self, path, chunk_size=READ_CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+
+    def iter_raw_entries(self, start_offset=0):
+        """Yield (byte offset, raw bytes) for every <String> element after start_offset."""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as file:
+            file.seek(start_offset)
+            base_offset = start_offset
+            buffer = b''
+            position = 0
+
+            while True:
+                match = string_open_pattern.search(buffer, position)
+                if match:
+                    end = buffer.find(STRING_CLOSE_TAG, match.end())
+                    if end != -1:
+                        end += len(STRING_CLOSE_TAG)
+                        yield base_offset + match.start(), buffer[match.start():end]
+                        position = end
+                        continue
+                    # The element continues in the next chunk
+                    keep_from = match.start()
+                else:
+                    # Keep enough bytes to catch an opening tag split across chunks
+                    keep_from = max(position, len(buffer) - len(STRING_OPEN_TAG))
+
+                chunk = file.read(self.chunk_size)
+                if not chunk:
+                    return
+
+                buffer = buffer[keep_from:] + chunk
+                base_offset += keep_from
+                position = 0
+
+    def iter_entries(self, start_offset=0):
+        """Yield parsed entries for every <String> element after start_offset."""
+        for start_pos, raw_entry in self.iter_raw_entries(start_offset):
+            yield parse_string_entry(raw_entry, start_pos)
+
+    def read_entry_at(self, offset):
+        """Return the first entry found at or after the given byte offset."""
+        return next(self.iter_entries(offset), None)
+
+
+class XMLProgressCursor:
+    """Persisted position of the next unprocessed entry in an XML input file."""
+
+    log_tag = 'XML-READER'
+
+    def __init__(self, input_path):
+        self.input_path = input_path
+        self.cursor_path = f"{input_path}.cursor"
+        self.offset = 0
+        self.entries_done = 0
+        self.output_size = None
+        self.load()
+
+    def _input_signature(self):
+        """Size and modification time identifying the current input file, stored with the cursor."""
+        try:
+            stat = os.stat(self.input_path)
+            return {'input_size': stat.st_size, 'input_mtime_ns': stat.st_mtime_ns}
+        except OSError:
+            return {'input_size': None, 'input_mtime_ns': None}
+
+    def _matches_input(self, data):
+        """Whether a stored cursor was saved for the current input file."""
+        return all(data.get(key) == value for key, value in self._input_signature().items())
+
+    def load(self):
+        """Load the cursor, resetting it when the input file has been replaced."""
+        offset = 0
+        entries_done = 0
+        output_size = None
+
+        try:
+            if os.path.exists(self.cursor_path):
+                with open(self.cursor_path, 'r', encoding='utf-8') as file:
+                    data = json.load(file)
+
+                if self._matches_input(data):
+                    offset = data.get('offset', 0)
+                    entries_done = data.get('entries_done', 0)
+                    output_size = data.get('output_size')
+                else:
+                    print(f"[{self.log_tag}] Input file changed, restarting from the first entry: {self.input_path}")
+        except Exception as e:
+            print(f"[{self.log_tag}] Error loading cursor {self.cursor_path}: {str(e)}")
+
+        self.offset = offset
+        self.entries_done = entries_done
+        self.output_size = output_size
+
+    def save(self):
+        """Atomically persist the cursor next to the input file."""
+        data = {
+            'offset': self.offset,
+            'entries_done': self.entries_done,
+            'output_size': self.output_size
+        }
+        data.update(self._input_signature())
+
+        temp_path = f"{self.cursor_path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        os.replace(temp_path, self.cursor_path)
+
+    def reset(self):
+        """Forget all progress and start again from the first entry."""
+        self.offset = 0
+        self.entries_done = 0
+        self.output_size = None
+        self.save()
+
+    def advance(self, end_pos):
+        """Mark everything up to end_pos as processed; call save() to persist it."""
+        self.offset = end_pos
+        self.entries_done += 1
@@ -0,0 +1,171 @@
+"""Append-only writer for translated Fallout 4 XML files."""
+
+import os
+from xml.sax.saxutils import escape
+
+# Size of the blocks read backwards while repairing an unterminated file
+REPAIR_CHUNK_SIZE = 64 * 1024
+
+XML_HEADER = '''<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<SSTXMLRessources>
+  <Params>
+    <Addon>Fallout4</Addon>
+    <Source>en</Source>
+    <Dest>ro</Dest>
+    <Version>2</Version>
+  </Params>
+  <Content>
+'''
+
+XML_FOOTER = '''  </Content>
+</SSTXMLRessources>'''
+
+STRING_CLOSE_TAG = b'</String>'
+CONTENT_OPEN_TAG = b'<Content>'
+
+ENTRY_INDENT = b'    '
+
+
+def format_string_entry(attributes, source_text, dest_text):
+    """Render one translated <String> element of the output file."""
+    return f'''<String{attributes}>
+      <Source>{escape(source_text)}</Source>
+      <Dest>{escape(dest_text)}</Dest>
+    </String>'''
+
+
+class XMLOutputWriter:
+    """Appends entries to an open output file and writes the footer only on finalize."""
+
+    def __init__(self, path, flush_every=1, on_flush=None, index=None, fsync=False):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.on_flush = on_flush
+        self.index = index
+        self.fsync = fsync
+        self.file = None
+        self.offset = 0
+        self.pending_entries = 0
+        # Entries written since the last flush, only handed to the file by flush()
+        self.buffer = []
+
+    def open(self, checkpoint_size=None):
+        """Open the output file for appending, creating or repairing it first.
+
+        checkpoint_size is the output size recorded with the last persisted
+        cursor; anything written after it is cut so output and cursor agree.
+        """
+        # Create directory if it doesn't exist
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            with open(self.path, 'wb') as file:
+                file.write(XML_HEADER.encode('utf-8'))
+
+        # Validate the index against the file before the repair changes it
+        if self.index is not None:
+            self.index.ensure()
+
+        if checkpoint_size is not None and os.path.getsize(self.path) > checkpoint_size:
+            with open(self.path, 'r+b') as file:
+                # The checkpoint of a finalized file is taken before its footer, which is expected
+                file.seek(checkpoint_size)
+                if file.read() != XML_FOOTER.encode('utf-8'):
+                    print(f"[XML-WRITER] Dropping output written after the last checkpoint in {self.path}")
+                file.truncate(checkpoint_size)
+
+        self._repair()
+
+        self.offset = os.path.getsize(self.path)
+        if self.index is not None:
+            self.index.truncate(self.offset)
+            self.index.sync()
+
+        self.file = open(self.path, 'ab', buffering=0)
+        self.pending_entries = 0
+        self.buffer = []
+
+    def _repair(self):
+        """Cut the footer or a half written entry so new entries can be appended."""
+        with open(self.path, 'r+b') as file:
+            position = file.seek(0, os.SEEK_END)
+            tail = b''
+
+            # Walk backwards until the end of the last complete entry is found
+            while position > 0:
+                read_size = min(REPAIR_CHUNK_SIZE, position)
+                position -= read_size
+                file.seek(position)
+                tail = file.read(read_size) + tail
+
+                marker_pos = tail.rfind(STRING_CLOSE_TAG)
+                marker = STRING_CLOSE_TAG
+                if marker_pos == -1:
+                    marker_pos = tail.rfind(CONTENT_OPEN_TAG)
+                    marker = CONTENT_OPEN_TAG
+
+                if marker_pos != -1:
+                    file.truncate(position + marker_pos + len(marker))
+                    file.seek(0, os.SEEK_END)
+                    file.write(b'\n')
+                    return
+
+            print(f"[XML-WRITER] No <Content> section found, recreating output file: {self.path}")
+            file.seek(0)
+            file.truncate()
+            file.write(XML_HEADER.encode('utf-8'))
+
+    def write_entry(self, attributes, source_text, dest_text):
+        """Append one translated entry; it reaches the disk on the next flush."""
+        entry = format_string_entry(attributes, source_text, dest_text).encode('utf-8')
+        self.buffer.append(ENTRY_INDENT + entry + b'\n')
+
+        if self.index is not None:
+            self.index.append(self.offset + len(ENTRY_INDENT), len(entry), attributes)
+        self.offset += len(ENTRY_INDENT) + len(entry) + 1
+        self.pending_entries += 1
+
+    def flush_if_needed(self):
+        """Flush once enough entries have been buffered."""
+        if self.pending_entries >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """Push buffered entries to the file and notify the flush listener."""
+        if self.buffer:
+            data = memoryview(b''.join(self.buffer))
+            # An unbuffered write makes one system call, which may take only part of the data
+            while data:
+                data = data[self.file.write(data):]
+            self.buffer = []
+        if self.fsync:
+            os.fsync(self.file.fileno())
+        self.pending_entries = 0
+        if self.index is not None:
+            self.index.sync()
+        if self.on_flush:
+            self.on_flush()
+
+    def finalize(self):
+        """Write the closing tags and close the file."""
+        if self.file is None:
+            return
+
+        try:
+            self.buffer.append(XML_FOOTER.encode('utf-8'))
+            self.flush()
+        finally:
+            self.file.close()
+            self.file = None
+
+    def abandon(self):
+        """Close the file without writing the buffered entries or the footer, for a writer that lost the file."""
+        if self.file is None:
+            return
+
+        self.buffer = []
+        self.pending_entries = 0
+        self.file.close()
+        self.file = None